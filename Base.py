@@ -7,12 +7,16 @@ import json
 import httpx
 import time
 import os
-import base64
+import functools
+import shutil
+from pathlib import Path
 
 from ClassConverter import DataConverter
-from ClassFiles import FileManager
+from ClassFiles import FileManager, FileRange
 from ClassLogger import LoggerConfig
 from ClassHTTP import AsyncHttpClient, RequestFormat, ResponseFormat, async_test_http, async_tests_http
+from ClassJsonStream import Base64FieldDecoder
+from ClassLimiter import global_rate_limiter
 
 
 import asyncio
@@ -37,6 +41,7 @@ async def lifestile_task(logger: logging.Logger, interval: int = 300):
 async def send_request(client: httpx.AsyncClient, url, method='GET', headers=None, params=None, data=None, json=None, timeout: float = 50.0):
     '''шаблонка для запросов'''
     try:
+        await global_rate_limiter.acquire(str(client.build_request(method, url).url))
         response = await client.request(method=method, url=url, headers=headers, params=params, data=data,json=json, timeout=timeout)
         response.raise_for_status()
         return response.json() if response.content else None
@@ -59,34 +64,55 @@ async def call_crm_api(client: httpx.AsyncClient):
     logger.info(json.dumps(request_1, indent=2, ensure_ascii=False))
 
 
+async def stream_download(client: httpx.AsyncClient, url: str, params: dict, path: str | None = None, timeout: float = 50.0) -> bool:
+    """Потоково читает ответ /download: recipient_data.file раскодируется из base64 и пишется на диск по чанкам.
+    path=None - только проверка наличия файла (чтение прекращается на первых байтах поля).
+    Возвращает False, если файла на сервере нет"""
+    decoder = Base64FieldDecoder(("recipient_data", "file"))
+    await global_rate_limiter.acquire(str(client.build_request("GET", url).url))
+    async with client.stream("GET", url, params=params, timeout=timeout) as response:
+        response.raise_for_status()
+        if path is None:
+            async for chunk in response.aiter_bytes():
+                if decoder.feed(chunk) or decoder.done:
+                    return decoder.size > 0
+            decoder.close()
+            return decoder.size > 0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # пишем в .part и переименовываем: оборванная или отменённая загрузка не оставляет "половинку" mp3
+        tmp_path = f"{path}.part"
+        try:
+            # запись в пуле потоков aiofiles: диск не останавливает event loop между чанками
+            async with aiofiles.open(tmp_path, "wb") as file:
+                async for data in decoder.iter_decoded(response.aiter_bytes()):
+                    await file.write(data)
+            if decoder.size:
+                os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    return decoder.size > 0
+
+
 async def featch_data(client: httpx.AsyncClient, flag=False, filename: str = ''):
     t_get_start = time.perf_counter()
 
     directory = r'C:\Users\beginin-ov\Projects\Local\work\temp_audio_files'
     input_format = 'mp3'
-    response = await send_request(client=client, url='/download',method="GET", params = {'filename': filename})
+    path = f"{directory}/{filename}.{input_format}" if flag else None
+    try:
+        exists = await stream_download(client=client, url='/download', params={'filename': filename}, path=path)
+    except Exception as e:
+        logger.info(f"Ошибка сохранения файла {filename}: {e}")
+        raise
     t_get = round(time.perf_counter() - t_get_start,2)
-    #data = response['data']
-    # logger.info(f"data: {data}")
-    file_base64 = response.get("recipient_data").get('file')
 
-    if not file_base64:
+    if not exists:
         logger.info(f"файл отсутствует")
         return False
     #logger.info(f"Время получения файла: {t_get} с")
     if flag==True:
-        try:
-            file_bytes = base64.b64decode(file_base64)  # Декодирование из base64
-            if not os.path.exists(f"{directory}"):
-                os.makedirs(f"{directory}")
-            with open(f"{directory}/{filename}.{input_format}", "wb") as file:
-                file.write(file_bytes)
-            logger.info(f"Сохранили файл {filename}.{input_format} в каталог {directory}")
-            return True
-        except Exception as e:
-            logger.info(f"Ошибка сохранения файла {filename}: {e}")
-            raise
-
+        logger.info(f"Сохранили файл {filename}.{input_format} в каталог {directory}")
     return True
 
 async def featch_data_http_client(client: httpx.AsyncClient, flag=False, filename: str = ''):
@@ -94,29 +120,20 @@ async def featch_data_http_client(client: httpx.AsyncClient, flag=False, filenam
 
     directory = r'C:\Users\beginin-ov\Projects\Local\work\temp_audio_files'
     input_format = 'mp3'
-    response = await send_request(client=client, url='',method="GET", params = {'filename': filename})
+    path = f"{directory}/{filename}.{input_format}" if flag else None
+    try:
+        exists = await stream_download(client=client, url='', params={'filename': filename}, path=path)
+    except Exception as e:
+        logger.info(f"Ошибка сохранения файла {filename}: {e}")
+        raise
     t_get = round(time.perf_counter() - t_get_start,2)
-    #data = response['data']
-    # logger.info(f"data: {data}")
-    file_base64 = response.get("recipient_data").get('file')
 
-    if not file_base64:
+    if not exists:
         logger.info(f"файл отсутствует")
         return False
     #logger.info(f"Время получения файла: {t_get} с")
     if flag==True:
-        try:
-            file_bytes = base64.b64decode(file_base64)  # Декодирование из base64
-            if not os.path.exists(f"{directory}"):
-                os.makedirs(f"{directory}")
-            with open(f"{directory}/{filename}.{input_format}", "wb") as file:
-                file.write(file_bytes)
-            logger.info(f"Сохранили файл {filename}.{input_format} в каталог {directory}")
-            return True
-        except Exception as e:
-            logger.info(f"Ошибка сохранения файла {filename}: {e}")
-            raise
-
+        logger.info(f"Сохранили файл {filename}.{input_format} в каталог {directory}")
     return True
 
 
@@ -127,15 +144,22 @@ async def check_file_AppRecordLoarder() -> ResponseFormat:
     filenames = ['']
     filenames = ['']
     async with AsyncHttpClient(url="") as client:
-        for filename in filenames:
-            request = RequestFormat(method="GET", endpoint="/download", params={'filename': filename}, return_type="bytes")
-            result = await client.request_async(request)
-
-            result = json.loads(result.data)  #
-            # logger.info(result.get("data"))
-            if not result["recipient_data"]["file"]:
+        requests = (RequestFormat(method="GET", endpoint="/download", params={'filename': filename}, return_type="stream") for filename in filenames)
+        # проверяем файлы параллельно, используя пул соединений клиента
+        async for response in client.request_many(requests, concurrency=10, ordered=False):
+            filename = response.request.params['filename']
+            if not response.is_stream:
+                logger.info(f"файл {filename}: ошибка запроса {response.status} {response.error}")
+                continue
+            # читаем ответ только до первых байт файла, остальное не скачиваем
+            decoder = Base64FieldDecoder(("recipient_data", "file"))
+            async with response.data as stream:
+                async for chunk in stream:
+                    if decoder.feed(chunk) or decoder.done:
+                        break
+            if not decoder.size:
                 logger.info(f"файл {filename} на сервере отсутствует")
-                return
+                continue
             logger.info(f"файл {filename} получен")
 
 #asyncio.run(check_file_AppRecordLoarder())
@@ -144,6 +168,47 @@ async def main():
     asyncio.create_task(lifestile_task(logger=logger, interval=300))  # запуск фоновой таски
     # Основная программа
 
+SEPARATION_CATEGORIES = ('DLAPI', 'CP', 'DLIVR', 'lost')
+SEPARATION_SKIPPED = 'skipped'          # строки без .mp3: не классифицируются, только считаются
+
+
+def classify_filename(line: str) -> tuple[str, str] | None:
+    """Имя аудиозаписи без пути и .mp3 и её сервис (категория для separation); None - в строке нет .mp3"""
+    parts = line.split(".mp3")
+    if len(parts) < 2:
+        return None
+    line = parts[-2].split("/")[-1]
+    lower = line.lower()
+    if 'dlapi' in lower:
+        return 'DLAPI', line
+    if 'cp' in lower:
+        return 'CP', line
+    if 'dlivr' in lower:
+        return 'DLIVR', line
+    return 'lost', line
+
+
+def separation_range(part: FileRange, shards_dir: str) -> dict[str, int]:
+    """separation для куска файла в отдельном процессе: пишет в свои шарды <категория>.<номер куска>.txt"""
+    counters = dict.fromkeys(SEPARATION_CATEGORIES + (SEPARATION_SKIPPED,), 0)
+    buffers: dict[str, list[str]] = {category: [] for category in SEPARATION_CATEGORIES}
+    for line in part.lines():
+        if len(line) == 0:
+            continue
+        classified = classify_filename(line)
+        if classified is None:
+            counters[SEPARATION_SKIPPED] += 1
+            continue
+        category, name = classified
+        buffers[category].append(name)
+        counters[category] += 1
+    for category, names in buffers.items():
+        if names:
+            with open(os.path.join(shards_dir, f"{category}.{part.index:05d}.txt"), 'w') as f:
+                f.write('\n'.join(names) + '\n')
+    return counters
+
+
 def separation(data: list, input_dir: str):
     try:
         # Формируем полный путь к входному файлу
@@ -167,45 +232,72 @@ def separation(data: list, input_dir: str):
                 open(output_files['lost'], 'a') as lost_file:
 
             counters = {'DLAPI': 0, 'CP': 0, 'DLIVR': 0, 'lost': 0}
+            skipped = 0
 
+            files = {'DLAPI': dlapi_file, 'CP': cp_file, 'DLIVR': dlivr_file, 'lost': lost_file}
             for line in data:
                 if len(line)==0:
                     continue
-                line = line.split(".mp3")[-2].split("/")[-1]
-                if 'dlapi' in line.lower():
-                    dlapi_file.write(line + '\n')
-                    counters['DLAPI'] += 1
-                elif 'cp' in line.lower():
-                    cp_file.write(line + '\n')
-                    counters['CP'] += 1
-                elif 'dlivr' in line.lower():
-                    dlivr_file.write(line + '\n')
-                    counters['DLIVR'] += 1
-                else:
-                    lost_file.write(line + '\n')
-                    counters['lost'] += 1
+                classified = classify_filename(line)
+                if classified is None:
+                    skipped += 1
+                    continue
+                category, line = classified
+                files[category].write(line + '\n')
+                counters[category] += 1
 
             logger.info("Обработка завершена!")
             for category, count in counters.items():
                 logger.info(f"{category}: {count} файлов")
             logger.info(f"Всего: {sum(counters.values())} файлов")
+            if skipped:
+                logger.warning(f"Пропущено строк без .mp3: {skipped}")
             logger.info(f"Результаты сохранены в: {output_dir}")
         return counters
     except Exception as e:
         logger.info(f"Произошла ошибка: {e}")
 
+def separation_parallel(input_file: str | Path, input_dir: str, workers: int | None = None) -> dict[str, int] | None:
+    """separation на всех ядрах: куски файла классифицируются в процессах, шарды склеиваются по порядку кусков,
+    поэтому результат тот же, что у последовательного прохода. Строки без .mp3 пропускаются и считаются
+    в counters['skipped']
+    """
+    big_file = FileManager()
+    output_dir = os.path.join(input_dir, "results")
+    shards_dir = os.path.join(output_dir, "shards")
+    os.makedirs(shards_dir, exist_ok=True)
+
+    def add(a: dict[str, int], b: dict[str, int]) -> dict[str, int]:
+        return {key: a[key] + b[key] for key in a}
+
+    try:
+        results = big_file.map_file_parallel(input_file, functools.partial(separation_range, shards_dir=shards_dir), workers=workers)
+        if results is None:
+            return None
+        for category in SEPARATION_CATEGORIES:
+            shards = (os.path.join(shards_dir, f"{category}.{index:05d}.txt") for index in range(len(results)))
+            big_file.merge_shards(shards, os.path.join(output_dir, f"{category}.txt"))
+    finally:
+        shutil.rmtree(shards_dir, ignore_errors=True)     # шарды прерванного прогона не должны попасть в следующий
+    counters = functools.reduce(add, results, dict.fromkeys(SEPARATION_CATEGORIES + (SEPARATION_SKIPPED,), 0))
+    skipped = counters.pop(SEPARATION_SKIPPED)
+    for category, count in counters.items():
+        logger.info(f"{category}: {count} файлов")
+    logger.info(f"Всего: {sum(counters.values())} файлов")
+    if skipped:
+        logger.warning(f"Пропущено строк без .mp3: {skipped}")
+    counters[SEPARATION_SKIPPED] = skipped
+    logger.info(f"Результаты сохранены в: {output_dir}")
+    return counters
+
 async def split_names():
     """разбиваем один файл на файлы с разными сервисами"""
     # Основная программа
-    big_file = FileManager()
     filenames = ['files_mp3_2025','files_in_archives_2025']
 
     for name in filenames:
-        # считываем из файла частями
-        for chunk in big_file.read_large_file_chunked(rf'C:\Users\beginin-ov\Projects\Local\files\{name}.txt', chunk_size=100000):
-            #logger.info(chunk)
-            separation(data = chunk, input_dir=r"C:\Users\beginin-ov\Projects\Local\files")
-            continue
+        # куски файла обрабатываются параллельно на всех ядрах
+        separation_parallel(rf'C:\Users\beginin-ov\Projects\Local\files\{name}.txt', input_dir=r"C:\Users\beginin-ov\Projects\Local\files")
 
     logger.info("Основной цикл программы завершен!")
 
@@ -0,0 +1,237 @@
+import asyncio
+import copy
+import dataclasses
+import hashlib
+import json
+import logging
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+
+@dataclass
+class CacheEntry:
+    """Сохранённый ответ"""
+    status: int
+    data: Any
+    url: str
+    size: int                           # размер тела в байтах (по нему считается лимит памяти)
+    expires_at: float                   # time.time(), после которого запись устарела
+    etag: str | None = None
+    last_modified: str | None = None
+    stored_at: float = field(default_factory=time.time)
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    @property
+    def can_revalidate(self) -> bool:
+        """Есть ли валидаторы для условного запроса (If-None-Match / If-Modified-Since)"""
+        return bool(self.etag or self.last_modified)
+
+
+@dataclass
+class CacheStats:
+    """Счётчики кеша"""
+    hits: int = 0               # ответ отдан из кеша без сети
+    misses: int = 0             # в кеше ничего не было (или запись без валидаторов устарела)
+    revalidations: int = 0      # сервер ответил 304, запись продлена
+    evictions: int = 0          # записи, вытесненные из памяти по лимиту байт
+    disk_evictions: int = 0     # файлы, удалённые с диска по лимиту disk_max_bytes
+    disk_hits: int = 0          # запись найдена на диске (входит в hits/revalidations)
+    stores: int = 0             # записано в кеш
+
+    def as_dict(self) -> dict[str, int]:
+        return dict(self.__dict__)
+
+
+def _copy_data(data: Any) -> Any:
+    """Копия тела ответа: dict/list из кеша не должны меняться вместе с ответом вызывающего"""
+    return data if isinstance(data, (str, bytes, type(None))) else copy.deepcopy(data)
+
+
+class HttpCache:
+    """Кеш HTTP-ответов: LRU в памяти с лимитом по байтам и необязательный дисковый уровень.
+    Ключ строится из метода, url, params и тела запроса. get() и set() работают с копиями тела,
+    поэтому изменение response.data не портит кеш. Дисковый уровень ограничен disk_max_bytes: при
+    превышении удаляются давно не читанные файлы, устаревшие записи без валидаторов удаляются при чтении.
+        cache = HttpCache(max_bytes=64 * 1024 * 1024, default_ttl=300, disk_dir="cache/http")
+        async with AsyncHttpClient(url=..., cache=cache) as client:
+            ...
+        client.cache_stats  # {'hits': ..., 'misses': ..., 'evictions': ...}
+    """
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        default_ttl: float = 60.0,
+        disk_dir: str | Path | None = None,
+        cache_methods: frozenset[str] = frozenset({"GET", "HEAD"}),
+        disk_max_bytes: int = 1024 * 1024 * 1024,
+    ):
+        self.max_bytes = max_bytes                  # лимит памяти под тела ответов
+        self.default_ttl = default_ttl              # время жизни записи, если в запросе не задан cache_ttl
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.cache_methods = cache_methods          # методы, которые кешируются без явного cache_ttl
+        self.disk_max_bytes = disk_max_bytes        # лимит дискового уровня
+        self.stats = CacheStats()
+        self.current_bytes = 0
+        self._memory: OrderedDict[str, CacheEntry] = OrderedDict()
+        self.logger = logging.getLogger(__name__)
+        self._disk_bytes: int | None = None         # занято на диске (считается при первой записи)
+        self._disk_lock = threading.Lock()          # запись и удаление идут в потоках asyncio.to_thread
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def make_key(method: str, url: str, params: dict | None = None, json_body: Any = None, data: Any = None, return_type: str = "", headers: dict | None = None) -> str:
+        """Ключ кеша: sha256 от метода, url, params и тела (и заголовков, если переданы)"""
+        if isinstance(data, bytes):
+            data = hashlib.sha256(data).hexdigest()
+        parts = [method.upper(), url, params or {}, json_body, data, return_type]
+        if headers is not None:
+            parts.append(headers)
+        raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def ttl_for(self, method: str, cache_ttl: float | None) -> float:
+        """TTL для запроса (0 - не кешировать)"""
+        if cache_ttl is not None:
+            return max(0.0, cache_ttl)
+        return self.default_ttl if method.upper() in self.cache_methods else 0.0
+
+    async def get(self, key: str) -> CacheEntry | None:
+        """Копия записи из памяти или с диска (в том числе устаревшая - её можно перепроверить)"""
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._memory.move_to_end(key)
+            return dataclasses.replace(entry, data=_copy_data(entry.data))
+        if not self.disk_dir:
+            return None
+        entry = await asyncio.to_thread(self._disk_read, key)
+        if entry is not None:
+            self.stats.disk_hits += 1
+            self._memory_put(key, entry)
+            entry = dataclasses.replace(entry, data=_copy_data(entry.data))
+        return entry
+
+    async def set(self, key: str, entry: CacheEntry) -> None:
+        self.stats.stores += 1
+        entry = dataclasses.replace(entry, data=_copy_data(entry.data))
+        self._memory_put(key, entry)
+        if self.disk_dir:
+            await asyncio.to_thread(self._disk_write, key, entry)
+
+    async def invalidate(self, key: str) -> None:
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self.current_bytes -= entry.size
+        if self.disk_dir:
+            await asyncio.to_thread(self._disk_remove, self._disk_path(key))
+
+    def clear(self) -> None:
+        """Очищает память (дисковый уровень не трогает)"""
+        self._memory.clear()
+        self.current_bytes = 0
+
+    def _memory_put(self, key: str, entry: CacheEntry) -> None:
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self.current_bytes -= old.size
+        if entry.size > self.max_bytes:
+            return  # в память не помещается, остаётся только на диске
+        self._memory[key] = entry
+        self.current_bytes += entry.size
+        while self.current_bytes > self.max_bytes and self._memory:
+            _, evicted = self._memory.popitem(last=False)
+            self.current_bytes -= evicted.size
+            self.stats.evictions += 1
+
+    #  Дисковый уровень
+    def _disk_path(self, key: str) -> Path:
+        return self.disk_dir / key[:2] / f"{key}.cache"
+
+    def _disk_read(self, key: str) -> CacheEntry | None:
+        path = self._disk_path(key)
+        try:
+            with open(path, "rb") as f:
+                entry = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            self.logger.warning(f"HttpCache - повреждённая запись {path}: {e}")
+            self._disk_remove(path)
+            return None
+        if not entry.fresh and not entry.can_revalidate:
+            # устаревшую запись без валидаторов перепроверить нельзя - она больше не нужна
+            self._disk_remove(path)
+            return None
+        try:
+            os.utime(path)      # вытеснение идёт по времени последнего чтения
+        except OSError:
+            pass
+        return entry
+
+    def _disk_write(self, key: str, entry: CacheEntry) -> None:
+        path = self._disk_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # своё имя у каждого писателя: одновременные записи одного ключа не портят чужой временный файл
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            size = tmp_path.stat().st_size
+            with self._disk_lock:
+                old_size = path.stat().st_size if path.exists() else 0
+                os.replace(tmp_path, path)
+                if self._disk_bytes is None:
+                    self._disk_bytes = sum(size for _, size, _ in self._disk_files())
+                else:
+                    self._disk_bytes += size - old_size
+                if self._disk_bytes > self.disk_max_bytes:
+                    self._disk_prune()
+        except Exception as e:
+            self.logger.warning(f"HttpCache - не удалось записать {path}: {e}")
+            tmp_path.unlink(missing_ok=True)
+
+    def _disk_remove(self, path: Path) -> None:
+        with self._disk_lock:
+            try:
+                size = path.stat().st_size
+                path.unlink()
+            except FileNotFoundError:
+                return
+            if self._disk_bytes is not None:
+                self._disk_bytes -= size
+
+    def _disk_files(self) -> list[tuple[float, int, Path]]:
+        """(время последнего чтения, размер, путь) всех записей на диске"""
+        files = []
+        for path in self.disk_dir.glob("*/*.cache"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def _disk_prune(self) -> None:
+        """Удаляет давно не читанные записи, пока диск не опустится до 90% лимита (запас - чтобы не сканировать
+        каталог на каждой записи). Вызывается под _disk_lock"""
+        files = sorted(self._disk_files())
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total <= self.disk_max_bytes * 0.9:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            self.stats.disk_evictions += 1
+        self._disk_bytes = total
+
+    def __repr__(self):
+        return f"<HttpCache entries={len(self._memory)} bytes={self.current_bytes}/{self.max_bytes} disk={self.disk_dir} stats={self.stats.as_dict()}>"
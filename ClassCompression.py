@@ -0,0 +1,235 @@
+import gzip
+import io
+import logging
+import os
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import BinaryIO, IO
+
+try:
+    import zstandard
+except ImportError:     # zstandard необязателен: без него работают только gzip и несжатые файлы
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# расширение -> формат; compression="auto" выбирает формат по последнему суффиксу файла
+EXTENSIONS: dict[str, str] = {".gz": "gzip", ".gzip": "gzip", ".zst": "zstd", ".zstd": "zstd"}
+DEFAULT_LEVELS: dict[str, int] = {"gzip": 6, "zstd": 3}
+_BLOCK = 4 * 1024 * 1024                # блок параллельного сжатия gzip и упреждающего чтения
+
+
+def detect_compression(path: str | Path, compression: str | None = "auto") -> str | None:
+    """Формат сжатия файла: "gzip", "zstd" или None (без сжатия).
+    compression="auto" - по расширению (.gz, .zst), иначе явное значение ("gzip", "zstd", None/"none")
+    """
+    if compression == "auto":
+        return EXTENSIONS.get(Path(path).suffix.lower())
+    if compression in (None, "none"):
+        return None
+    if compression not in DEFAULT_LEVELS:
+        raise ValueError(f"Неизвестный формат сжатия {compression!r}, доступны: auto, none, {', '.join(DEFAULT_LEVELS)}")
+    return compression
+
+
+def strip_compression_suffix(path: str | Path) -> tuple[Path, str]:
+    """("x.txt.gz") -> (Path("x.txt"), ".gz") - чтобы строить имена производных файлов с тем же сжатием"""
+    path = Path(path)
+    if path.suffix.lower() in EXTENSIONS:
+        return path.with_suffix(""), path.suffix
+    return path, ""
+
+
+def _require_zstd() -> None:
+    if zstandard is None:
+        raise ImportError("Сжатие zstd требует пакет zstandard (pip install zstandard)")
+
+
+def _threads(threads: int | None) -> int:
+    return max(1, threads if threads is not None else (os.cpu_count() or 1))
+
+
+class _PrefetchReader(io.RawIOBase):
+    """Распаковка в фоновом потоке: пока вызывающий код разбирает строки, следующий блок уже распаковывается
+    (zlib и zstd отпускают GIL). Распаковка одного потока gzip последовательна, так что это единственный
+    доступный параллелизм при чтении.
+    """
+    def __init__(self, source: BinaryIO, depth: int = 4):
+        super().__init__()
+        self._source = source
+        self._queue: queue.Queue = queue.Queue(maxsize=depth)
+        self._buffer = memoryview(b"")
+        self._eof = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._produce, name="decompress", daemon=True)
+        self._thread.start()
+
+    def _produce(self) -> None:
+        try:
+            while not self._stop.is_set():
+                block = self._source.read(_BLOCK)
+                self._put(block)
+                if not block:
+                    return
+        except BaseException as e:  # ошибка распаковки (битый архив) - поднимется в читающем потоке
+            self._put(e)
+
+    def _put(self, item) -> None:
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._buffer and not self._eof:
+            item = self._queue.get()
+            if isinstance(item, BaseException):
+                raise item
+            if not item:
+                self._eof = True
+            self._buffer = memoryview(item)
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+    def close(self) -> None:
+        if not self.closed:
+            self._stop.set()
+            self._thread.join()
+            self._source.close()
+        super().close()
+
+
+class _ParallelGzipWriter(io.RawIOBase):
+    """Параллельное сжатие gzip (как pigz): данные режутся на блоки по 4 МБ, каждый блок сжимается
+    отдельным членом gzip в пуле потоков, члены пишутся по порядку. Склейка членов - корректный gzip
+    (RFC 1952), его читают gzip/zcat/Python. Памяти - не больше ~2*threads блоков.
+    """
+    def __init__(self, raw: BinaryIO, level: int, threads: int):
+        super().__init__()
+        self._raw = raw
+        self._level = level
+        self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="gzip")
+        self._pending: deque[Future] = deque()
+        self._max_pending = threads * 2
+        self._block = bytearray()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._block += data
+        if len(self._block) >= _BLOCK:
+            self._submit()
+        return len(data)
+
+    def _submit(self) -> None:
+        block, self._block = bytes(self._block), bytearray()
+        self._pending.append(self._pool.submit(gzip.compress, block, self._level, mtime=0))
+        while len(self._pending) > self._max_pending:
+            self._raw.write(self._pending.popleft().result())
+
+    def close(self) -> None:
+        if not self.closed:
+            try:
+                if self._block:
+                    self._submit()
+                while self._pending:
+                    self._raw.write(self._pending.popleft().result())
+            finally:
+                self._pool.shutdown()
+                self._raw.close()
+        super().close()
+
+
+def wrap_reader(raw: BinaryIO, compression: str | None, prefetch: bool = True) -> BinaryIO:
+    """Распаковывающий бинарный поток поверх открытого файла (закрывается вместе с ним).
+    Позиция raw.tell() - сколько сжатых байт прочитано (для прогресса от размера файла)
+    """
+    if compression is None:
+        return raw
+    if compression == "gzip":
+        source = gzip.GzipFile(fileobj=raw, mode="rb")
+        source.myfileobj = raw  # GzipFile закрывает свой файл только если открыл его сам
+    else:
+        _require_zstd()
+        # read_across_frames - файл может состоять из нескольких кадров (дозапись mode="a")
+        source = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=True)
+    if not prefetch:
+        return source
+    return io.BufferedReader(_PrefetchReader(source), buffer_size=_BLOCK)
+
+
+def wrap_writer(raw: BinaryIO, compression: str | None, level: int | None = None, threads: int | None = None) -> BinaryIO:
+    """Сжимающий бинарный поток поверх открытого файла (закрывается вместе с ним).
+    threads - потоков сжатия (по умолчанию - по числу ядер)
+    """
+    if compression is None:
+        return raw
+    level = DEFAULT_LEVELS[compression] if level is None else level
+    threads = _threads(threads)
+    if compression == "gzip":
+        if threads == 1:
+            writer = gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=level, mtime=0)
+            writer.myfileobj = raw
+            return writer
+        return io.BufferedWriter(_ParallelGzipWriter(raw, level, threads), buffer_size=_BLOCK)
+    _require_zstd()
+    # у zstd многопоточность встроенная: кадр режется на задания, которые сжимают threads потоков
+    compressor = zstandard.ZstdCompressor(level=level, threads=threads if threads > 1 else 0)
+    return io.BufferedWriter(compressor.stream_writer(raw, closefd=True), buffer_size=_BLOCK)
+
+
+def open_file(path: str | Path, mode: str = "rt", compression: str | None = "auto", encoding: str | None = "utf-8",
+              errors: str | None = None, newline: str | None = None, level: int | None = None,
+              threads: int | None = None) -> IO:
+    """Открывает файл как open(), прозрачно сжимая/распаковывая gzip и zstd.
+    mode - r/w/a с b или t (по умолчанию текст). Дозапись (a) в сжатый файл добавляет новый член gzip /
+    кадр zstd - такие файлы читаются целиком как один поток.
+        with open_file("files_mp3_2025.txt.zst") as f:
+            for line in f:
+                ...
+        with open_file("results/DLAPI.txt.gz", "wt") as f:
+            f.write("...\\n")
+    """
+    if mode.strip("bt") not in ("r", "w", "a", "x"):
+        raise ValueError(f"Неподдерживаемый режим {mode!r}")
+    binary = "b" in mode
+    compression = detect_compression(path, compression)
+    if compression is None:
+        if binary:
+            return open(path, mode)
+        return open(path, mode, encoding=encoding, errors=errors, newline=newline)
+
+    raw = open(path, mode.strip("bt") + "b")
+    try:
+        stream = wrap_reader(raw, compression) if mode[0] == "r" else wrap_writer(raw, compression, level, threads)
+    except BaseException:
+        raw.close()
+        raise
+    if binary:
+        return stream
+    return io.TextIOWrapper(stream, encoding=encoding, errors=errors, newline=newline)
+
+
+def estimate_uncompressed_size(path: str | Path, compression: str | None = "auto", sample_size: int = _BLOCK) -> int:
+    """Оценка размера данных после распаковки по степени сжатия начала файла (для выбора режима и размеров буферов)"""
+    size = Path(path).stat().st_size
+    compression = detect_compression(path, compression)
+    if compression is None or not size:
+        return size
+    with open(path, "rb") as raw, wrap_reader(raw, compression, prefetch=False) as f:
+        data = f.read(sample_size)
+        consumed = raw.tell()
+    if len(data) < sample_size:
+        return len(data)        # файл распакован целиком
+    return int(size * len(data) / max(1, consumed))
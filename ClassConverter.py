@@ -8,11 +8,57 @@ import os
 import sys
 from pathlib import Path
 from openpyxl import Workbook
-from typing import Union, List
+from typing import Union, List, Generator
 import csv
 import logging
 from ClassLogger import LoggerConfig
 from ClassFiles import FileManager
+from ClassCompression import strip_compression_suffix
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:     # pyarrow необязателен: нужен только для Parquet/Arrow
+    pa = None
+
+
+# каталог имён аудиозаписей в колоночном виде: полный путь + производные типизированные колонки
+CATALOG_SERVICES = ('DLAPI', 'CP', 'DLIVR', 'lost')     # порядок проверки - как в Base.classify_filename
+CATALOG_FORMATS = {".parquet": "parquet", ".pq": "parquet", ".arrow": "ipc", ".feather": "ipc", ".ipc": "ipc"}
+if pa is not None:
+    CATALOG_SCHEMA = pa.schema([
+        ("path", pa.string()),                              # строка каталога как есть
+        ("name", pa.string()),                              # имя без каталогов и .mp3
+        ("service", pa.dictionary(pa.int8(), pa.string())),
+        ("date", pa.date32()),                              # первая дата ГГГГ/ММ/ДД (или через - и _) в пути
+        ("record_id", pa.int64()),                          # последняя группа из 6-18 цифр в имени (номер, id звонка)
+        ("source", pa.string()),                            # архив .tar из пути, иначе источник (имя каталога)
+    ])
+
+
+def _require_pyarrow() -> None:
+    if pa is None:
+        raise ImportError("Parquet/Arrow требуют пакет pyarrow (pip install pyarrow)")
+
+
+def catalog_batch(lines: list[str], source: str) -> "pa.RecordBatch":
+    """Строки каталога -> RecordBatch со схемой CATALOG_SCHEMA (все колонки считаются векторно, pyarrow.compute)"""
+    path = pc.utf8_trim_whitespace(pa.array(lines, pa.string()))
+    path = path.filter(pc.greater(pc.utf8_length(path), 0))
+    name = pc.struct_field(pc.extract_regex(path, r"(?:^|/)(?P<name>[^/]*?)(?:(?i:\.mp3))?$"), [0])
+    # сервис: первое совпадение в порядке CATALOG_SERVICES, иначе lost
+    found = [pc.match_substring(name, service.lower(), ignore_case=True) for service in CATALOG_SERVICES[:-1]]
+    indices = pc.case_when(pc.make_struct(*found), *[pa.scalar(i, pa.int8()) for i in range(len(CATALOG_SERVICES))])
+    service = pa.DictionaryArray.from_arrays(indices, pa.array(CATALOG_SERVICES))
+    ymd = pc.extract_regex(path, r"(?P<y>\d{4})[/_-](?P<m>\d{2})[/_-](?P<d>\d{2})")
+    day = pc.binary_join_element_wise(*(pc.struct_field(ymd, [i]) for i in range(3)), "-")
+    date = pc.cast(pc.strptime(day, format="%Y-%m-%d", unit="s", error_is_null=True), pa.date32())
+    record_id = pc.cast(pc.struct_field(pc.extract_regex(name, r"^(?:.*\D)?(?P<id>\d{6,18})(?:\D.*)?$"), [0]), pa.int64())
+    archive = pc.struct_field(pc.extract_regex(path, r"(?P<archive>[^/]+\.tar(?:\.gz)?)(?:/|$)"), [0])
+    source = pc.coalesce(archive, pa.scalar(source, pa.string()))
+    return pa.RecordBatch.from_arrays([path, name, service, date, record_id, source], schema=CATALOG_SCHEMA)
 
 
 class DataConverter:
@@ -370,6 +416,83 @@ class DataConverter:
         self._log_info(f"✅ Файл сохранен: {output_path}")
         self._log_info(f"📊 Обработано строк: {processed_lines}")
 
+    #  Колоночный каталог (Parquet / Arrow IPC)
+    def txt_to_parquet(self, input_file: Union[str, Path], output_file: Union[str, Path, None] = None,
+                       chunk_size: int = 500_000, source: str | None = None, compression: str = "zstd") -> bool:
+        """Каталог имён (txt, в т.ч. .gz/.zst) -> Parquet. Читается потоково (read_large_file_chunked),
+        каждый чанк - row group с колонками CATALOG_SCHEMA: service, date, record_id, source и т.д.
+        Повторное чтение - только нужные колонки, фильтр по статистике row group'ов (см. read_catalog).
+            converter.txt_to_parquet("audio_in_archives.txt")   # -> audio_in_archives.parquet
+        """
+        return self._txt_to_catalog(input_file, output_file, ".parquet", chunk_size, source, compression)
+
+    def txt_to_arrow(self, input_file: Union[str, Path], output_file: Union[str, Path, None] = None,
+                     chunk_size: int = 500_000, source: str | None = None, compression: str | None = "zstd") -> bool:
+        """Каталог имён -> файл Arrow IPC (Feather v2): читается через mmap почти без разбора, compression - zstd, lz4 или None"""
+        return self._txt_to_catalog(input_file, output_file, ".arrow", chunk_size, source, compression)
+
+    def _txt_to_catalog(self, input_file, output_file, suffix: str, chunk_size: int, source: str | None,
+                        compression: str | None) -> bool:
+        _require_pyarrow()
+        # вход и выход - относительно одного base_dir FileManager (как и чтение чанков ниже)
+        files = FileManager()
+        input_path = files._resolve_path(input_file)
+        base = strip_compression_suffix(input_path)[0]
+        output_path = files._resolve_path(output_file) if output_file else base.with_suffix(suffix)
+        source = source or base.stem
+        self.ensure_dir_exists(output_path)
+        processed = 0
+        try:
+            if CATALOG_FORMATS.get(output_path.suffix.lower(), "parquet") == "parquet":
+                writer = pq.ParquetWriter(output_path, CATALOG_SCHEMA, compression=compression or "none")
+            else:
+                options = pa.ipc.IpcWriteOptions(compression=compression)
+                writer = pa.ipc.new_file(str(output_path), CATALOG_SCHEMA, options=options)
+            with writer:
+                for chunk in files.read_large_file_chunked(input_path, chunk_size=chunk_size):
+                    batch = catalog_batch(chunk, source)
+                    writer.write_batch(batch)
+                    processed += batch.num_rows
+                    self._log_info(f"Обработано: {processed:,} строк")
+            self._log_info(f"Готово! {input_path.name} -> {output_path.name}, строк: {processed:,}, "
+                           f"{os.path.getsize(output_path):,} байт")
+            return True
+        except Exception as e:
+            self._log_error(f"Ошибка при конвертации {input_path} в {output_path.name}: {e}")
+            output_path.unlink(missing_ok=True)
+            return False
+
+    @staticmethod
+    def _catalog_dataset(path: Union[str, Path]) -> "ds.Dataset":
+        _require_pyarrow()
+        path = FileManager()._resolve_path(path)    # тот же base_dir, что и при записи txt_to_parquet/txt_to_arrow
+        return ds.dataset(str(path), format=CATALOG_FORMATS.get(Path(path).suffix.lower(), "parquet"))
+
+    def read_catalog(self, path: Union[str, Path], columns: List[str] | None = None, filter: "pc.Expression | None" = None,
+                     as_pandas: bool = False) -> "pa.Table | pd.DataFrame | None":
+        """Читает каталог Parquet/Arrow: только columns и только строки, прошедшие filter (векторно, в C++).
+        Для Parquet фильтр отбрасывает целые row group'ы по статистике min/max, не читая их.
+            from datetime import date
+            dlapi = converter.read_catalog("audio_in_archives.parquet", columns=["name", "date"],
+                                           filter=(pc.field("service") == "DLAPI") & (pc.field("date") >= date(2025, 10, 1)))
+        """
+        try:
+            table = self._catalog_dataset(path).to_table(columns=columns, filter=filter)
+            self._log_info(f"Каталог {Path(path).name} прочитан: {table.num_rows:,} строк")
+            return table.to_pandas() if as_pandas else table
+        except Exception as e:
+            self._log_error(f"Ошибка при чтении каталога {path}: {e}")
+            return None
+
+    def iter_catalog(self, path: Union[str, Path], columns: List[str] | None = None, filter: "pc.Expression | None" = None,
+                     batch_size: int = 131_072) -> Generator["pa.RecordBatch", None, None]:
+        """Потоковое чтение каталога пакетами (RecordBatch) - для файлов больше памяти"""
+        try:
+            yield from self._catalog_dataset(path).to_batches(columns=columns, filter=filter, batch_size=batch_size)
+        except Exception as e:
+            self._log_error(f"Ошибка при чтении каталога {path}: {e}")
+            yield from ()
+
     def ensure_dir_exists(self, path: Path) -> None:
         """Создает директорию, если её нет"""
         try:
@@ -0,0 +1,143 @@
+import hashlib
+import math
+from array import array
+
+
+class FingerprintSet:
+    """Множество строк по 64/128-битным отпечаткам в массиве с открытой адресацией (линейное пробирование).
+    Хранится только отпечаток - 8 или 16 байт на строку вместо объекта str и записи set (~100+ байт).
+    Цена - возможные коллизии: разные строки с одинаковым отпечатком считаются дубликатами
+    (ожидаемое число - expected_collisions(), для 64 бит и 30 млн строк это ~0.00002).
+        seen = FingerprintSet(bits=64, capacity=30_000_000)
+        if seen.add(line):
+            ... первое вхождение ...
+    """
+    _EMPTY = 0
+    _MAX_LOAD = 0.8
+
+    def __init__(self, bits: int = 64, capacity: int = 1 << 16):
+        if bits not in (64, 128):
+            raise ValueError(f"bits must be 64 or 128, got {bits}")
+        self.bits = bits
+        self.count = 0
+        self._allocate(max(16, int(capacity / self._MAX_LOAD) + 1))
+
+    def _allocate(self, size: int) -> None:
+        self._size = size
+        self._hi = array("Q", bytes(8 * size))
+        self._lo = array("Q", bytes(8 * size)) if self.bits == 128 else None
+        self._limit = int(size * self._MAX_LOAD)
+
+    def fingerprint(self, key: str | bytes) -> tuple[int, int]:
+        """Отпечаток (старшие 64 бита, младшие 64 бита или 0). 0 зарезервирован под пустую ячейку"""
+        if self.bits == 64:
+            # встроенный hash - SipHash, 64 бита (сид свой у каждого процесса, отпечатки живут в пределах процесса)
+            hi = hash(key) & 0xFFFFFFFFFFFFFFFF
+            return hi or 1, 0
+        digest = hashlib.blake2b(key.encode("utf-8") if isinstance(key, str) else key, digest_size=16).digest()
+        hi = int.from_bytes(digest[:8], "little")
+        return hi or 1, int.from_bytes(digest[8:], "little")
+
+    def add(self, key: str | bytes) -> bool:
+        """Добавляет строку. True - её отпечатка ещё не было (первое вхождение)"""
+        return self._insert(*self.fingerprint(key))
+
+    def _insert(self, hi: int, lo: int) -> bool:
+        table, low, size = self._hi, self._lo, self._size
+        i = hi % size
+        while True:
+            current = table[i]
+            if current == self._EMPTY:
+                table[i] = hi
+                if low is not None:
+                    low[i] = lo
+                self.count += 1
+                if self.count > self._limit:
+                    self._grow()
+                return True
+            if current == hi and (low is None or low[i] == lo):
+                return False
+            i += 1
+            if i == size:
+                i = 0
+
+    def _grow(self) -> None:
+        old_hi, old_lo = self._hi, self._lo
+        self.count = 0
+        self._allocate(self._size * 3 // 2)
+        for i, hi in enumerate(old_hi):
+            if hi != self._EMPTY:
+                self._insert(hi, old_lo[i] if old_lo is not None else 0)
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def nbytes(self) -> int:
+        return self._size * (16 if self.bits == 128 else 8)
+
+    def expected_collisions(self) -> float:
+        """Ожидаемое число уникальных строк, ошибочно принятых за дубликаты: ~n^2 / 2^(bits+1)"""
+        return self.count * self.count / 2 ** (self.bits + 1)
+
+    def __repr__(self):
+        return f"<FingerprintSet bits={self.bits} count={self.count} size={self._size} {self.nbytes / 2**20:.1f}MB>"
+
+
+class BloomFilter:
+    """Фильтр Блума: ~10 бит на строку при 1% ложных срабатываний (~1.2 МБ на миллион строк), но
+    ложное срабатывание - уникальная строка, принятая за дубликат. Размер рассчитывается на expected_items:
+    если строк окажется больше, доля ложных срабатываний растёт (см. expected_false_positives())
+        seen = BloomFilter(expected_items=30_000_000, false_positive_rate=0.001)
+        if seen.add(line):
+            ... первое вхождение (точно) ...
+    """
+    def __init__(self, expected_items: int, false_positive_rate: float = 0.001):
+        if not 0 < false_positive_rate < 1:
+            raise ValueError(f"false_positive_rate must be in (0, 1), got {false_positive_rate}")
+        expected_items = max(1, expected_items)
+        self.false_positive_rate = false_positive_rate
+        self.bits = max(64, math.ceil(-expected_items * math.log(false_positive_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.bits / expected_items * math.log(2)))
+        self.count = 0
+        self._array = bytearray((self.bits + 7) // 8)
+
+    def add(self, key: str | bytes) -> bool:
+        """Добавляет строку. True - строки точно не было; False - была (или ложное срабатывание)"""
+        digest = hashlib.blake2b(key.encode("utf-8") if isinstance(key, str) else key, digest_size=16).digest()
+        # двойное хеширование: k позиций из двух 64-битных хешей
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        bits, array_ = self.bits, self._array
+        new = False
+        for i in range(self.hashes):
+            position = (h1 + i * h2) % bits
+            byte, mask = position >> 3, 1 << (position & 7)
+            if not array_[byte] & mask:
+                array_[byte] |= mask
+                new = True
+        if new:
+            self.count += 1
+        return new
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._array)
+
+    def false_positive_probability(self, items: int | None = None) -> float:
+        """Вероятность ложного срабатывания после items добавленных строк (по умолчанию - текущих)"""
+        items = self.count if items is None else items
+        return (1 - math.exp(-self.hashes * items / self.bits)) ** self.hashes
+
+    def expected_false_positives(self, steps: int = 1000) -> float:
+        """Ожидаемое число уникальных строк, отброшенных как дубликаты, за все добавления (интеграл вероятности)"""
+        if not self.count:
+            return 0.0
+        width = self.count / steps
+        return sum(self.false_positive_probability((i + 0.5) * width) for i in range(steps)) * width
+
+    def __repr__(self):
+        return f"<BloomFilter bits={self.bits} hashes={self.hashes} count={self.count} {self.nbytes / 2**20:.1f}MB>"
@@ -2,17 +2,33 @@ import time
 import zipfile
 import tarfile
 import base64
+import codecs
+import functools
+import hashlib
+import heapq
+import math
+import shutil
 import os
 import argparse
 from pathlib import Path
 import sys
 from pathlib import Path
-from typing import List, Union, Generator, Any
+from typing import List, Union, Generator, Any, AsyncIterable, AsyncIterator, BinaryIO, Callable, Iterable, Literal, Sequence
+from itertools import groupby, islice
+from operator import itemgetter
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
 import asyncio
 import aiofiles
-import json
 import logging
 from ClassLogger import LoggerConfig
+from ClassJsonStream import Base64FieldDecoder
+from ClassLineIndex import LineIndex
+from ClassDedup import BloomFilter, FingerprintSet
+from ClassWriter import writer_service
+from ClassCompression import detect_compression, estimate_uncompressed_size, open_file, strip_compression_suffix, wrap_reader
+import ClassJsonCodec as fast_json
 # logger_config = LoggerConfig(log_file='ClassFiles.log', log_level= "INFO")
 # logger_config.setup_logger()
 # logger = logger_config.get_logger(__name__)
@@ -33,27 +49,362 @@ fm = FileManager(logger=logger)'''
 
 
 class Files:
+    fsync_policy: Literal["none", "file", "dir"] = "none"   # когда сбрасывать сохранённые файлы на диск (см. save_file)
+
     def __init__(self):
         self.file_lock = asyncio.Lock()
 
-    async def save_file(self, *, filename: str, file_base64: str, input_format: str) -> bool:
-        """Сохраняет файл на диск"""
+    async def save_file(self, *, filename: str, file_base64: str, input_format: str,
+                        fsync: Literal["none", "file", "dir"] | None = None) -> bool:
+        """Сохраняет файл на диск, не блокируя цикл событий: base64 раскодируется кусками и пишется
+        во временный файл в отдельном потоке, затем файл атомарно переименовывается (недописанный файл
+        под итоговым именем не появится).
+        fsync (по умолчанию - fsync_policy):
+            "none" - данные сбросит ОС (быстро, при отключении питания последние файлы могут пропасть)
+            "file" - fsync файла перед переименованием
+            "dir"  - ещё и fsync каталога после переименования (само переименование переживёт сбой, не в Windows)
+        """
         try:
-            file_bytes = base64.b64decode(file_base64)  # Декодирование из base64
-            if not os.path.exists(f"./{self.directory}"):
-                os.makedirs(f"./{self.directory}")
-            with open(f"{self.directory}/{filename}.{input_format}", "wb") as file:
-                file.write(file_bytes)
+            path = Path(self.directory) / f"{filename}.{input_format}"
+            await asyncio.to_thread(_write_base64_file, path, file_base64, fsync or self.fsync_policy)
             #print(f"Сохранили файл {filename}.{input_format} в каталог {self.directory}")
             return True
         except Exception as e:
             print(f"Ошибка сохранения файла {filename}: {e}")
             raise
 
+    async def save_file_stream(self, *, filename: str, chunks: AsyncIterable[bytes], input_format: str,
+                               field: tuple[str | int, ...] = ("recipient_data", "file")) -> bool:
+        """Сохраняет файл из JSON-ответа, не загружая его в память целиком.
+        chunks - чанки тела ответа, base64-поле по пути field раскодируется и пишется на диск по мере чтения.
+        Возвращает False, если поле пустое (файл не создаётся)
+        """
+        path = Path(self.directory) / f"{filename}.{input_format}"
+        tmp_path = path.with_name(f"{path.name}.part")
+        size = 0
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            async with aiofiles.open(tmp_path, "wb") as file:
+                async for data in Base64FieldDecoder(field).iter_decoded(chunks):
+                    await file.write(data)
+                    size += len(data)
+            if not size:
+                tmp_path.unlink(missing_ok=True)
+                return False
+            os.replace(tmp_path, path)
+            return True
+        except Exception as e:
+            tmp_path.unlink(missing_ok=True)
+            print(f"Ошибка сохранения файла {filename}: {e}")
+            raise
+
     async def save_file_async(self, filename: str):
-        async with self.file_lock:
-            async with aiofiles.open(self.not_files, 'a', encoding='utf-8') as f:
-                await f.write(f"{filename}\n")
+        """Добавляет имя в список not_files через фоновую запись (файл не открывается на каждый вызов)"""
+        await writer_service.get(self.not_files).write(f"{filename}\n")
+
+    async def close(self) -> None:
+        """Дописывает на диск всё, что стоит в очереди на запись"""
+        await writer_service.close(self.not_files)
+
+_B64_CHUNK = 256 * 1024          # символов base64 за раз: кратно 4 (куски раскодируются независимо) и достаточно мало, чтобы поток не держал GIL подолгу
+
+
+def _write_base64_file(path: Path, file_base64: str | bytes, fsync: str) -> None:
+    """Раскодирует base64 кусками во временный файл и атомарно переименовывает его в path (выполняется в потоке)"""
+    if fsync not in ("none", "file", "dir"):
+        raise ValueError(f"fsync must be 'none', 'file' or 'dir', got {fsync!r}")
+    if isinstance(file_base64, str):
+        newline, cr = "\n", "\r"
+    else:
+        newline, cr = b"\n", b"\r"
+    if newline in file_base64 or cr in file_base64:
+        # base64 с переносами строк (MIME) - убираем их, иначе куски не выровнены по 4 символа
+        file_base64 = file_base64.replace(cr, newline[:0]).replace(newline, newline[:0])
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.part")
+    try:
+        with open(tmp_path, "wb") as file:
+            for start in range(0, len(file_base64), _B64_CHUNK):
+                file.write(base64.b64decode(file_base64[start:start + _B64_CHUNK]))
+            if fsync != "none":
+                file.flush()
+                os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    if fsync == "dir" and os.name != "nt":
+        dir_fd = os.open(path.parent, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+@dataclass(frozen=True)
+class FileRange:
+    """Кусок файла [start, end) по границам строк - задание одному процессу в FileManager.map_file_parallel"""
+    path: str
+    index: int              # номер куска по порядку в файле (для шардов вывода)
+    start: int
+    end: int
+    encoding: str = "utf-8"
+    as_bytes: bool = False
+
+    def lines(self, block_size: int = 4 * 1024 * 1024) -> Generator[str | bytes, None, None]:
+        """Строки куска без перевода строки (блоками, декодирование - целым блоком)"""
+        newline, cr = (b"\n", b"\r") if self.as_bytes else ("\n", "\r")
+        with open(self.path, "rb") as f:
+            f.seek(self.start)
+            remaining, tail = self.end - self.start, b""
+            while remaining > 0:
+                block = f.read(min(block_size, remaining))
+                if not block:
+                    break
+                remaining -= len(block)
+                data = tail + block
+                cut = data.rfind(b"\n") + 1
+                if remaining > 0 or cut == len(data):
+                    data, tail = data[:cut], data[cut:]
+                else:
+                    tail = b""                  # последняя строка файла без \n
+                    data += b"\n"
+                if not data:
+                    continue
+                text = data if self.as_bytes else data.decode(self.encoding)
+                lines = text.split(newline)
+                lines.pop()
+                if cr in text:
+                    lines = [line[:-1] if line.endswith(cr) else line for line in lines]
+                yield from lines
+
+
+def split_file_ranges(path: str | Path, parts: int) -> list[tuple[int, int]]:
+    """Делит файл на parts байтовых диапазонов, границы сдвинуты на начало следующей строки"""
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, "rb") as f:
+        for i in range(1, parts):
+            position = size * i // parts
+            if position <= bounds[-1]:
+                continue
+            # дочитываем строку, в которую попала граница: следующий кусок начнётся с целой строки
+            f.seek(position - 1)
+            f.readline()
+            position = f.tell()
+            if position >= size:
+                break
+            if position > bounds[-1]:
+                bounds.append(position)
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+
+_SEQ_WIDTH = 16     # номер строки в записях внешней дедупликации: фиксированная ширина, сравнение байт = сравнение чисел
+
+
+_SET_FACTOR = 4         # set в памяти занимает ~4 размера строк
+_MAX_BUCKETS = 512      # бакетов за одно разбиение (открытых файлов одновременно)
+_MIN_BUFFER = 8 * 1024
+_MAX_SPLIT_DEPTH = 4    # глубже не делим: бакет из одной повторяющейся строки не делится хешем
+
+
+def _partition_buffer(budget: int, parts: int) -> int:
+    """Буфер одного файла при разбиении на parts бакетов: все буферы вместе - не больше половины бюджета"""
+    return max(_MIN_BUFFER, min(1024 * 1024, budget // (2 * parts)))
+
+
+def _dedup_bucket(bucket: str, budget: int = 0, depth: int = 0) -> tuple[int, int]:
+    """Дедупликация одного бакета в памяти (в процессе): записи <номер строки><строка> уже идут по возрастанию номера,
+    остаются первые вхождения, пишутся в <bucket>.uniq. Возвращает (строк, уникальных).
+    Бакет, который не помещается в budget байт, сначала делится дальше (_split_bucket)"""
+    if budget and os.path.getsize(bucket) * _SET_FACTOR > budget and depth < _MAX_SPLIT_DEPTH:
+        return _split_bucket(bucket, budget, depth)
+    seen = set()
+    total = unique = 0
+    with open(bucket, "rb") as f_in, open(bucket + ".uniq", "wb") as f_out:
+        out = []
+        for record in f_in:
+            total += 1
+            key = record[_SEQ_WIDTH:].strip()
+            if key not in seen:
+                seen.add(key)
+                out.append(record)
+                if len(out) >= 10000:
+                    f_out.writelines(out)
+                    out = []
+        f_out.writelines(out)
+        unique = len(seen)
+    os.remove(bucket)
+    return total, unique
+
+
+def _split_bucket(bucket: str, budget: int, depth: int) -> tuple[int, int]:
+    """Повторное разбиение слишком большого бакета другим хешем на под-бакеты; их .uniq сливаются
+    обратно по номеру строки в <bucket>.uniq, поэтому для вызывающего кода бакет остаётся одним файлом"""
+    size = os.path.getsize(bucket)
+    parts = min(_MAX_BUCKETS, max(2, math.ceil(size * _SET_FACTOR / budget)))
+    buffer = _partition_buffer(budget, parts)
+    paths = [f"{bucket}.{i:03d}" for i in range(parts)]
+    handles = [open(path, "wb", buffering=buffer) for path in paths]
+    try:
+        with open(bucket, "rb") as f_in:
+            for record in f_in:
+                # соль depth - иначе строки бакета снова попали бы в один под-бакет
+                handles[hash((depth, record[_SEQ_WIDTH:].strip())) % parts].write(record)
+    finally:
+        for handle in handles:
+            handle.close()
+    os.remove(bucket)
+    # под-бакет того же размера (одна и та же строка) делить дальше бесполезно - в памяти будет одна строка
+    stats = [_dedup_bucket(path, budget if os.path.getsize(path) < size else 0, depth + 1) for path in paths]
+    uniq_files = [open(path + ".uniq", "rb", buffering=buffer) for path in paths]
+    try:
+        with open(bucket + ".uniq", "wb", buffering=buffer) as f_out:
+            f_out.writelines(heapq.merge(*uniq_files, key=lambda r: r[:_SEQ_WIDTH]))
+    finally:
+        for handle in uniq_files:
+            handle.close()
+    for path in paths:
+        os.remove(path + ".uniq")
+    return sum(s[0] for s in stats), sum(s[1] for s in stats)
+
+
+@dataclass(frozen=True)
+class JsonlError:
+    """Строка JSONL, которую не удалось разобрать"""
+    line_no: int        # номер строки в файле (с 1)
+    line: str
+    error: str
+
+
+def _iter_jsonl_batches(path: Path, batch_size: int, compression: str | None) -> Generator[tuple[int, list[bytes]], None, None]:
+    """Пакеты сырых строк файла: (номер первой строки, строки в байтах)"""
+    with open_file(path, "rb", compression=compression) as f:
+        line_no = 1
+        while lines := list(islice(f, batch_size)):
+            yield line_no, lines
+            line_no += len(lines)
+
+
+def _parse_jsonl_batch(batch: tuple[int, list[bytes]], fields: tuple[str, ...] | None = None,
+                       encoding: str = "utf-8") -> tuple[list[Any], list[JsonlError]]:
+    """Разбор пакета строк JSONL (функция уровня модуля - выполняется и в процессах).
+    fields - оставить только эти поля (вложенные через точку: "recipient_data.filename"), отсутствующие - None.
+    Возвращает (записи, битые строки); пустые строки пропускаются
+    """
+    first, lines = batch
+    utf8 = codecs.lookup(encoding).name == "utf-8"
+    paths = [(name, name.split(".")) for name in fields] if fields else None
+    loads = fast_json.loads
+    records, errors = [], []
+    for line_no, line in enumerate(lines, start=first):
+        if not line.strip():
+            continue
+        try:
+            record = loads(line if utf8 else line.decode(encoding))
+        except ValueError as e:         # JSONDecodeError всех кодеков и UnicodeDecodeError - подклассы ValueError
+            errors.append(JsonlError(line_no, line.decode(encoding, "replace").rstrip("\r\n"), str(e)))
+            continue
+        if paths is not None:
+            projected = {}
+            for name, keys in paths:
+                value = record
+                for key in keys:
+                    value = value.get(key) if isinstance(value, dict) else None
+                projected[name] = value
+            record = projected
+        records.append(record)
+    return records, errors
+
+
+_LINE_OVERHEAD = 48     # байт памяти на строку сверх её длины при сортировке в памяти (объект bytes + ссылка в списке)
+_MERGE_FAN_IN = 128     # сколько отсортированных кусков сливается за раз (ограничение на открытые файлы)
+
+
+def _write_run(chunk: list[bytes], path: str, unique: bool) -> str:
+    chunk = sorted(set(chunk)) if unique else sorted(chunk)
+    with open(path, "wb", buffering=1024 * 1024) as f:
+        for start in range(0, len(chunk), 10000):
+            f.write(b"\n".join(chunk[start:start + 10000]) + b"\n")
+    return path
+
+
+def _sort_runs(lines: Iterable[bytes], run_prefix: str, budget: int, unique: bool) -> list[str]:
+    """Набирает строки на budget байт памяти, сортирует и пишет куски <run_prefix>_NNNN. Возвращает пути кусков"""
+    runs, chunk, used = [], [], 0
+    for line in lines:
+        chunk.append(line)
+        used += len(line) + _LINE_OVERHEAD
+        if used >= budget:
+            runs.append(_write_run(chunk, f"{run_prefix}_{len(runs):04d}", unique))
+            chunk, used = [], 0
+    if chunk:
+        runs.append(_write_run(chunk, f"{run_prefix}_{len(runs):04d}", unique))
+    return runs
+
+
+def _sort_range(part: FileRange, tmp_dir: str, budget: int, unique: bool) -> list[str]:
+    """Отсортированные куски одного диапазона файла (выполняется в процессе)"""
+    return _sort_runs(part.lines(), os.path.join(tmp_dir, f"run_{part.index:04d}"), budget, unique)
+
+
+def _merge_runs(runs: list[str], out: BinaryIO, unique: bool) -> int:
+    """k-путевое слияние отсортированных кусков (строки с \n) в out. Возвращает число записанных строк"""
+    files = [open(run, "rb", buffering=1024 * 1024) for run in runs]
+    try:
+        merged = heapq.merge(*files)
+        if unique:
+            merged = (line for line, _ in groupby(merged))
+        count = 0
+        while batch := list(islice(merged, 10000)):
+            out.writelines(batch)
+            count += len(batch)
+        return count
+    finally:
+        for f in files:
+            f.close()
+
+
+def _merge_all_runs(runs: list[str], out: BinaryIO, unique: bool, tmp_dir: Path) -> int:
+    """Слияние в несколько проходов, если кусков больше _MERGE_FAN_IN"""
+    level = 0
+    while len(runs) > _MERGE_FAN_IN:
+        merged = []
+        for start in range(0, len(runs), _MERGE_FAN_IN):
+            group, path = runs[start:start + _MERGE_FAN_IN], str(tmp_dir / f"merge_{level}_{start:06d}")
+            with open(path, "wb", buffering=1024 * 1024) as f:
+                _merge_runs(group, f, unique)
+            for run in group:
+                os.remove(run)
+            merged.append(path)
+        runs, level = merged, level + 1
+    return _merge_runs(runs, out, unique)
+
+
+SET_OPERATIONS = ("intersect", "difference", "union", "symmetric_difference")
+# (индекс первого файла, где есть строка, в скольких файлах она есть, всего файлов) -> пишется ли строка
+_SET_RULES: dict[str, Callable[[int, int, int], bool]] = {
+    "intersect": lambda first, count, total: count == total,
+    "difference": lambda first, count, total: first == 0 and count == 1,
+    "union": lambda first, count, total: True,
+    "symmetric_difference": lambda first, count, total: count % 2 == 1,
+}
+
+
+def _sorted_set_lines(path: Path, index: int, compression: str | None) -> Generator[tuple[bytes, int], None, None]:
+    """(строка, индекс файла) по отсортированному файлу без повторов и пустых строк; проверяет порядок"""
+    previous = None
+    with open_file(path, "rb", compression=compression) as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.rstrip(b"\r\n")
+            if not line or line == previous:
+                continue
+            if previous is not None and line < previous:
+                raise ValueError(f"{path} не отсортирован (строка {line_no}), сначала sort_large_file")
+            previous = line
+            yield line, index
+
 
 '''Готовы функции:
 new_dir_exists, write_json_async, read_large_file, read_large_file_chunked
@@ -88,32 +439,46 @@ class FileManager:
             raise
 
     async def write_json_async(self, file_path: str | Path, data_list: list[Any], append: bool = False, indent: int = None, encoding: str = "utf-8") -> bool:
-        """Асинхронная запись JSON файла с блокировкой
+        """Асинхронная запись JSON файла
         :arg
             file_path имя для файла
             data_list список сообщение для записи (записываем каждый элемент построчно)
             indent отступы задать числом (None - в строку
             append - добавять в файл или перезаписываться
+        При append=True строки уходят в фоновую пакетную запись (ClassWriter.writer_service): файл открыт один раз,
+        строки конкурентных вызовов пишутся общим пакетом. Вызов возвращает True, когда его строки на диске,
+        False - если запись не удалась.
         """
         path_file = self._resolve_path(file_path) # получаем абсолютный путь
         self.new_dir_exists(path_file)   # создаем директорию
-        async with self._json_lock:
-            try:
-                mode = "a" if append else "w"
-                async with aiofiles.open(path_file, mode, encoding=encoding) as f:
-                    lines = (json.dumps(item, ensure_ascii=False , indent=indent) + "\n" for item in data_list)
-                    await f.writelines(lines)
-                self._log_info(f"Добавлено {len(data_list)} записей в {path_file}")
-                return True
-            except Exception as e:
-                self._log_error(f"Ошибка при асинхронной записи JSON в {path_file}: {e}")
-                return False
+        try:
+            if append:
+                writer = writer_service.get(path_file, encoding=encoding)
+                await writer.write_many(fast_json.dumps(item, indent=indent) + "\n" for item in data_list)
+                await writer.flush()    # ошибка записи пакета поднимется здесь
+            else:
+                # перезапись: сначала дописываем то, что стоит в очереди на этот файл
+                await writer_service.close(path_file)
+                async with self._json_lock:
+                    async with aiofiles.open(path_file, "w", encoding=encoding) as f:
+                        await f.writelines(fast_json.dumps(item, indent=indent) + "\n" for item in data_list)
+            self._log_info(f"Добавлено {len(data_list)} записей в {path_file}")
+            return True
+        except Exception as e:
+            self._log_error(f"Ошибка при асинхронной записи JSON в {path_file}: {e}")
+            return False
 
     #  Чтение большого файла как итератора
 
-    def read_large_file(self, file_path: str | Path, encoding: str = "utf-8") -> Generator[str, None, None]:
+    def read_large_file(self, file_path: str | Path, encoding: str = "utf-8", start_line: int = 0,
+                        compression: str | None = "auto", index_dir: str | Path | None = None) -> Generator[str, None, None]:
         """
         Безопасно читает большой файл ПОСТРОЧНО (генератор).
+        start_line - с какой строки (с 0, считая пустые) начинать: переход через индекс строк (line_index), без
+        разбора начала файла по строкам. index_dir - каталог, где индекс сохраняется и переиспользуется при
+        следующих вызовах, пока файл не изменится (по умолчанию индекс только в памяти, рядом с данными ничего не пишется).
+        compression - "auto" (по расширению .gz/.zst), "gzip", "zstd" или None; сжатый файл распаковывается на лету
+        (start_line в сжатом файле - пропуск строк, индекс для него не строится).
         Пример:
             for line in fm.read_large_file("big.log"):
                 process(line)
@@ -126,24 +491,56 @@ class FileManager:
 
         try:
             self._log_info(f"Открытие файла для построчного чтения: {path}")
-            with open(path, "r", encoding=encoding) as f:
-                for i, line in enumerate(f, start=1):
-                    yield line.rstrip("\n")
+            i = start_line
+            compression = detect_compression(path, compression)
+            if start_line and compression is None:
+                with self.line_index(path, encoding=encoding, index_dir=index_dir) as index:
+                    for i, line in enumerate(index.iter_lines(start_line), start=start_line + 1):
+                        yield line
+            else:
+                with open_file(path, "rt", compression=compression, encoding=encoding) as f:
+                    for i, line in enumerate(islice(f, start_line, None), start=start_line + 1):
+                        yield line.rstrip("\n")
 
-                # Можно добавить отладочную информацию о количестве строк
-                self._log_info(f"Файл {path} успешно прочитан, всего строк: {i}")
+            # Можно добавить отладочную информацию о количестве строк
+            self._log_info(f"Файл {path} успешно прочитан, всего строк: {i}")
         except Exception as e:
             self._log_error(f"Ошибка при чтении большого файла {path}: {e}")
             yield from ()
 
+    def line_index(self, file_path: str | Path, step: int = 64, encoding: str = "utf-8",
+                   index_dir: str | Path | None = None) -> LineIndex:
+        """
+        Индекс строк файла для произвольного доступа. index_dir - каталог кеша индексов: индекс сохраняется туда
+        как <имя>.<хеш пути>.lidx и не строится заново, пока файл не изменится (None - только в памяти).
+        Пример:
+            with fm.line_index("big.log", index_dir="cache/lidx") as index:
+                total = len(index)
+                sample = index.read_lines(1_000_000, 1_000_010)
+        """
+        path = self._resolve_path(file_path)
+        index_path = None
+        if index_dir is not None:
+            digest = hashlib.sha1(str(path).encode("utf-8")).hexdigest()[:12]
+            index_path = self._resolve_path(index_dir) / f"{path.name}.{digest}.lidx"
+        return LineIndex(path, step=step, encoding=encoding, index_path=index_path)
+
     def read_large_file_chunked(
             self,
             file_path: str | Path,
             chunk_size: int = 10_000,
             encoding: str = "utf-8",
-    ) -> Generator[list[str], None, None]:
+            as_bytes: bool = False,
+            block_size: int = 4 * 1024 * 1024,
+            compression: str | None = "auto",
+    ) -> Generator[list[str] | list[bytes], None, None]:
         """
-        Читает большой файл ЧАНКАМИ (пакетами строк) с прогрессом.
+        Читает большой файл ЧАНКАМИ (пакетами строк) с прогрессом, за один проход.
+        Файл читается блоками по block_size байт, прогресс считается по позиции в файле от его размера.
+            as_bytes=True - строки отдаются как bytes без декодирования (для ASCII-списков имён файлов)
+        Перевод строки (\n или \r\n) в строки не попадает.
+        compression - "auto" (по расширению .gz/.zst), "gzip", "zstd" или None: распаковка идёт в фоновом потоке,
+        прогресс - по прочитанным сжатым байтам.
         Пример:
             for chunk in fm.read_large_file_chunked("big.log", chunk_size=5000):
                 process(chunk)
@@ -156,33 +553,43 @@ class FileManager:
             return
 
         try:
-            self._log_info(f"Подсчёт строк в файле: {path}")
-            with open(path, "r", encoding=encoding) as f:
-                total_lines = sum(1 for _ in f)
-            self._log_info(f"Всего строк в файле: {total_lines}")
-
-            self._log_info(f"Начато чтение файла чанками: {path} (chunk_size={chunk_size})")
+            total_bytes = path.stat().st_size
+            self._log_info(f"Начато чтение файла чанками: {path} ({total_bytes} байт, chunk_size={chunk_size})")
 
+            newline, cr = (b"\n", b"\r") if as_bytes else ("\n", "\r")
+            # инкрементальный декодер не режет многобайтные символы на границе блоков
+            decoder = None if as_bytes else codecs.getincrementaldecoder(encoding)()
+            tail = newline[:0]                  # незаконченная строка с конца прошлого блока
+            pending: list = []
             processed_lines = 0
-            chunk: list[str] = []
 
-            with open(path, "r", encoding=encoding) as f:
-                for line in f:
-                    chunk.append(line.rstrip("\n"))
-                    processed_lines += 1
+            with open(path, "rb") as raw, wrap_reader(raw, detect_compression(path, compression)) as f:
+                while True:
+                    block = f.read(block_size)
+                    final = not block
+                    data = tail + (block if as_bytes else decoder.decode(block, final))
+                    lines = data.split(newline)
+                    tail = lines.pop()          # после последнего \n - начало следующей строки
+                    if final and tail:
+                        lines.append(tail)
+                    if cr in data:
+                        lines = [line[:-1] if line.endswith(cr) else line for line in lines]
+                    pending.extend(lines)
 
-                    if len(chunk) >= chunk_size:
-                        percent = processed_lines / total_lines * 100
-                        self._log_info(f"Прогресс: {processed_lines}/{total_lines} строк ({percent:.1f}%)")
+                    position = raw.tell()
+                    start = 0
+                    while len(pending) - start >= chunk_size or (final and start < len(pending)):
+                        chunk = pending[start:start + chunk_size]
+                        start += len(chunk)
+                        processed_lines += len(chunk)
+                        percent = position / total_bytes * 100 if total_bytes else 100.0
+                        self._log_info(f"Прогресс: {processed_lines} строк, {position}/{total_bytes} байт ({percent:.1f}%)")
                         yield chunk
-                        chunk = []
+                    pending = pending[start:]
+                    if final:
+                        break
 
-                # оставшиеся строки
-                if chunk:
-                    self._log_info(f"Прогресс: {processed_lines}/{total_lines} строк (100%)")
-                    yield chunk
-
-            self._log_info(f"Чтение файла {path.name} завершено успешно.")
+            self._log_info(f"Чтение файла {path.name} завершено успешно, всего строк: {processed_lines}")
 
         except Exception as e:
             self._log_error(f"Ошибка при чтении файла {path}: {e}")
@@ -193,13 +600,13 @@ class FileManager:
 
     #  Запись строк в TXT
     # -------------------------------------------------------
-    def write_lines(self, file_path: Union[str, Path], lines: List[str], mode = 'w') -> bool:
-        """Записывает список строк построчно в txt-файл"""
+    def write_lines(self, file_path: Union[str, Path], lines: List[str], mode = 'w', compression: str | None = "auto") -> bool:
+        """Записывает список строк построчно в txt-файл (.gz/.zst - со сжатием, см. compression в write_large_file)"""
         path = self._resolve_path(file_path)
         self.new_dir_exists(path)
         encoding: str = "utf-8"
         try:
-            with open(path, "w", encoding=encoding) as f:
+            with open_file(path, "w", compression=compression, encoding=encoding) as f:
                 for line in lines:
                     f.write(f"{line}\n")
             self._log_info(f"Файл {path} успешно записан ({len(lines)} строк).")
@@ -212,13 +619,13 @@ class FileManager:
     # -------------------------------------------------------
     #  Запись в JSON
     # -------------------------------------------------------
-    def write_json(self, file_path: Union[str, Path], data: Any, encoding: str = "utf-8", indent: int = 4) -> bool:
-        """Сохраняет данные в JSON"""
+    def write_json(self, file_path: Union[str, Path], data: Any, encoding: str = "utf-8", indent: int | None = 4) -> bool:
+        """Сохраняет данные в JSON. indent=2 (или None) быстрый кодек пишет сам, другой отступ - через стандартный json"""
         path = self._resolve_path(file_path)
         self.new_dir_exists(path)
         try:
             with open(path, "w", encoding=encoding) as f:
-                json.dump(data, f, ensure_ascii=False, indent=indent)
+                f.write(fast_json.dumps(data, indent=indent))
             self._log_info(f"JSON файл {path} успешно записан.")
             return True
         except Exception as e:
@@ -235,8 +642,10 @@ class FileManager:
             self._log_error(f"Файл {path} не найден.")
             return None
         try:
-            with open(path, "r", encoding=encoding) as f:
-                data = json.load(f)
+            with open(path, "rb") as f:
+                raw = f.read()
+            # кодек разбирает UTF-8 байты напрямую, без промежуточной строки
+            data = fast_json.loads(raw if encoding.lower().replace("-", "") == "utf8" else raw.decode(encoding))
             self._log_info(f"JSON файл {path} успешно прочитан.")
             return data
         except Exception as e:
@@ -253,32 +662,264 @@ class FileManager:
             self._log_error(f"Файл {path} не найден.")
             return None
         try:
-            async with aiofiles.open(path, "r", encoding=encoding) as f:
-                content = await f.read()
-                data = json.loads(content)
+            async with aiofiles.open(path, "rb") as f:
+                raw = await f.read()
+            data = fast_json.loads(raw if encoding.lower().replace("-", "") == "utf8" else raw.decode(encoding))
             self._log_info(f"JSON файл {path} успешно прочитан (async).")
             return data
         except Exception as e:
             self._log_error(f"Ошибка при асинхронном чтении JSON из {path}: {e}")
             return None
 
-    def remove_duplicates_large_file(self, input_file: str, output_file=None, buffer_size=10000):
-        """Удаление дубликатов из очень больших файлов - построчная обработка с буферизацией"""
+    #  Потоковое чтение JSONL (одна JSON-запись на строку, как пишет write_json_async)
+    def read_jsonl(
+            self,
+            file_path: str | Path,
+            fields: Sequence[str] | None = None,
+            batch_size: int = 10_000,
+            workers: int = 1,
+            bad_lines: list[JsonlError] | None = None,
+            encoding: str = "utf-8",
+            compression: str | None = "auto",
+    ) -> Generator[Any, None, None]:
+        """
+        Читает JSONL по записям с постоянной памятью: строки разбираются пакетами по batch_size.
+            fields    - проекция: вместо всей записи словарь только с этими полями ("a.b" - вложенное поле)
+            workers   - при > 1 пакеты разбираются в процессах (ProcessPoolExecutor), порядок записей сохраняется
+            bad_lines - список, куда складываются битые строки (JsonlError); без него они только пропускаются
+            compression - "auto" (по расширению .gz/.zst), "gzip", "zstd" или None
+        Пример:
+            errors = []
+            for record in fm.read_jsonl("results.jsonl", fields=["filename", "status"], bad_lines=errors):
+                process(record)
+        """
+        path = self._resolve_path(file_path)
+        if not path.exists() or not path.is_file():
+            self._log_error(f"Файл {path} не найден или это не файл.")
+            yield from ()
+            return
+
+        parse = functools.partial(_parse_jsonl_batch, fields=tuple(fields) if fields else None, encoding=encoding)
+        batches = _iter_jsonl_batches(path, batch_size, detect_compression(path, compression))
+        pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        total = bad = 0
+        try:
+            self._log_info(f"Чтение JSONL {path} (batch_size={batch_size}, workers={workers})")
+            results = self._map_batches(pool, parse, batches, depth=workers * 2) if pool else map(parse, batches)
+            for records, errors in results:
+                total += len(records)
+                bad += len(errors)
+                if bad_lines is not None:
+                    bad_lines.extend(errors)
+                yield from records
+            self._log_info(f"JSONL {path} прочитан: записей {total}, битых строк {bad}")
+        except Exception as e:
+            self._log_error(f"Ошибка при чтении JSONL {path}: {e}")
+            yield from ()
+        finally:
+            batches.close()
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+    @staticmethod
+    def _map_batches(pool: Executor, func: Callable, batches: Iterable, depth: int) -> Generator[Any, None, None]:
+        """pool.map с ограниченным числом пакетов в работе (pool.map сразу читает весь итератор - весь файл)"""
+        pending: deque = deque()
+        for batch in batches:
+            pending.append(pool.submit(func, batch))
+            if len(pending) >= depth:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    async def read_jsonl_async(
+            self,
+            file_path: str | Path,
+            fields: Sequence[str] | None = None,
+            batch_size: int = 10_000,
+            executor: Literal["thread", "process"] = "thread",
+            workers: int | None = None,
+            bad_lines: list[JsonlError] | None = None,
+            encoding: str = "utf-8",
+            compression: str | None = "auto",
+    ) -> AsyncIterator[Any]:
+        """
+        Асинхронный вариант read_jsonl: чтение и разбор не блокируют цикл событий.
+            executor="thread"  - пакеты читаются и разбираются в потоке (asyncio.to_thread)
+            executor="process" - разбираются в workers процессах (по умолчанию - по числу ядер), пока читается следующий
+        Пример:
+            async for record in fm.read_jsonl_async("results.jsonl", fields=["filename"]):
+                ...
+        """
+        path = self._resolve_path(file_path)
+        if not path.exists() or not path.is_file():
+            self._log_error(f"Файл {path} не найден или это не файл.")
+            return
+
+        parse = functools.partial(_parse_jsonl_batch, fields=tuple(fields) if fields else None, encoding=encoding)
+        batches = _iter_jsonl_batches(path, batch_size, detect_compression(path, compression))
+        workers = workers or os.cpu_count() or 1
+        pool = ProcessPoolExecutor(max_workers=workers) if executor == "process" else None
+        loop = asyncio.get_running_loop()
+        pending: deque[asyncio.Future] = deque()
+        # пока разбирается пакет, читается следующий; в процессах - до 2 пакетов на процесс
+        depth = workers * 2 if pool else 2
+        exhausted = False
+        total = bad = 0
+        try:
+            self._log_info(f"Чтение JSONL {path} (async, batch_size={batch_size}, executor={executor})")
+            while True:
+                if not exhausted:
+                    batch = await asyncio.to_thread(next, batches, None)
+                    if batch is None:
+                        exhausted = True
+                    else:
+                        pending.append(loop.run_in_executor(pool, parse, batch))
+                if not pending:
+                    break
+                if exhausted or len(pending) >= depth:
+                    records, errors = await pending.popleft()
+                    total += len(records)
+                    bad += len(errors)
+                    if bad_lines is not None:
+                        bad_lines.extend(errors)
+                    for record in records:
+                        yield record
+            self._log_info(f"JSONL {path} прочитан: записей {total}, битых строк {bad}")
+        except Exception as e:
+            self._log_error(f"Ошибка при асинхронном чтении JSONL {path}: {e}")
+        finally:
+            for future in pending:
+                future.cancel()
+            await asyncio.to_thread(batches.close)
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+
+    #  Параллельная обработка большого файла
+    def map_file_parallel(
+            self,
+            file_path: str | Path,
+            func: Callable[[FileRange], Any],
+            workers: int | None = None,
+            reduce: Callable[[Any, Any], Any] | None = None,
+            encoding: str = "utf-8",
+            as_bytes: bool = False,
+            parts_per_worker: int = 4,
+    ) -> Any:
+        """
+        Обрабатывает файл на нескольких ядрах: файл делится на куски по границам строк,
+        каждый кусок - func(part: FileRange) в отдельном процессе (ProcessPoolExecutor).
+        Результаты возвращаются списком в порядке кусков в файле, при reduce - сворачиваются
+        (reduce(reduce(r0, r1), r2)...), поэтому итог не зависит от того, какой процесс закончил первым.
+        func должна быть функцией уровня модуля (или functools.partial от неё), чтобы её можно было передать в процесс.
+        Кодировка должна быть совместима с ASCII (utf-8, cp1251): куски режутся по байту \\n.
+        Пример:
+            def count_words(part: FileRange) -> Counter:
+                return Counter(word for line in part.lines() for word in line.split())
+            total = fm.map_file_parallel("big.txt", count_words, workers=8, reduce=operator.add)
+        """
+        path = self._resolve_path(file_path)
+        if not path.exists() or not path.is_file():
+            self._log_error(f"Файл {path} не найден или это не файл.")
+            return None
+        if "\n".encode(encoding) != b"\n":
+            self._log_error(f"map_file_parallel: кодировка {encoding} не совместима с ASCII")
+            return None
+        if detect_compression(path):
+            # в сжатом потоке нельзя начать чтение с произвольного байта
+            self._log_error(f"map_file_parallel: сжатый файл {path} нужно сначала распаковать")
+            return None
+
+        workers = workers or os.cpu_count() or 1
+        ranges = [FileRange(str(path), index, start, end, encoding, as_bytes)
+                  for index, (start, end) in enumerate(split_file_ranges(path, workers * parts_per_worker))]
+        self._log_info(f"Параллельная обработка {path}: {len(ranges)} кусков, {workers} процессов")
+        try:
+            if workers == 1 or len(ranges) <= 1:
+                results = [func(part) for part in ranges]
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    results = list(pool.map(func, ranges))
+        except Exception as e:
+            self._log_error(f"Ошибка при параллельной обработке {path}: {e}")
+            return None
+        self._log_info(f"Параллельная обработка {path} завершена")
+        if reduce is None:
+            return results
+        return functools.reduce(reduce, results) if results else None
+
+    def merge_shards(self, shards: Iterable[str | Path], output_file: str | Path, append: bool = True, remove: bool = True) -> bool:
+        """Склеивает файлы-шарды (например, вывод кусков map_file_parallel) в один в заданном порядке"""
+        path = self._resolve_path(output_file)
+        self.new_dir_exists(path)
+        try:
+            with open(path, "ab" if append else "wb") as out:
+                for shard in shards:
+                    shard = self._resolve_path(shard)
+                    if not shard.exists():
+                        continue
+                    with open(shard, "rb") as f:
+                        shutil.copyfileobj(f, out, 16 * 1024 * 1024)
+                    if remove:
+                        shard.unlink()
+            return True
+        except Exception as e:
+            self._log_error(f"Ошибка при склейке шардов в {path}: {e}")
+            return False
+
+    def remove_duplicates_large_file(
+            self,
+            input_file: str,
+            output_file=None,
+            buffer_size=10000,
+            mode: Literal["auto", "memory", "external", "fingerprint", "bloom"] = "memory",
+            memory_mb: int = 1024,
+            workers: int = 1,
+            hash_bits: int = 64,
+            false_positive_rate: float = 0.001,
+            expected_lines: int | None = None,
+            compression: str | None = "auto",
+    ):
+        """Удаление дубликатов из очень больших файлов - построчная обработка с буферизацией
+            mode="memory"   - все уникальные строки в set (быстро, но память растёт с числом строк; по умолчанию)
+            mode="external" - внешняя память: строки раскладываются по хешу в бакеты на диске, каждый бакет
+                              дедуплицируется в памяти (в workers процессах), порядок первых вхождений
+                              восстанавливается слиянием по номеру строки. Память - не больше memory_mb
+            mode="auto"     - external, если файл не помещается в memory_mb
+        Приближённые режимы (компактная память, редкие уникальные строки могут быть приняты за дубликаты):
+            mode="fingerprint" - вместо строк хранятся hash_bits-битные (64/128) отпечатки в массиве
+                                 с открытой адресацией: 30 млн строк при 64 битах - ~300 МБ вместо нескольких ГБ
+            mode="bloom"       - фильтр Блума с долей ложных срабатываний false_positive_rate
+        expected_lines - сколько строк ожидать (по умолчанию оценивается по началу файла), задаёт размер таблицы/фильтра.
+        В отчёте - ожидаемое число коллизий / ложных срабатываний.
+        compression - сжатие входного файла ("auto" - по расширению); результат сжимается по расширению output_file,
+        по умолчанию - тем же форматом, что и вход (DLAPI.txt.gz -> DLAPI_d.txt.gz).
+        """
 
         input_file = Path(os.path.join(r"C:\Users\beginin-ov\Projects\Local\files\results", input_file))
 
         # Автоматически формируем output_file если не передан
         if output_file is None:
-            output_file = input_file.parent / f"{input_file.stem}_d.txt"
+            base, suffix = strip_compression_suffix(input_file)
+            output_file = input_file.parent / f"{base.stem}_d.txt{suffix}"
         else:
             output_file = Path(output_file)
+        compression = detect_compression(input_file, compression)
+
+        if mode == "auto":
+            size = estimate_uncompressed_size(input_file, compression)
+            mode = "external" if size * 4 > memory_mb * 1024 * 1024 else "memory"
+        if mode == "external":
+            return self._remove_duplicates_external(input_file, output_file, memory_mb, workers, compression)
+        if mode in ("fingerprint", "bloom"):
+            return self._remove_duplicates_approximate(input_file, output_file, buffer_size, mode, hash_bits, false_positive_rate, expected_lines, compression)
 
         try:
             seen = set()
             buffer = []
             cnt = 0
-            with open(input_file, 'r', encoding='utf-8') as f_in, \
-                    open(output_file, 'w', encoding='utf-8') as f_out:
+            with open_file(input_file, 'r', compression=compression, encoding='utf-8') as f_in, \
+                    open_file(output_file, 'w', encoding='utf-8') as f_out:
                 self._log_info(f"Файл для обработки: {input_file}!")
                 for line in f_in:
                     cnt += 1
@@ -305,8 +946,255 @@ class FileManager:
         except Exception as e:
             self._log_error(f"Ошибка при удалении дубликатов в файле {input_file}: {e}")
 
+    def _remove_duplicates_approximate(self, input_file: Path, output_file: Path, buffer_size: int, mode: str,
+                                       hash_bits: int, false_positive_rate: float, expected_lines: int | None,
+                                       compression: str | None = None) -> None:
+        """Дедупликация по отпечаткам или фильтру Блума: тот же проход, что в mode="memory", но без хранения строк"""
+        try:
+            if expected_lines is None:
+                expected_lines = self._estimate_lines(input_file, compression)
+            if mode == "fingerprint":
+                seen = FingerprintSet(bits=hash_bits, capacity=expected_lines)
+            else:
+                seen = BloomFilter(expected_items=expected_lines, false_positive_rate=false_positive_rate)
+            is_new = seen.add
+            buffer = []
+            cnt = 0
+            with open_file(input_file, 'r', compression=compression, encoding='utf-8') as f_in, \
+                    open_file(output_file, 'w', encoding='utf-8') as f_out:
+                self._log_info(f"Файл для обработки: {input_file} ({seen!r}, ожидается строк: {expected_lines})")
+                for line in f_in:
+                    cnt += 1
+                    if is_new(line.strip()):
+                        buffer.append(line)
+                        if len(buffer) >= buffer_size:
+                            f_out.writelines(buffer)
+                            buffer = []
+                if buffer:
+                    f_out.writelines(buffer)
 
+            expected_errors = seen.expected_collisions() if mode == "fingerprint" else seen.expected_false_positives()
+            self._log_info(f"Обработан большой файл {input_file}!")
+            self._log_info(f"Всего строк: {cnt}")
+            self._log_info(f"Уникальных строк: {len(seen)}")
+            self._log_info(f"Дубликатов: {cnt - len(seen)}")
+            self._log_info(f"Память: {seen.nbytes / 2**20:.1f} МБ, ожидаемо уникальных строк, ошибочно принятых за дубликаты: {expected_errors:.6g}")
+        except Exception as e:
+            self._log_error(f"Ошибка при удалении дубликатов в файле {input_file}: {e}")
+
+    @staticmethod
+    def _estimate_lines(path: Path, compression: str | None = None, sample_size: int = 1024 * 1024) -> int:
+        """Оценка числа строк по средней длине строки в начале файла (для сжатого - от оценки распакованного размера)"""
+        size = estimate_uncompressed_size(path, compression)
+        with open(path, "rb") as raw, wrap_reader(raw, compression, prefetch=False) as f:
+            sample = f.read(sample_size)
+        lines = sample.count(b"\n")
+        if not lines or len(sample) >= size:
+            return max(lines, 1)
+        return int(size / (len(sample) / lines) * 1.1)
+
+    def _remove_duplicates_external(self, input_file: Path, output_file: Path, memory_mb: int, workers: int,
+                                    compression: str | None = None) -> None:
+        """Внешняя дедупликация: разбиение по хешу -> дедупликация бакетов -> слияние по номеру строки.
+        Строки обрабатываются как байты и пишутся без изменений (первое вхождение, как в mode="memory")
+        """
+        # в памяти одновременно по бакету на процесс; бакет больше своей доли бюджета делится повторно
+        budget = memory_mb * 1024 * 1024
+        bucket_budget = max(1, budget // max(1, workers))
+        size = estimate_uncompressed_size(input_file, compression)
+        buckets = min(_MAX_BUCKETS, max(1, math.ceil(size * _SET_FACTOR / bucket_budget)))
+        buffer = _partition_buffer(budget, buckets)
+        tmp_dir = output_file.parent / f".dedup_{output_file.stem}"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        paths = [str(tmp_dir / f"bucket_{i:04d}") for i in range(buckets)]
+        self._log_info(f"Внешняя дедупликация {input_file}: {buckets} бакетов, память {memory_mb} МБ, процессов {workers}")
+        try:
+            # 1. раскладываем строки по бакетам: <номер строки (16 цифр)><строка>
+            last_without_newline = -1
+            handles = [open(path, "wb", buffering=buffer) for path in paths]
+            try:
+                with open_file(input_file, "rb", compression=compression) as f_in:
+                    for seq, line in enumerate(f_in):
+                        if not line.endswith(b"\n"):
+                            last_without_newline, line = seq, line + b"\n"
+                        handles[hash(line.strip()) % buckets].write(b"%016d" % seq + line)
+            finally:
+                for handle in handles:
+                    handle.close()
+
+            # 2. дедупликация каждого бакета в памяти
+            dedup = functools.partial(_dedup_bucket, budget=bucket_budget)
+            if workers > 1 and buckets > 1:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    stats = list(pool.map(dedup, paths))
+            else:
+                stats = [dedup(path) for path in paths]
+            cnt, unique = sum(s[0] for s in stats), sum(s[1] for s in stats)
 
+            # 3. слияние уникальных строк по номеру - порядок первых вхождений как в исходном файле
+            uniq_files = [open(path + ".uniq", "rb", buffering=buffer) for path in paths]
+            try:
+                with open_file(output_file, "wb") as f_out:
+                    out, record = [], b""
+                    for record in heapq.merge(*uniq_files, key=lambda r: r[:_SEQ_WIDTH]):
+                        if len(out) >= 10000:
+                            f_out.writelines(out)
+                            out = []
+                        out.append(record[_SEQ_WIDTH:])
+                    # последняя строка файла без \n остаётся без \n (она может быть только последней и в выводе)
+                    if out and last_without_newline >= 0 and record[:_SEQ_WIDTH] == b"%016d" % last_without_newline:
+                        out[-1] = out[-1][:-1]
+                    f_out.writelines(out)
+            finally:
+                for handle in uniq_files:
+                    handle.close()
+
+            self._log_info(f"Обработан большой файл {input_file}!")
+            self._log_info(f"Всего строк: {cnt}")
+            self._log_info(f"Уникальных строк: {unique}")
+            self._log_info(f"Дубликатов: {cnt - unique}")
+        except Exception as e:
+            self._log_error(f"Ошибка при удалении дубликатов в файле {input_file}: {e}")
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+
+
+    #  Внешняя сортировка и операции над отсортированными файлами
+    def sort_large_file(
+            self,
+            input_file: str | Path,
+            output_file: str | Path | None = None,
+            memory_mb: int = 512,
+            workers: int = 1,
+            unique: bool = False,
+            compression: str | None = "auto",
+    ) -> bool:
+        """
+        Внешняя сортировка файла, который не помещается в память (побайтовый порядок строк = порядок Unicode для UTF-8).
+        1. куски файла сортируются в памяти (не больше memory_mb на все процессы) и пишутся во временные файлы,
+           при workers > 1 - параллельно по диапазонам файла (ProcessPoolExecutor)
+        2. куски сливаются k-путевым слиянием (heapq.merge), при большом их числе - в несколько проходов
+        unique=True - заодно убрать повторы (как sort -u). Перевод строки в выводе - \n, последняя строка тоже с \n.
+        Выход сжимается по расширению output_file (по умолчанию <имя>_sorted с тем же сжатием, что и вход).
+        Пример:
+            fm.sort_large_file("audio_in_archives.txt", "archives_sorted.txt", memory_mb=2048, workers=8, unique=True)
+        """
+        path = self._resolve_path(input_file)
+        if not path.exists() or not path.is_file():
+            self._log_error(f"Файл {path} не найден или это не файл.")
+            return False
+        if output_file is None:
+            base, suffix = strip_compression_suffix(path)
+            output_file = path.parent / f"{base.stem}_sorted{base.suffix}{suffix}"
+        output = self._resolve_path(output_file)
+        self.new_dir_exists(output)
+        compression = detect_compression(path, compression)
+        if workers > 1 and compression is not None:
+            self._log_info(f"Сжатый файл {path} нельзя читать по диапазонам - куски сортируются в одном процессе")
+            workers = 1
+
+        budget = max(1, memory_mb * 1024 * 1024 // workers)
+        tmp_dir = output.parent / f".sort_{output.stem}"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        self._log_info(f"Внешняя сортировка {path}: память {memory_mb} МБ, процессов {workers}, unique={unique}")
+        try:
+            if workers > 1:
+                ranges = [FileRange(str(path), index, start, end, as_bytes=True)
+                          for index, (start, end) in enumerate(split_file_ranges(path, workers))]
+                sort_range = functools.partial(_sort_range, tmp_dir=str(tmp_dir), budget=budget, unique=unique)
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    runs = [run for part_runs in pool.map(sort_range, ranges) for run in part_runs]
+            else:
+                with open_file(path, "rb", compression=compression) as f:
+                    runs = _sort_runs((line.rstrip(b"\r\n") for line in f), str(tmp_dir / "run"), budget, unique)
+            self._log_info(f"Отсортировано кусков: {len(runs)}, слияние в {output}")
+            with open_file(output, "wb") as out:
+                count = _merge_all_runs(runs, out, unique, tmp_dir)
+            self._log_info(f"Файл {path} отсортирован в {output}, строк: {count}")
+            return True
+        except Exception as e:
+            self._log_error(f"Ошибка при сортировке файла {path}: {e}")
+            output.unlink(missing_ok=True)      # недописанный результат
+            return False
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def sorted_set_operation(
+            self,
+            operation: Literal["intersect", "difference", "union", "symmetric_difference"],
+            inputs: Sequence[str | Path],
+            output_file: str | Path,
+            presorted: bool = True,
+            memory_mb: int = 512,
+            workers: int = 1,
+            compression: str | None = "auto",
+    ) -> int | None:
+        """
+        Операция над множествами строк двух и более файлов одним слиянием (память не зависит от размера файлов):
+            intersect            - строки, которые есть во всех файлах
+            difference           - строки первого файла, которых нет ни в одном из остальных
+            union                - строки хотя бы одного файла
+            symmetric_difference - строки, которые есть в нечётном числе файлов (для двух - ровно в одном, как a ^ b)
+        Файлы должны быть отсортированы побайтово (sort_large_file); presorted=False - отсортировать их сначала
+        (memory_mb, workers - для этой сортировки). Повторы и пустые строки не учитываются, вывод отсортирован.
+        Возвращает число строк результата (None - ошибка).
+        Пример - записи, которые есть в архивах, но нет в папках:
+            fm.sorted_set_operation("difference", ["audio_in_archives.txt", "audio_in_folders.txt"],
+                                    "only_in_archives.txt", presorted=False, memory_mb=2048, workers=8)
+        """
+        if operation not in _SET_RULES:
+            self._log_error(f"Неизвестная операция {operation!r}, доступны: {', '.join(SET_OPERATIONS)}")
+            return None
+        paths = [self._resolve_path(file_path) for file_path in inputs]
+        if len(paths) < 2:
+            self._log_error(f"{operation}: нужно не меньше двух файлов")
+            return None
+        missing = [str(path) for path in paths if not path.is_file()]
+        if missing:
+            self._log_error(f"Файлы не найдены: {', '.join(missing)}")
+            return None
+        output = self._resolve_path(output_file)
+        self.new_dir_exists(output)
+        tmp_dir = output.parent / f".setop_{output.stem}"
+        keep, total = _SET_RULES[operation], len(paths)
+        try:
+            compressions = [detect_compression(path, compression) for path in paths]
+            if not presorted:
+                tmp_dir.mkdir(parents=True, exist_ok=True)
+                sorted_paths = []
+                for index, path in enumerate(paths):
+                    sorted_path = tmp_dir / f"input_{index:03d}.txt"
+                    if not self.sort_large_file(path, sorted_path, memory_mb, workers, unique=True, compression=compressions[index]):
+                        return None
+                    sorted_paths.append(sorted_path)
+                paths, compressions = sorted_paths, [None] * total
+
+            self._log_info(f"{operation} {', '.join(path.name for path in paths)} -> {output}")
+            streams = [_sorted_set_lines(path, index, compressions[index]) for index, path in enumerate(paths)]
+            count = 0
+            with open_file(output, "wb") as out:
+                # кортежи (строка, индекс файла): одинаковые строки идут подряд, по возрастанию индекса файла
+                batch = []
+                for line, group in groupby(heapq.merge(*streams), key=itemgetter(0)):
+                    first = next(group)[1]
+                    if keep(first, 1 + sum(1 for _ in group), total):
+                        batch.append(line + b"\n")
+                        if len(batch) >= 10000:
+                            out.writelines(batch)
+                            count += len(batch)
+                            batch = []
+                out.writelines(batch)
+                count += len(batch)
+            self._log_info(f"{operation}: записано строк {count} в {output}")
+            return count
+        except Exception as e:
+            self._log_error(f"Ошибка при {operation} файлов {', '.join(map(str, inputs))}: {e}")
+            output.unlink(missing_ok=True)      # недописанный результат
+            return None
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
 
         #  Запись большого файла построчно (стриминг)
     def write_large_file(
@@ -314,18 +1202,22 @@ class FileManager:
             file_path: Union[str, Path],
             lines: Union[List[str], Generator[str, None, None], Any],
             mode: str = "a",
-            encoding: str = "utf-8"
+            encoding: str = "utf-8",
+            compression: str | None = "auto",
     ) -> bool:
         """
         Потоковая запись большого файла построчно.
         Можно передавать как список строк, так и генератор.
+        compression - "auto" (по расширению .gz/.zst), "gzip", "zstd" или None. Сжатие многопоточное
+        (gzip - блоками по 4 МБ в пуле потоков, zstd - встроенными потоками), дозапись добавляет новый член/кадр.
         Пример:
             fm.write_large_file("output.log", ("строка" for строка in data))
+            fm.write_large_file("output.log.zst", lines, mode="w")
         """
         path = self._resolve_path(file_path)
         self.new_dir_exists(path)
         try:
-            with open(path, mode, encoding=encoding) as f:
+            with open_file(path, mode, compression=compression, encoding=encoding) as f:
                 for line in lines:
                     f.write(f"{line}\n")
             self._log_info(f"Файл {path} успешно записан (write_large_file, mode={mode}).")
@@ -1,11 +1,27 @@
+import codecs
+import functools
 import logging
+import os
+import random
 import time
 import aiohttp
+import aiofiles
 import asyncio
 from dataclasses import dataclass, field
-from typing import Any, Dict, Literal
+from pathlib import Path
+from collections import deque
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+from typing import Any, AsyncIterable, AsyncIterator, BinaryIO, Callable, Dict, Iterable, Literal
 from json import JSONDecodeError
 import socket
+from contextvars import ContextVar
+from ClassCache import CacheEntry, HttpCache
+from ClassMetrics import HttpMetrics, LatencyHistogram, endpoint_template
+from ClassJsonStream import Base64FieldDecoder
+import ClassJsonCodec as fast_json
+from ClassLimiter import AdaptiveConcurrency, AdaptiveLimiter, RateLimiter, global_rate_limiter
+from ClassTransport import AiohttpTransport, HttpxTransport, Transport, TransportResponse, httpx
 
 @dataclass
 class ErrorInfo:
@@ -16,6 +32,21 @@ class ErrorInfo:
     context: str | None = None
 
 
+class DeadlineExceededError(Exception):
+    """Бюджет времени запроса (или пакета request_many) исчерпан, новая попытка не начиналась"""
+    def __init__(self, url: str):
+        super().__init__(url)
+        self.url = url
+
+
+class CircuitOpenError(Exception):
+    """Хост временно отключён предохранителем (circuit breaker), запрос не отправлялся"""
+    def __init__(self, host: str, retry_in: float):
+        super().__init__(f"{host} (повтор через {retry_in:.1f}с)")
+        self.host = host
+        self.retry_in = retry_in
+
+
 class ErrorHandler:
     """Централизованная обработка ошибок и формирование сообщений."""
     def __init__(self, logger: logging.Logger | None = None):
@@ -24,11 +55,17 @@ class ErrorHandler:
     async def handle(self, e: Exception, context: str = "") -> ErrorInfo:
         """Главный метод обработки ошибок"""
         # --- Классификация по типу ---
-        if isinstance(e, asyncio.TimeoutError): info = ErrorInfo("Сервер не ответил вовремя (TimeoutError).", "TimeoutError", "warning", context)
+        if isinstance(e, DeadlineExceededError): info = ErrorInfo(f"Истёк бюджет времени запроса (DeadlineExceeded): {e}", "DeadlineExceeded", "warning", context)
+        elif isinstance(e, CircuitOpenError): info = ErrorInfo(f"Хост недоступен, сработал предохранитель (CircuitOpenError): {e}", "CircuitOpenError", "warning", context)
+        elif isinstance(e, asyncio.TimeoutError): info = ErrorInfo("Сервер не ответил вовремя (TimeoutError).", "TimeoutError", "warning", context)
         elif isinstance(e, aiohttp.ClientConnectorError): info = ErrorInfo("Ошибка подключения к серверу (ClientConnectorError).", "ClientConnectorError", "error", context)
         elif isinstance(e, aiohttp.ClientResponseError): info = ErrorInfo(f"Ошибка HTTP-ответа: {e.status} {e.message}", "ClientResponseError", "error", context)
         elif isinstance(e, aiohttp.ClientPayloadError): info = ErrorInfo("Ошибка чтения тела ответа (ClientPayloadError).", "ClientPayloadError", "error", context)
         elif isinstance(e, aiohttp.ClientError): info = ErrorInfo(f"Ошибка клиента aiohttp: {e}", "ClientError", "error", context)
+        # httpx-транспорт: те же типы, что и у aiohttp, чтобы ошибки выглядели одинаково
+        elif httpx and isinstance(e, httpx.ConnectError): info = ErrorInfo("Ошибка подключения к серверу (ConnectError).", "ClientConnectorError", "error", context)
+        elif httpx and isinstance(e, (httpx.RemoteProtocolError, httpx.ReadError)): info = ErrorInfo(f"Ошибка чтения ответа ({type(e).__name__}): {e}", "ClientPayloadError", "error", context)
+        elif httpx and isinstance(e, httpx.HTTPError): info = ErrorInfo(f"Ошибка клиента httpx: {e}", "ClientError", "error", context)
         elif isinstance(e, JSONDecodeError): info = ErrorInfo("Ошибка декодирования JSON-ответа.", "JSONDecodeError", "error", context)
         elif isinstance(e, UnicodeDecodeError): info = ErrorInfo("Ошибка декодирования текста (UnicodeDecodeError).", "UnicodeDecodeError", "error", context)
         elif isinstance(e, ValueError): info = ErrorInfo(f"Некорректное значение: {e}", "ValueError", "warning", context)
@@ -49,6 +86,11 @@ class ErrorHandler:
 
         return info
 
+
+# Абсолютный срок (time.monotonic()) для запросов текущей задачи: задаётся RequestFormat.deadline или request_many(deadline=...)
+_deadline_at: ContextVar[float | None] = ContextVar("http_deadline_at", default=None)
+
+
 # Формат запроса
 @dataclass
 class RequestFormat:
@@ -59,14 +101,19 @@ class RequestFormat:
     json: Dict[str, Any] | None = None
     data: dict[str, Any] | str | bytes | None = None
     headers: dict[str, str] | None = None
-    return_type: Literal["json", "text", "bytes"] = "json"
+    return_type: Literal["json", "text", "bytes", "stream", "file"] = "json"
+    output: str | Path | BinaryIO | None = None    # куда писать тело ответа при return_type="file" (путь или бинарный файл)
+    chunk_size: int = 64 * 1024                     # размер чанка для return_type="stream" / "file"
+    base64_field: tuple[str | int, ...] | None = None  # для return_type="file": тело - JSON, в файл пишется base64-поле по этому пути
+    deadline: float | None = None                   # бюджет на весь вызов (все попытки и паузы между ними), сек
+    cache_ttl: float | None = None                  # время жизни ответа в кеше клиента (None - по умолчанию кеша, 0 - не кешировать)
 
     def __post_init__(self):
         """Просто приводим метод к верхнему регистру"""
         self.method = self.method.upper()
 
     def __repr__(self):
-        return f"<RequestFormat method={self.method} endpoint={self.endpoint} params={self.params} json={self.json} data={self.data} headers={self.headers} return_type={self.return_type}>"
+        return f"<RequestFormat method={self.method} endpoint={self.endpoint} params={self.params} json={self.json} data={self.data} headers={self.headers} return_type={self.return_type} output={self.output}>"
 
 # Формат ответа
 @dataclass
@@ -77,8 +124,12 @@ class ResponseFormat:
     url: str
     error: str | None = None
     success: bool = field(init=False)
+    error_type: str | None = None   # тип ошибки из ErrorInfo.type
     execute_time: float | None = None
     used_attempts: int = 0
+    size: int | None = None     # количество полученных байт тела (для "stream" счётчик ведёт ResponseStream.size, для base64_field - раскодированные байты, 0 - поле пустое)
+    request: RequestFormat | None = field(default=None, repr=False)     # исходный запрос (удобно при request_many(ordered=False))
+    from_cache: bool = False    # ответ взят из кеша (без сети или после 304 Not Modified)
 
     def __post_init__(self):
         """Автоматически определяем успешность запроса"""
@@ -103,6 +154,11 @@ class ResponseFormat:
         """True, если data является байтами"""
         return isinstance(self.data, bytes)
 
+    @property
+    def is_stream(self) -> bool:
+        """True, если data является потоковым телом ответа"""
+        return isinstance(self.data, ResponseStream)
+
     @property
     def error_message(self) -> str | None:
         """Возвращает сообщение ошибки из стандартных полей ответа"""
@@ -110,7 +166,203 @@ class ResponseFormat:
             return self.data.get("message") or self.data.get("msg") or self.data.get("error")
         return None
 
-    
+
+# Потоковое тело ответа
+# ---------------------------
+class ResponseStream:
+    """Тело ответа, которое читается чанками (return_type="stream").
+    Держит соединение открытым до конца чтения, поэтому его нужно дочитать или закрыть:
+        async with response.data as stream:
+            async for chunk in stream:
+                ...
+    """
+    def __init__(self, response: TransportResponse, chunk_size: int, start_time: float, logger: logging.Logger):
+        self._response = response
+        self.chunk_size = chunk_size
+        self.size = 0                               # сколько байт уже прочитано
+        self.execute_time: float | None = None      # полное время запроса (заполняется после дочитывания)
+        self.error: str | None = None
+        self.on_close: Callable[[int], None] | None = None  # вызывается один раз с size при закрытии (метрики)
+        self._start_time = start_time
+        self.logger = logger
+
+    @property
+    def closed(self) -> bool:
+        return self._response is None
+
+    def __aiter__(self) -> AsyncIterator[bytes]:
+        return self._iter_chunks()
+
+    async def _iter_chunks(self) -> AsyncIterator[bytes]:
+        if self._response is None:
+            return
+        try:
+            async for chunk in self._response.iter_chunks(self.chunk_size):
+                self.size += len(chunk)
+                yield chunk
+        except Exception as e:
+            self.error = str(e)
+            self.logger.error(f"Stream read failed: {self._response.method} {self._response.url} | Error: {e}")
+            raise
+        finally:
+            await self.aclose()
+
+    def close(self) -> None:
+        """Возвращает соединение в пул (или закрывает его, если тело не дочитано)"""
+        if self._response is not None:
+            self._response.release()
+            self._response = None
+            self._closed()
+
+    async def aclose(self) -> None:
+        """То же, что close(), но дожидается закрытия (нужно для httpx)"""
+        if self._response is not None:
+            response, self._response = self._response, None
+            await response.aclose()
+            self._closed()
+
+    def _closed(self) -> None:
+        self.execute_time = time.perf_counter() - self._start_time
+        if self.on_close is not None:
+            on_close, self.on_close = self.on_close, None
+            on_close(self.size)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.aclose()
+
+    def __repr__(self):
+        return f"<ResponseStream size={self.size} closed={self.closed}>"
+
+
+# Политика повторов
+# ---------------------------
+@dataclass
+class RetryPolicy:
+    """Когда и через сколько повторять запрос"""
+    max_retries: int = 2                                    # количество повторных попыток
+    retry_statuses: frozenset[int] = frozenset({408, 425, 429, 500, 502, 503, 504})  # статусы, при которых повторяем
+    idempotent_methods: frozenset[str] = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE", "TRACE"})
+    retry_non_idempotent: bool = False                      # повторять ли POST/PATCH при плохом статусе (сервер мог уже выполнить запрос)
+    retry_non_idempotent_errors: bool = True                # повторять ли POST/PATCH после таймаута или ошибки сети (как раньше);
+                                                            # False - после ошибок повторяются только идемпотентные методы
+    backoff_base: float = 1.0                               # базовая пауза, растёт как base * 2 ** attempt
+    backoff_max: float = 30.0                               # потолок паузы
+    respect_retry_after: bool = True                        # учитывать заголовок Retry-After
+    max_retry_after: float = 60.0                           # не ждать по Retry-After дольше этого
+    breaker_threshold: int | None = 5                       # ошибок подряд до отключения хоста (None - без предохранителя)
+    breaker_reset: float = 30.0                             # сколько секунд хост считается отключённым
+
+    def is_idempotent(self, method: str) -> bool:
+        return method.upper() in self.idempotent_methods
+
+    def should_retry_status(self, method: str, status: int) -> bool:
+        """Повторять ли запрос, получивший такой статус"""
+        return status in self.retry_statuses and (self.retry_non_idempotent or self.is_idempotent(method))
+
+    def should_retry_exception(self, method: str, e: Exception) -> bool:
+        """Повторять ли запрос после исключения"""
+        if isinstance(e, (CircuitOpenError, DeadlineExceededError)):
+            return False
+        if isinstance(e, aiohttp.ClientConnectorError) or (httpx and isinstance(e, httpx.ConnectError)):
+            return True  # соединение не установлено - запрос точно не дошёл до сервера
+        return self.retry_non_idempotent or self.retry_non_idempotent_errors or self.is_idempotent(method)
+
+    def backoff(self, attempt: int, retry_after: float | None = None) -> float:
+        """Пауза перед следующей попыткой: full jitter, но не меньше Retry-After"""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        if retry_after is not None and self.respect_retry_after:
+            delay = max(delay, min(retry_after, self.max_retry_after))
+        return delay
+
+    @staticmethod
+    def parse_retry_after(value: str | None) -> float | None:
+        """Retry-After бывает числом секунд или HTTP-датой"""
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+class CircuitBreaker:
+    """Предохранитель для одного хоста.
+    closed    - запросы идут как обычно
+    open      - после threshold ошибок подряд запросы сразу отклоняются на reset_timeout секунд
+    half_open - пропускается один пробный запрос: успех замыкает, ошибка снова размыкает
+    """
+    def __init__(self, threshold: int, reset_timeout: float):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state: Literal["closed", "open", "half_open"] = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+
+    def retry_in(self) -> float:
+        """Сколько секунд осталось до пробного запроса"""
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open":
+            if self.retry_in() > 0:
+                return False
+            self.state = "half_open"
+        if self._probe_in_flight:
+            return False
+        self._probe_in_flight = True
+        return True
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probe_in_flight = False
+        if self.state == "half_open" or self.failures >= self.threshold:
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def abort_probe(self) -> None:
+        """Пробный запрос отменён, не дождавшись ответа - следующий запрос снова может стать пробным"""
+        self._probe_in_flight = False
+
+    def __repr__(self):
+        return f"<CircuitBreaker state={self.state} failures={self.failures}>"
+
+
+@dataclass
+class HedgePolicy:
+    """Когда отправлять дублирующий (hedged) запрос.
+    Если ответа нет дольше percentile наблюдаемой задержки эндпоинта, уходит дубль,
+    берётся первый ответ, остальные отменяются
+    """
+    percentile: float = 95.0            # перцентиль задержки, после которого отправляется дубль
+    min_samples: int = 20               # пока замеров меньше, ждём initial_delay
+    initial_delay: float = 1.0
+    min_delay: float = 0.01             # границы задержки перед дублем
+    max_delay: float = 10.0
+    max_hedges: int = 1                 # сколько дублей на один запрос
+    max_hedge_ratio: float = 0.1        # дублей не больше этой доли от запросов (защита от лавины нагрузки)
+
+    def delay(self, histogram: LatencyHistogram) -> float:
+        """Сколько ждать ответа перед отправкой дубля"""
+        if histogram.count < self.min_samples:
+            return self.initial_delay
+        return min(self.max_delay, max(self.min_delay, histogram.percentile(self.percentile)))
+
+
 # Основной класс клиента
 # ---------------------------
 class AsyncHttpClient:
@@ -124,20 +376,51 @@ class AsyncHttpClient:
         limit: int = 100,
         limit_per_host: int = 10,
         verify_ssl: bool = True,
+        retry_policy: RetryPolicy | None = None,
+        cache: HttpCache | None = None,
+        single_flight: bool = False,
+        metrics: HttpMetrics | None = None,
+        adaptive_concurrency: AdaptiveConcurrency | None = None,
+        rate_limiter: RateLimiter | None = None,
+        transport: Literal["aiohttp", "httpx"] | Transport = "aiohttp",
+        http2: bool = False,
+        hedge_policy: HedgePolicy | None = None,
     ):
         self.url = url.rstrip("/")                # убирает лишний слэш в конце
-        self.timeout = aiohttp.ClientTimeout(total=timeout) # Таймаут для всех HTTP-запросов в секундах.
-        self.max_retries = max_retries                      # Количество повторных попыток при ошибках или таймаутах.
+        self.timeout = timeout                              # Таймаут для всех HTTP-запросов в секундах.
+        self.retry_policy = retry_policy or RetryPolicy(max_retries=max_retries)  # Когда и через сколько повторять запросы.
+        self.max_retries = self.retry_policy.max_retries    # Количество повторных попыток при ошибках или таймаутах.
+        self.breakers: dict[str, CircuitBreaker] = {}       # предохранители по хостам
         self.default_headers = headers or {}                # Словарь заголовков по умолчанию для всех запросов.
-        
-        #  Явный пул соединений
-        self.connector = aiohttp.TCPConnector(
-            limit=limit,                        # максимум соединений одновременно (для всего клиента).
-            limit_per_host=limit_per_host,      # максимум соединений на один хост.
-            ttl_dns_cache=300,                  # кеширование DNS 300 секунд.
-            ssl=verify_ssl,                     # проверять ли SSL-сертификаты
-        )
-        self.session: aiohttp.ClientSession | None = None
+        self.cache = cache                                  # кеш ответов (None - без кеша)
+        self.single_flight = single_flight                  # одинаковые одновременные GET выполняются одним запросом
+        self.coalesced = 0                                  # сколько вызовов получили ответ чужого запроса (single_flight)
+        self._in_flight: dict[str, asyncio.Task] = {}
+        self.metrics = metrics                              # сбор метрик по эндпоинтам и пулу (None - без метрик)
+        self.adaptive_concurrency = adaptive_concurrency   # AIMD-лимит запросов на хост (None - фиксированный limit_per_host)
+        self.limiters: dict[str, AdaptiveLimiter] = {}      # адаптивные лимиты по хостам
+        self.rate_limiter = rate_limiter or global_rate_limiter  # квоты rps (по умолчанию общие для процесса)
+        self.hedge_policy = hedge_policy                    # дублирующие запросы против «хвостов» задержки (None - без дублей)
+        self._hedge_latency: dict[tuple[str, str], LatencyHistogram] = {}   # задержки по эндпоинтам для выбора момента дубля
+        self._hedge_requests = 0
+        self._hedges_fired = 0
+        if adaptive_concurrency:
+            # потолок задаёт лимитер, пул не должен упираться раньше
+            limit_per_host = max(limit_per_host, adaptive_concurrency.max_limit)
+            limit = max(limit, limit_per_host)
+        if self.metrics:
+            self.metrics.bind_pool(limit, limit_per_host)
+
+        #  Транспорт с явным пулом соединений: aiohttp (по умолчанию) или httpx (умеет HTTP/2)
+        if transport == "aiohttp":
+            trace_configs = [self.metrics.trace_config()] if self.metrics else None
+            self.transport: Transport = AiohttpTransport(limit, limit_per_host, verify_ssl, timeout, self.default_headers, trace_configs)
+        elif transport == "httpx":
+            self.transport = HttpxTransport(limit, limit_per_host, verify_ssl, timeout, self.default_headers, http2=http2)
+        elif isinstance(transport, Transport):
+            self.transport = transport
+        else:
+            raise ValueError(f"Unsupported transport: {transport}")
         self.logger = logging.getLogger(__name__)
         self.error_handler = ErrorHandler(self.logger)
 
@@ -166,70 +449,279 @@ class AsyncHttpClient:
     # Управление сессией
     async def _ensure_session(self):
         """создание сессии, если её ещё нет или она закрыта. (без КМ, явное открытие)"""
-        if not self.session or self.session.closed:
-            self.session = aiohttp.ClientSession(
-                connector=self.connector,
-                headers=self.default_headers,
-                timeout=self.timeout,
-            )
+        if self.transport.closed:
+            await self.transport.open()
 
     async def close(self):
         """Закрывает сессию вручную (без КМ, явное закрытие)"""
-        if self.session and not self.session.closed:
-            await self.session.close()
+        await self.transport.close()
+
+    @property
+    def cache_stats(self) -> dict[str, int]:
+        """Счётчики кеша: hits, misses, revalidations, evictions, disk_hits, stores"""
+        return self.cache.stats.as_dict() if self.cache else {}
+
+    def snapshot(self) -> dict[str, Any]:
+        """Метрики клиента: задержки, байты, повторы и ошибки по эндпоинтам, состояние пула, кеш, квоты rps"""
+        if not self.metrics:
+            return {}
+        return {**self.metrics.snapshot(), "cache": self.cache_stats, "coalesced": self.coalesced, "rate_limits": self.rate_limiter.as_dict()}
 
     async def request_async(self, request: RequestFormat) -> ResponseFormat:
-        """Основной универсальный метод для HTTP-запросов"""
+        """Основной универсальный метод для HTTP-запросов.
+        request.deadline ограничивает весь вызов: попытки, паузы и ожидание лимитов. Каждая попытка
+        получает оставшееся время как таймаут, после истечения бюджета новые попытки не начинаются.
+        При single_flight=True одинаковые одновременные идемпотентные запросы (json/text/bytes)
+        выполняются одним HTTP-обменом, и все вызовы получают один и тот же ResponseFormat.
+        """
+        token = None
+        if request.deadline is not None:
+            deadline_at = time.monotonic() + request.deadline
+            current = _deadline_at.get()
+            token = _deadline_at.set(deadline_at if current is None else min(current, deadline_at))
+        try:
+            return await self._request_coalesced(request)
+        finally:
+            if token is not None:
+                _deadline_at.reset(token)
+
+    async def _request_coalesced(self, request: RequestFormat) -> ResponseFormat:
+        """Single-flight: присоединяется к такому же запросу, если он уже выполняется"""
+        if not self.single_flight or request.return_type not in ("json", "text", "bytes") or not self.retry_policy.is_idempotent(request.method):
+            return await self._request_hedged(request)
+        url = self._full_url(request.endpoint)
+        key = HttpCache.make_key(request.method, url, request.params, request.json, request.data, request.return_type,
+                                 headers={**self.default_headers, **(request.headers or {})})
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._request_hedged(request))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self.coalesced += 1
+            self.logger.debug(f"Single-flight: joined in-flight request {request.method} {url}")
+        # shield: отмена одного из ожидающих не отменяет общий запрос для остальных
+        return await asyncio.shield(task)
+
+    async def _request_hedged(self, request: RequestFormat) -> ResponseFormat:
+        """Выполняет запрос, при hedge_policy - с дублями для идемпотентных json/text/bytes запросов"""
+        policy = self.hedge_policy
+        if not policy or request.return_type not in ("json", "text", "bytes") or not self.retry_policy.is_idempotent(request.method):
+            return await self._request_measured(request)
+        url = self._full_url(request.endpoint)
+        key = (request.method, endpoint_template(url))
+        histogram = self._hedge_latency.setdefault(key, LatencyHistogram())
+        self._hedge_requests += 1
+        delay = policy.delay(histogram)
+        start_time = time.perf_counter()
+
+        primary = asyncio.create_task(self._request_measured(request))
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            while not done and len(tasks) <= policy.max_hedges and self._hedges_fired < policy.max_hedge_ratio * self._hedge_requests:
+                self._hedges_fired += 1
+                self.logger.debug(f"Hedge: no response after {delay:.3f}s, sending duplicate {request.method} {url}")
+                tasks.append(asyncio.create_task(self._request_measured(request)))
+                done, _ = await asyncio.wait(tasks, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            # проигравшие (или все, если отменили нас самих) отменяются
+            losers = [task for task in tasks if not task.done()]
+            for task in losers:
+                task.cancel()
+            if losers:
+                await asyncio.gather(*losers, return_exceptions=True)
+
+        winner = next(task for task in tasks if task in done)
+        response = winner.result()
+        if len(tasks) > 1 and self.metrics:
+            self.metrics.observe_hedge(request.method, url, won=winner is not primary)
+        if response.success and not response.from_cache:
+            histogram.record(response.execute_time)
+        if winner is not primary:
+            # для вызывающего время считается с первой попытки, а не с момента дубля
+            response.execute_time = time.perf_counter() - start_time
+        return response
+
+    async def _request_measured(self, request: RequestFormat) -> ResponseFormat:
+        """Выполняет запрос и учитывает его в метриках"""
+        if not self.metrics:
+            return await self._request_async(request)
+        self.metrics.request_started()
+        try:
+            response = await self._request_async(request)
+        finally:
+            self.metrics.request_finished()
+        self.metrics.observe(
+            request.method,
+            response.url,
+            execute_time=response.execute_time,
+            status=response.status,
+            retries=response.used_attempts,
+            bytes_in=response.size,
+            bytes_out=0 if response.from_cache else HttpMetrics.body_size(request.json, request.data),
+            error_type=response.error_type,
+            from_cache=response.from_cache,
+        )
+        if isinstance(response.data, ResponseStream):
+            # тело "stream" читает вызывающий: байты учитываются, когда поток дочитан или закрыт
+            response.data.on_close = functools.partial(self.metrics.observe_bytes_in, request.method, response.url)
+        return response
+
+    async def _request_async(self, request: RequestFormat) -> ResponseFormat:
+        """Выполняет запрос: кеш, повторы, предохранитель, чтение тела"""
         await self._ensure_session()
-        url = request.endpoint if request.endpoint.startswith("http") else f"{self.url}{request.endpoint}"
+        url = self._full_url(request.endpoint)
         merged_headers = {**self.default_headers, **(request.headers or {})}
         status: int | None = None
         error: str | None = None  # инициализация перед циклом
+        error_type: str | None = None
         content: Any = None
+        size: int | None = None
         start_time = time.perf_counter()
-        for attempt in range(self.max_retries + 1):
+
+        if request.return_type not in ("json", "text", "bytes", "stream", "file") or (request.return_type == "file" and request.output is None):
+            error = f"Unsupported return_type: {request.return_type}" if request.return_type != "file" else "return_type='file' requires output"
+            self.logger.error(f"Unsupported return_type in request: {request}")
+            return ResponseFormat(status=None, data=None, url=url, error=error, execute_time=time.perf_counter() - start_time, used_attempts=0, request=request, error_type="ValueError")
+        # позиция в переданном файловом объекте, чтобы при повторе перезаписать тело с начала
+        output_position = None
+        if request.return_type == "file" and not isinstance(request.output, (str, Path)) and request.output.seekable():
+            output_position = request.output.tell()
+
+        # кеш: свежая запись отдаётся без сети, устаревшая с валидаторами - перепроверяется условным запросом
+        cache_key, cache_ttl, cached = None, 0.0, None
+        if self.cache and request.return_type in ("json", "text", "bytes"):
+            cache_ttl = self.cache.ttl_for(request.method, request.cache_ttl)
+        if cache_ttl > 0:
+            # заголовки входят в ключ: ответы для разных Authorization/токенов не должны смешиваться
+            cache_key = HttpCache.make_key(request.method, url, request.params, request.json, request.data, request.return_type,
+                                           headers=merged_headers)
+            cached = await self.cache.get(cache_key)
+            if cached is not None and cached.fresh:
+                self.cache.stats.hits += 1
+                self.logger.debug(f"Cache hit: {request.method} {url}")
+                return ResponseFormat(status=cached.status, data=cached.data, url=url, execute_time=time.perf_counter() - start_time,
+                                      used_attempts=0, size=cached.size, request=request, from_cache=True)
+            if cached is not None and cached.can_revalidate:
+                if cached.etag:
+                    merged_headers["If-None-Match"] = cached.etag
+                if cached.last_modified:
+                    merged_headers["If-Modified-Since"] = cached.last_modified
+            else:
+                cached = None
+                self.cache.stats.misses += 1
+        validators: tuple[str | None, str | None] = (None, None)
+        from_cache = False
+
+        policy = self.retry_policy
+        breaker = self._get_breaker(url)
+        limiter = self._get_limiter(url)
+        deadline_at = _deadline_at.get()
+        for attempt in range(policy.max_retries + 1):
+            error = error_type = None
+            retry_after: float | None = None
+            retry = False
+            slot_started: float | None = None
+            outcome, latency = "ignore", None
+            budget_bound = False            # таймаут попытки урезан до остатка бюджета
             try:
+                if breaker and not breaker.allow():
+                    raise CircuitOpenError(urlsplit(url).netloc, breaker.retry_in())
+                await self._within_deadline(self.rate_limiter.acquire(url), deadline_at, url)
+                if limiter:
+                    slot_started = await self._within_deadline(limiter.acquire(), deadline_at, url)
+                # попытка получает не больше, чем осталось от бюджета
+                attempt_timeout = None
+                if deadline_at is not None:
+                    attempt_timeout = min(self.timeout, self._remaining(deadline_at, url))
+                    budget_bound = attempt_timeout < self.timeout
                 self.logger.debug(f"Request attempt {attempt + 1}: {request.method} {url} | params={request.params} json={request.json} data={request.data}")
 
-                async with self.session.request(
-                        method=request.method,
-                        url=url,
+                response = await self.transport.request(
+                        request.method,
+                        url,
                         params=request.params,
                         data=request.data,
                         json=request.json,
                         headers=merged_headers,
-                ) as response:
+                        timeout=attempt_timeout,
+                )
+                keep_open = False
+                try:
                     status = response.status
-
-                    if request.return_type == "json":
-                        try:
-                            content = await response.json(content_type=None)
-                        except (aiohttp.ContentTypeError, JSONDecodeError):
-                            content = await response.text()
-                    elif request.return_type == "text":
-                        content = await response.text()
-                    elif request.return_type == "bytes":
-                        content = await response.read()
+                    if limiter:
+                        # задержку считаем до заголовков, чтобы размер тела не выглядел как перегрузка
+                        latency = time.monotonic() - slot_started
+                        outcome = "overload" if status in self.adaptive_concurrency.overload_statuses else "ok" if status < 500 else "ignore"
+                    if breaker and status >= 500:
+                        breaker.record_failure()
+                    elif breaker:
+                        breaker.record_success()
+                    if attempt < policy.max_retries and policy.should_retry_status(request.method, status):
+                        # тело не читаем - попытка всё равно будет повторена
+                        retry = True
+                        retry_after = policy.parse_retry_after(response.headers.get("Retry-After"))
+                        self.logger.warning(f"Attempt {attempt + 1} got retryable status {status}: {request.method} {url}")
+                    elif status == 304 and cached is not None:
+                        # 304 Not Modified - тело не передавалось, берём сохранённое
+                        status, content, size, from_cache = cached.status, cached.data, cached.size, True
                     else:
-                        error = f"Unsupported return_type: {request.return_type}"
-                        end_time = time.perf_counter() - start_time
-                        self.logger.error(f"Unsupported return_type in request: {request}")
-                        return ResponseFormat(status=None, data=None,url=url, error=error, execute_time=end_time, used_attempts=attempt)
-                    # если успешный ответ или ошибка return_type, выходим
+                        content, size = await self._read_body(response, request, start_time, output_position)
+                        keep_open = isinstance(content, ResponseStream)
+                        validators = (response.headers.get("ETag"), response.headers.get("Last-Modified"))
+                finally:
+                    if not keep_open:
+                        await response.aclose()
+                if not retry:
+                    # если ответ окончательный, выходим
                     self.logger.debug(f"Response received: status={status} content_type={type(content)}")
                     break
 
-
+            except asyncio.CancelledError:
+                if breaker:
+                    breaker.abort_probe()
+                raise
             except Exception as e:
+                # оборвали по собственному бюджету - это не признак перегрузки или отказа upstream
+                own_deadline = isinstance(e, DeadlineExceededError) or budget_bound and isinstance(e, asyncio.TimeoutError) \
+                    or (deadline_at is not None and time.monotonic() >= deadline_at)
+                if isinstance(e, asyncio.TimeoutError) and own_deadline:
+                    # таймаут транспорта был урезан до остатка бюджета - это DeadlineExceeded, а не медленный сервер
+                    e = DeadlineExceededError(url)
+                elif isinstance(e, asyncio.TimeoutError):
+                    outcome = "overload"
+                if breaker and own_deadline:
+                    breaker.abort_probe()
+                elif breaker and not isinstance(e, CircuitOpenError):
+                    breaker.record_failure()
                 if self.error_handler:
                     err_info = await self.error_handler.handle(e, context=f"{request.method} {url}")
-                    error = err_info.message
+                    error, error_type = err_info.message, err_info.type
                 else:
-                    error = str(e)
+                    error, error_type = str(e), type(e).__name__
                     #self.logger.warning(f"Attempt {attempt + 1} failed for {request.method} {url}: {error}")
+                if not policy.should_retry_exception(request.method, e):
+                    break
+            finally:
+                if slot_started is not None:
+                    limiter.release(slot_started, outcome, latency)
+                    if self.metrics:
+                        self.metrics.set_concurrency(urlsplit(url).netloc, limiter.as_dict())
+
+            if attempt < policy.max_retries:
+                delay = policy.backoff(attempt, retry_after)
+                if deadline_at is not None and time.monotonic() + delay >= deadline_at:
+                    # после паузы бюджета уже не останется - повторять бессмысленно
+                    if not error:
+                        error, error_type = f"Deadline exceeded before retry: {request.method} {url}", "DeadlineExceeded"
+                    break
+                await asyncio.sleep(delay)
 
-            if attempt < self.max_retries:
-                await asyncio.sleep(2 ** attempt)
+        if cache_key and error is None:
+            await self._store_cached(cache_key, cache_ttl, cached, from_cache, status, content, url, size, validators)
 
         end_time = time.perf_counter() - start_time
         if error:
@@ -242,10 +734,220 @@ class AsyncHttpClient:
             data=content,
             url=url,
             error=error,
+            error_type=error_type,
             execute_time=end_time,
             used_attempts=attempt,
+            size=size,
+            request=request,
+            from_cache=from_cache,
         )
 
+    async def request_many(
+        self,
+        requests: Iterable[RequestFormat] | AsyncIterable[RequestFormat],
+        concurrency: int = 10,
+        ordered: bool = True,
+        deadline: float | None = None,
+    ) -> AsyncIterator[ResponseFormat]:
+        """Выполняет много запросов параллельно, не больше concurrency одновременно.
+        Запросы берутся из (асинхронного) итератора по мере освобождения слотов, поэтому
+        даже 10 млн запросов не превращаются в 10 млн задач.
+            ordered=True  - ответы отдаются в порядке запросов
+            ordered=False - ответы отдаются по мере готовности (исходный запрос в response.request)
+            deadline      - бюджет на весь пакет, сек: запросы получают не больше оставшегося времени,
+                            после его истечения оставшиеся запросы не отправляются, для каждого отдаётся
+                            ответ с error_type="DeadlineExceeded" (на каждый запрос - ровно один ответ)
+        Пример:
+            async for response in client.request_many(requests, concurrency=20, ordered=False):
+                process(response)
+        """
+        if concurrency < 1:
+            raise ValueError(f"concurrency must be >= 1, got {concurrency}")
+        await self._ensure_session()
+        source = self._aiter_requests(requests)
+        pending: deque[asyncio.Future] | set[asyncio.Future] = deque() if ordered else set()
+        exhausted = False
+        deadline_at = time.monotonic() + deadline if deadline is not None else None
+        started = expired = 0
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                # добираем задачи до лимита
+                while not exhausted and len(pending) < concurrency:
+                    try:
+                        request = await anext(source)
+                    except StopAsyncIteration:
+                        exhausted = True
+                        break
+                    if deadline_at is not None and (expired or time.monotonic() >= deadline_at):
+                        # бюджет пакета исчерпан: запрос не отправляем, но ответ на него отдаём
+                        expired += 1
+                        task = loop.create_future()
+                        task.set_result(self._deadline_response(request))
+                    else:
+                        started += 1
+                        task = asyncio.create_task(self._request_with_deadline(request, deadline_at))
+                    if ordered:
+                        pending.append(task)
+                    else:
+                        pending.add(task)
+                if not pending:
+                    break
+
+                if ordered:
+                    # в упорядоченном режиме окно ограничено: пока голова не готова, новые не стартуем
+                    yield await pending.popleft()
+                else:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        yield task.result()
+            if expired:
+                self.logger.warning(f"request_many: batch deadline {deadline}s exceeded after {started} requests, {expired} were not sent")
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    async def _request_with_deadline(self, request: RequestFormat, deadline_at: float | None) -> ResponseFormat:
+        """request_async со сроком пакета (контекст задачи свой, срок не утекает к вызывающему)"""
+        if deadline_at is not None:
+            _deadline_at.set(deadline_at)
+        return await self.request_async(request)
+
+    def _deadline_response(self, request: RequestFormat) -> ResponseFormat:
+        """Ответ на запрос, который не отправлялся: бюджет пакета request_many истёк раньше"""
+        url = self._full_url(request.endpoint)
+        return ResponseFormat(status=None, data=None, url=url, error=f"Batch deadline exceeded, request not sent: {request.method} {url}",
+                              error_type="DeadlineExceeded", execute_time=0.0, request=request)
+
+    @staticmethod
+    async def _aiter_requests(requests: Iterable[RequestFormat] | AsyncIterable[RequestFormat]) -> AsyncIterator[RequestFormat]:
+        """Приводит обычный или асинхронный итератор запросов к асинхронному"""
+        if hasattr(requests, "__aiter__"):
+            async for request in requests:
+                yield request
+        else:
+            for request in requests:
+                yield request
+
+    async def _store_cached(self, key: str, ttl: float, cached: CacheEntry | None, revalidated: bool, status: int | None,
+                            content: Any, url: str, size: int | None, validators: tuple[str | None, str | None]) -> None:
+        """Сохраняет успешный ответ в кеш или продлевает запись после 304"""
+        if revalidated:
+            self.cache.stats.revalidations += 1
+            cached.expires_at = time.time() + ttl
+            await self.cache.set(key, cached)
+            return
+        if cached is not None:
+            self.cache.stats.misses += 1    # запись изменилась на сервере - пришло новое тело
+        if status is None or not 200 <= status < 300:
+            return
+        etag, last_modified = validators
+        entry = CacheEntry(status=status, data=content, url=url, size=size or 0, expires_at=time.time() + ttl, etag=etag, last_modified=last_modified)
+        await self.cache.set(key, entry)
+
+    @staticmethod
+    def _remaining(deadline_at: float, url: str) -> float:
+        """Сколько осталось от бюджета (DeadlineExceededError, если ничего)"""
+        remaining = deadline_at - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceededError(url)
+        return remaining
+
+    async def _within_deadline(self, awaitable, deadline_at: float | None, url: str):
+        """Ожидание (квоты, слота лимитера) не дольше оставшегося бюджета"""
+        if deadline_at is None:
+            return await awaitable
+        try:
+            return await asyncio.wait_for(awaitable, self._remaining(deadline_at, url))
+        except asyncio.TimeoutError:
+            raise DeadlineExceededError(url) from None
+
+    def _full_url(self, endpoint: str) -> str:
+        return endpoint if endpoint.startswith("http") else f"{self.url}{endpoint}"
+
+    def _get_limiter(self, url: str) -> AdaptiveLimiter | None:
+        """Адаптивный лимит для хоста из url (создаётся при первом обращении)"""
+        if self.adaptive_concurrency is None:
+            return None
+        host = urlsplit(url).netloc
+        if host not in self.limiters:
+            self.limiters[host] = AdaptiveLimiter(self.adaptive_concurrency)
+        return self.limiters[host]
+
+    def _get_breaker(self, url: str) -> CircuitBreaker | None:
+        """Предохранитель для хоста из url (создаётся при первом обращении)"""
+        if self.retry_policy.breaker_threshold is None:
+            return None
+        host = urlsplit(url).netloc
+        if host not in self.breakers:
+            self.breakers[host] = CircuitBreaker(self.retry_policy.breaker_threshold, self.retry_policy.breaker_reset)
+        return self.breakers[host]
+
+    async def _read_body(self, response: TransportResponse, request: RequestFormat, start_time: float, output_position: int | None = None) -> tuple[Any, int]:
+        """Читает тело ответа в соответствии с return_type. Возвращает (данные, размер в байтах)"""
+        if request.return_type == "stream" and 200 <= response.status < 300:
+            return ResponseStream(response, chunk_size=request.chunk_size, start_time=start_time, logger=self.logger), 0
+        if request.return_type == "file" and 200 <= response.status < 300:
+            return request.output, await self._write_body(response, request, output_position)
+
+        # тело ошибки небольшое - для "stream"/"file" его просто читаем целиком как bytes
+        body = await response.read()
+        if request.return_type == "json":
+            try:
+                encoding = codecs.lookup(response.encoding).name
+            except LookupError:                 # неизвестный charset в Content-Type
+                encoding = "utf-8"
+            try:
+                # UTF-8 кодек разбирает из байт напрямую, другую кодировку из Content-Type (windows-1251) сначала декодируем
+                data = body if encoding == "utf-8" else body.decode(encoding)
+                content = fast_json.loads(data) if body.strip() else None
+            except (JSONDecodeError, UnicodeDecodeError):
+                content = body.decode(encoding, errors="replace")
+        elif request.return_type == "text":
+            content = body.decode(response.encoding)
+        else:
+            content = body
+        return content, len(body)
+
+    async def _write_body(self, response: TransportResponse, request: RequestFormat, output_position: int | None = None) -> int:
+        """Пишет тело ответа чанками в путь или файловый объект (return_type="file"), память не зависит от размера файла.
+        С base64_field тело разбирается как JSON и в файл пишется раскодированное поле (пустое поле - файл не создаётся)
+        """
+        size = 0
+        chunks: AsyncIterable[bytes] = response.iter_chunks(request.chunk_size)
+        if request.base64_field:
+            chunks = Base64FieldDecoder(request.base64_field).iter_decoded(chunks)
+        if isinstance(request.output, (str, Path)):
+            # пишем во временный файл и переименовываем: при обрыве не остаётся "половинки" файла
+            path = Path(request.output)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f"{path.name}.part")
+            try:
+                async with aiofiles.open(tmp_path, "wb") as f:
+                    async for chunk in chunks:
+                        await f.write(chunk)
+                        size += len(chunk)
+                if request.base64_field and not size:
+                    tmp_path.unlink(missing_ok=True)
+                    return 0
+                os.replace(tmp_path, path)
+            except BaseException:
+                tmp_path.unlink(missing_ok=True)
+                raise
+            return size
+
+        output: BinaryIO = request.output
+        if output_position is not None:
+            output.seek(output_position)
+            output.truncate()
+        async for chunk in chunks:
+            output.write(chunk)
+            size += len(chunk)
+        output.flush()
+        return size
+
 
 
 
@@ -0,0 +1,158 @@
+import datetime
+import json
+import os
+from typing import Any, Callable
+
+try:
+    import orjson
+except ImportError:     # orjson необязателен: без него - msgspec или стандартный json
+    orjson = None
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+def _iso_default(obj: Any) -> Any:
+    """Без default вызывающего datetime/date/time пишутся в ISO 8601 - как их пишут orjson и msgspec"""
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _std_dumps(obj: Any, indent: int | None, default: Callable[[Any], Any] | None, sort_keys: bool) -> str:
+    return json.dumps(obj, ensure_ascii=False, indent=indent, default=default or _iso_default, sort_keys=sort_keys)
+
+
+class JsonCodec:
+    """Стандартный json. Интерфейс общий для всех кодеков:
+        loads(bytes | str)                  -> объект (ошибка - json.JSONDecodeError / ValueError)
+        dumps(obj, indent, default, ...)    -> str, без экранирования не-ASCII (как ensure_ascii=False)
+        dumpb(obj, ...)                     -> bytes в UTF-8 (для файлов и тел запросов без лишнего encode)
+    Вывод кодеков совпадает, кроме:
+        datetime/date/time - передаются в default, если он задан (default=str -> "2025-01-31 10:00:00"),
+                             иначе ISO 8601 ("2025-01-31T10:00:00"). msgspec пишет их сам всегда в ISO 8601,
+                             UTC - как "Z" (остальные - "+00:00")
+        NaN/Infinity       - orjson и msgspec пишут null, стандартный json - NaN/Infinity (это не валидный JSON,
+                             orjson и msgspec такой файл не прочитают)
+    """
+    name = "json"
+
+    def loads(self, data: bytes | bytearray | memoryview | str) -> Any:
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        return json.loads(data)
+
+    def dumps(self, obj: Any, *, indent: int | None = None, default: Callable[[Any], Any] | None = None,
+              sort_keys: bool = False) -> str:
+        return _std_dumps(obj, indent, default, sort_keys)
+
+    def dumpb(self, obj: Any, *, indent: int | None = None, default: Callable[[Any], Any] | None = None,
+              sort_keys: bool = False) -> bytes:
+        return self.dumps(obj, indent=indent, default=default, sort_keys=sort_keys).encode("utf-8")
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.name}>"
+
+
+class OrjsonCodec(JsonCodec):
+    """orjson: в 3-10 раз быстрее стандартного. Отступ умеет только 2 пробела, поэтому
+    другой indent (и то, что orjson не кодирует, например int больше 64 бит) уходит в стандартный json
+    """
+    name = "orjson"
+
+    def loads(self, data: bytes | bytearray | memoryview | str) -> Any:
+        return orjson.loads(data)
+
+    def dumpb(self, obj: Any, *, indent: int | None = None, default: Callable[[Any], Any] | None = None,
+              sort_keys: bool = False) -> bytes:
+        if indent not in (None, 2):
+            return _std_dumps(obj, indent, default, sort_keys).encode("utf-8")
+        option = orjson.OPT_NON_STR_KEYS
+        if default is not None:
+            option |= orjson.OPT_PASSTHROUGH_DATETIME   # datetime - в default, как у стандартного json
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(obj, default=default, option=option)
+        except orjson.JSONEncodeError:
+            return _std_dumps(obj, indent, default, sort_keys).encode("utf-8")
+
+    def dumps(self, obj: Any, *, indent: int | None = None, default: Callable[[Any], Any] | None = None,
+              sort_keys: bool = False) -> str:
+        return self.dumpb(obj, indent=indent, default=default, sort_keys=sort_keys).decode("utf-8")
+
+
+class MsgspecCodec(JsonCodec):
+    """msgspec.json: по скорости близок к orjson, отступы - через msgspec.json.format"""
+    name = "msgspec"
+
+    def __init__(self):
+        self._decoder = msgspec.json.Decoder()
+        self._encoders: dict[tuple, "msgspec.json.Encoder"] = {}
+
+    def loads(self, data: bytes | bytearray | memoryview | str) -> Any:
+        try:
+            return self._decoder.decode(data)
+        except msgspec.DecodeError as e:
+            # ошибки разбора - как у стандартного json, чтобы except JSONDecodeError продолжал работать
+            raise json.JSONDecodeError(str(e), data if isinstance(data, str) else "", 0) from e
+
+    def dumpb(self, obj: Any, *, indent: int | None = None, default: Callable[[Any], Any] | None = None,
+              sort_keys: bool = False) -> bytes:
+        key = (default, sort_keys)
+        encoder = self._encoders.get(key)
+        if encoder is None:
+            encoder = self._encoders[key] = msgspec.json.Encoder(enc_hook=default, order="sorted" if sort_keys else None)
+        try:
+            data = encoder.encode(obj)
+        except (TypeError, OverflowError):
+            return _std_dumps(obj, indent, default, sort_keys).encode("utf-8")
+        return msgspec.json.format(data, indent=indent) if indent else data
+
+    def dumps(self, obj: Any, *, indent: int | None = None, default: Callable[[Any], Any] | None = None,
+              sort_keys: bool = False) -> str:
+        return self.dumpb(obj, indent=indent, default=default, sort_keys=sort_keys).decode("utf-8")
+
+
+CODECS: dict[str, type[JsonCodec]] = {"json": JsonCodec, "orjson": OrjsonCodec, "msgspec": MsgspecCodec}
+
+
+def make_codec(name: str = "auto") -> JsonCodec:
+    """Кодек по имени: "auto" - самый быстрый из установленных (orjson, msgspec, json)"""
+    if name == "auto":
+        name = "orjson" if orjson is not None else "msgspec" if msgspec is not None else "json"
+    if name not in CODECS:
+        raise ValueError(f"Неизвестный JSON-кодек {name!r}, доступны: auto, {', '.join(CODECS)}")
+    if (name == "orjson" and orjson is None) or (name == "msgspec" and msgspec is None):
+        raise ImportError(f"JSON-кодек {name!r} требует пакет {name} (pip install {name})")
+    return CODECS[name]()
+
+
+# кодек процесса: по умолчанию выбирается автоматически, переопределяется JSON_CODEC=json|orjson|msgspec или set_codec()
+_codec: JsonCodec = make_codec(os.environ.get("JSON_CODEC", "auto"))
+
+
+def get_codec() -> JsonCodec:
+    return _codec
+
+
+def set_codec(codec: str | JsonCodec) -> JsonCodec:
+    """Меняет кодек для всех модулей проекта (HTTP-клиент, файлы, логи, SSH)"""
+    global _codec
+    _codec = make_codec(codec) if isinstance(codec, str) else codec
+    return _codec
+
+
+def loads(data: bytes | bytearray | memoryview | str) -> Any:
+    return _codec.loads(data)
+
+
+def dumps(obj: Any, *, indent: int | None = None, default: Callable[[Any], Any] | None = None, sort_keys: bool = False) -> str:
+    return _codec.dumps(obj, indent=indent, default=default, sort_keys=sort_keys)
+
+
+def dumpb(obj: Any, *, indent: int | None = None, default: Callable[[Any], Any] | None = None, sort_keys: bool = False) -> bytes:
+    return _codec.dumpb(obj, indent=indent, default=default, sort_keys=sort_keys)
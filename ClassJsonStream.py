@@ -0,0 +1,217 @@
+import binascii
+import json
+import re
+from typing import AsyncIterable, AsyncIterator, Sequence
+
+
+# внутри строки интересны только конец строки и экранирование
+_STRING_SPECIAL = re.compile(rb'["\\]')
+_LITERAL_END = re.compile(rb'[\s,\]}]')
+_WHITESPACE = b" \t\r\n"
+
+
+def _escaped(buf: bytes, start: int, pos: int) -> bool:
+    """Экранирована ли кавычка на позиции pos (нечётное число обратных слешей перед ней)"""
+    count = 0
+    while pos - count - 1 >= start and buf[pos - count - 1] == 0x5C:
+        count += 1
+    return count % 2 == 1
+
+
+def _escape_start(buf: bytes, start: int, end: int) -> int:
+    """Начало незаконченной escape-последовательности в конце buf[start:end] (end, если всё закончено).
+    Незаконченной может быть только последняя: \\X - 2 байта, \\uXXXX - 6, поэтому хватает последних 6 байт
+    """
+    backslash = buf.rfind(b"\\", max(start, end - 6), end)
+    if backslash == -1 or _escaped(buf, start, backslash):
+        return end          # экранирования нет или последний слеш сам экранирован (пара \\)
+    size = 6 if buf[backslash + 1:backslash + 2] == b"u" else 2
+    return backslash if backslash + size > end else end
+
+
+def _unescape(part: bytes) -> bytes:
+    """Снимает JSON-экранирование с куска строки (\\/ -> /, \\n -> перевод строки и т.д.)"""
+    if b"\\" not in part:
+        return part
+    # в base64 обычно экранирован только "/" (так пишет PHP) - это снимается простой заменой
+    if part.count(b"\\") == part.count(b"\\/"):
+        return part.replace(b"\\/", b"/")
+    return json.loads(b'"' + part + b'"').encode("utf-8")
+
+
+class Base64FieldDecoder:
+    """Потоковое извлечение base64-поля из JSON-ответа.
+    JSON разбирается по мере поступления чанков, строка по пути path декодируется из base64
+    кусками, поэтому в памяти одновременно только текущий чанк, а не весь ответ и не весь файл.
+        decoder = Base64FieldDecoder(("recipient_data", "file"))
+        async for data in decoder.iter_decoded(response.content.iter_chunked(64 * 1024)):
+            f.write(data)
+        decoder.size  # 0 - поле пустое или null
+    """
+    def __init__(self, path: Sequence[str | int] = ("recipient_data", "file")):
+        self.path = tuple(path)
+        self.found = False          # поле встретилось в JSON
+        self.is_null = False        # поле равно null (или другому не строковому значению)
+        self.size = 0               # сколько байт раскодировано
+        self.done = False           # поле дочитано, остаток ответа не разбирается
+        self._buf = b""
+        self._stack: list[list] = []            # [("obj", текущий ключ) | ("arr", индекс)]
+        self._expect_key = False
+        self._string: str | None = None         # None | "key" | "value" | "target"
+        self._key_raw: list[bytes] = []
+        self._b64_tail = b""                    # остаток base64, не кратный 4 символам
+
+    def feed(self, chunk: bytes) -> bytes:
+        """Принимает очередной чанк JSON, возвращает раскодированные из него байты поля"""
+        if self.done:
+            return b""
+        self._buf += chunk
+        out: list[bytes] = []
+        buf, i, n = self._buf, 0, len(self._buf)
+        while i < n and not self.done:
+            if self._string is not None:
+                i, complete = self._read_string(buf, i, out)
+                if not complete:
+                    break
+                continue
+            c = buf[i:i + 1]
+            if c in b" \t\r\n":
+                i += 1
+            elif c == b"{":
+                self._begin_value()
+                self._stack.append(["obj", None])
+                self._expect_key = True
+                i += 1
+            elif c == b"[":
+                self._begin_value()
+                self._stack.append(["arr", 0])
+                i += 1
+            elif c in b"}]":
+                if self._stack:
+                    self._stack.pop()
+                self._expect_key = False
+                i += 1
+            elif c == b":":
+                self._expect_key = False
+                i += 1
+            elif c == b",":
+                if self._stack and self._stack[-1][0] == "obj":
+                    self._expect_key = True
+                elif self._stack:
+                    self._stack[-1][1] += 1
+                i += 1
+            elif c == b'"':
+                if self._stack and self._stack[-1][0] == "obj" and self._expect_key:
+                    self._string = "key"
+                    self._key_raw = []
+                else:
+                    self._string = "target" if self._current_path() == self.path else "value"
+                    if self._string == "target":
+                        self.found = True
+                i += 1
+            else:
+                # число, true/false/null - ждём разделитель, чтобы литерал не был разрезан чанком
+                match = _LITERAL_END.search(buf, i)
+                if match is None:
+                    break
+                if self._current_path() == self.path:
+                    self.found = self.is_null = self.done = True
+                i = match.start()
+        self._buf = buf[i:]
+        return b"".join(out)
+
+    def close(self) -> bytes:
+        """Конец ответа: дописывает остаток base64. ValueError, если поле оборвалось на середине"""
+        if self._string == "target" and not self.done:
+            raise ValueError(f"JSON оборвался внутри поля {'.'.join(map(str, self.path))}")
+        return self._flush_tail()
+
+    async def iter_decoded(self, chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+        """Раскодированные байты поля из асинхронного потока чанков JSON"""
+        async for chunk in chunks:
+            data = self.feed(chunk)
+            if data:
+                yield data
+            if self.done:
+                break
+        data = self.close()
+        if data:
+            yield data
+
+    #  Разбор
+    def _current_path(self) -> tuple:
+        return tuple(entry[1] for entry in self._stack)
+
+    def _begin_value(self) -> None:
+        if self._current_path() == self.path:
+            # поле есть, но это объект или массив, а не строка
+            self.found = self.is_null = self.done = True
+
+    def _read_string(self, buf: bytes, i: int, out: list[bytes]) -> tuple[int, bool]:
+        """Читает строку от позиции i. Возвращает (новая позиция, строка закончилась)"""
+        if self._string == "target":
+            return self._read_target(buf, i, out)
+        while True:
+            match = _STRING_SPECIAL.search(buf, i)
+            end = match.start() if match else len(buf)
+            self._string_part(buf[i:end], out)
+            if match is None:
+                return len(buf), False
+            if buf[end:end + 1] == b'"':
+                self._string_end(out)
+                return end + 1, True
+            # экранирование: \uXXXX - 6 байт, остальные - 2
+            size = 6 if buf[end + 1:end + 2] == b"u" else 2
+            if end + size > len(buf):
+                return end, False
+            if self._string == "key":
+                self._key_raw.append(buf[end:end + size])
+            i = end + size
+
+    def _read_target(self, buf: bytes, i: int, out: list[bytes]) -> tuple[int, bool]:
+        """Строка с base64: ищем конец и снимаем экранирование целыми кусками, а не по символу"""
+        end = buf.find(b'"', i)
+        while end != -1 and _escaped(buf, i, end):
+            end = buf.find(b'"', end + 1)
+        if end == -1:
+            # не режем экранирование на границе чанка: незаконченное остаётся в буфере до следующего чанка
+            cut = _escape_start(buf, i, len(buf))
+            self._string_part(_unescape(buf[i:cut]), out)
+            return cut, False
+        self._string_part(_unescape(buf[i:end]), out)
+        self._string_end(out)
+        return end + 1, True
+
+    def _string_part(self, part: bytes, out: list[bytes]) -> None:
+        if not part:
+            return
+        if self._string == "key":
+            self._key_raw.append(part)
+        elif self._string == "target":
+            data = self._b64_tail + part.translate(None, _WHITESPACE)
+            cut = len(data) // 4 * 4
+            self._b64_tail = data[cut:]
+            if cut:
+                decoded = binascii.a2b_base64(data[:cut])
+                self.size += len(decoded)
+                out.append(decoded)
+
+    def _string_end(self, out: list[bytes]) -> None:
+        if self._string == "key":
+            self._stack[-1][1] = json.loads(b'"' + b"".join(self._key_raw) + b'"')
+        elif self._string == "target":
+            out.append(self._flush_tail())
+            self.done = True
+        self._string = None
+
+    def _flush_tail(self) -> bytes:
+        """Раскодирует остаток base64, дополнив его до кратного 4"""
+        tail, self._b64_tail = self._b64_tail, b""
+        if not tail:
+            return b""
+        data = binascii.a2b_base64(tail + b"=" * (-len(tail) % 4))
+        self.size += len(data)
+        return data
+
+    def __repr__(self):
+        return f"<Base64FieldDecoder path={'.'.join(map(str, self.path))} found={self.found} size={self.size} done={self.done}>"
@@ -0,0 +1,200 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Literal
+from urllib.parse import urlsplit
+
+
+@dataclass
+class AdaptiveConcurrency:
+    """Настройки адаптивного (AIMD) лимита одновременных запросов на хост"""
+    initial_limit: int = 10                 # стартовый лимит
+    min_limit: int = 1
+    max_limit: int = 100
+    increase: float = 1.0                   # аддитивный рост: +increase за каждые limit успешных ответов
+    decrease_factor: float = 0.5            # мультипликативное снижение при перегрузке
+    latency_tolerance: float = 2.0          # рост останавливается, если задержка выросла больше чем в столько раз от базовой
+    overload_statuses: frozenset[int] = frozenset({429, 503})   # статусы, означающие перегрузку upstream
+
+
+class AdaptiveLimiter:
+    """Лимит одновременных запросов к одному хосту, подстраивается по AIMD:
+    растёт на 1 за «окно» успешных ответов, пока задержка не растёт, и режется вдвое при
+    таймаутах, 429 и 503. Ожидающие запросы получают слот в порядке очереди (FIFO).
+        started = await limiter.acquire()
+        ... запрос ...
+        limiter.release(started, "ok" | "overload" | "ignore", latency)
+    """
+    def __init__(self, config: AdaptiveConcurrency):
+        self.config = config
+        self.limit = float(config.initial_limit)
+        self.in_flight = 0
+        self.baseline: float | None = None      # «спокойная» задержка хоста (медленное EWMA, быстро падает вниз)
+        self.recent: float | None = None        # текущая задержка (быстрое EWMA)
+        self.increases = 0
+        self.decreases = 0
+        self._last_decrease = 0.0
+        self._waiters: deque[asyncio.Future] = deque()
+
+    async def acquire(self) -> float:
+        """Ждёт свободный слот. Возвращает время начала (для release)"""
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # слот уже был выдан - возвращаем его следующему
+                self.in_flight -= 1
+                self._wake()
+            raise
+        return time.monotonic()
+
+    def release(self, started: float, outcome: Literal["ok", "overload", "ignore"] = "ok", latency: float | None = None) -> None:
+        """Освобождает слот и подстраивает лимит по результату запроса (latency по умолчанию - время удержания слота)"""
+        self.in_flight -= 1
+        now = time.monotonic()
+        if outcome == "ok":
+            self._on_success(latency if latency is not None else now - started)
+        elif outcome == "overload" and started >= self._last_decrease:
+            # запросы, начатые до прошлого снижения, повторно лимит не режут
+            self.limit = max(float(self.config.min_limit), self.limit * self.config.decrease_factor)
+            self._last_decrease = now
+            self.decreases += 1
+        self._wake()
+
+    def _on_success(self, latency: float) -> None:
+        self.recent = latency if self.recent is None else self.recent * 0.8 + latency * 0.2
+        if self.baseline is None or latency < self.baseline:
+            self.baseline = latency
+        else:
+            self.baseline = self.baseline * 0.99 + latency * 0.01
+        # растём, только если лимит действительно используется и задержка не поползла вверх
+        if self.in_flight + 1 >= int(self.limit) and self.recent <= self.baseline * self.config.latency_tolerance:
+            self.limit = min(float(self.config.max_limit), self.limit + self.config.increase / self.limit)
+            self.increases += 1
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < int(self.limit):
+            future = self._waiters.popleft()
+            if not future.done():
+                self.in_flight += 1
+                future.set_result(None)
+
+    def as_dict(self) -> dict[str, float]:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "waiting": sum(1 for f in self._waiters if not f.done()),
+            "baseline_latency": round(self.baseline or 0.0, 6),
+            "recent_latency": round(self.recent or 0.0, 6),
+            "increases": self.increases,
+            "decreases": self.decreases,
+        }
+
+    def __repr__(self):
+        return f"<AdaptiveLimiter limit={int(self.limit)} in_flight={self.in_flight} waiting={len(self._waiters)}>"
+
+
+class TokenBucket:
+    """Token bucket: не больше rate запросов в секунду, всплеск до burst.
+    Токен резервируется сразу (баланс может уйти в минус), затем вызывающий спит до своего момента -
+    ожидающие обслуживаются по очереди. Блокировка потоковая и не держится во время сна, поэтому одна
+    квота работает из разных event loop (global_rate_limiter после повторного asyncio.run, потоки со своими loop)
+    """
+    def __init__(self, rate: float, burst: float = 1.0):
+        if rate <= 0:
+            raise ValueError(f"rate must be > 0, got {rate}")
+        self.rate = rate                # токенов в секунду
+        self.capacity = max(burst, 1.0) # сколько запросов можно отправить подряд без паузы
+        self.tokens = self.capacity
+        self.waited = 0                 # сколько раз запрос ждал токен
+        self.wait_time = 0.0            # суммарное ожидание, сек
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        with self._lock:
+            self._refill()
+            self.tokens -= tokens
+            delay = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            if delay:
+                self.waited += 1
+                self.wait_time += delay
+        if not delay:
+            return
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            with self._lock:                # запрос не состоялся - резерв возвращаем
+                self._refill()
+                self.tokens = min(self.capacity, self.tokens + tokens)
+            raise
+
+    def as_dict(self) -> dict[str, float]:
+        return {"rate": self.rate, "burst": self.capacity, "waited": self.waited, "wait_time": round(self.wait_time, 3)}
+
+    def __repr__(self):
+        return f"<TokenBucket rate={self.rate}/s burst={self.capacity} tokens={self.tokens:.2f}>"
+
+
+class RateLimiter:
+    """Квоты запросов в секунду по хосту и префиксу эндпоинта.
+    Запрос проходит через все подходящие квоты: общую на хост и более узкие на префиксы.
+        global_rate_limiter.add("api.example.com", rate=10)                          # 10 rps на весь хост
+        global_rate_limiter.add("api.example.com", rate=2, prefix="/download")       # и 2 rps на /download
+    Хост "*" - квота на каждый хост отдельно.
+    """
+    def __init__(self):
+        self._rules: list[tuple[str, str, float, float]] = []       # (host, prefix, rate, burst)
+        self._buckets: dict[tuple[str, str, str], TokenBucket] = {}  # (правило host, prefix, фактический host)
+
+    def add(self, host: str, rate: float, burst: float = 1.0, prefix: str = "") -> None:
+        """Добавляет (или заменяет) квоту"""
+        self.remove(host, prefix)
+        self._rules.append((host, prefix, rate, burst))
+
+    def remove(self, host: str, prefix: str = "") -> None:
+        self._rules = [rule for rule in self._rules if rule[:2] != (host, prefix)]
+        for key in [key for key in self._buckets if key[:2] == (host, prefix)]:
+            del self._buckets[key]
+
+    def buckets_for(self, url: str) -> list[TokenBucket]:
+        """Все квоты, под которые попадает url"""
+        if not self._rules:
+            return []
+        parts = urlsplit(url)
+        buckets = []
+        for host, prefix, rate, burst in self._rules:
+            if host not in ("*", parts.netloc, parts.hostname) or not parts.path.startswith(prefix):
+                continue
+            key = (host, prefix, parts.netloc if host == "*" else host)
+            if key not in self._buckets:
+                self._buckets[key] = TokenBucket(rate, burst)
+            buckets.append(self._buckets[key])
+        return buckets
+
+    async def acquire(self, url: str) -> None:
+        """Ждёт, пока запрос к url уложится во все квоты"""
+        for bucket in self.buckets_for(url):
+            await bucket.acquire()
+
+    def as_dict(self) -> dict[str, dict[str, float]]:
+        return {f"{key[2]}{key[1] or ''}": bucket.as_dict() for key, bucket in self._buckets.items()}
+
+    def __repr__(self):
+        return f"<RateLimiter rules={len(self._rules)}>"
+
+
+# общие квоты процесса: все AsyncHttpClient (и Base.send_request) по умолчанию ходят через них
+global_rate_limiter = RateLimiter()
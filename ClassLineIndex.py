@@ -0,0 +1,160 @@
+import io
+import logging
+import mmap
+import os
+import struct
+from array import array
+from itertools import accumulate, islice
+from pathlib import Path
+from typing import Generator
+
+_MAGIC = b"LIDX0001"
+_HEADER = struct.Struct("<8sQqQQ")     # magic, размер файла, mtime_ns, шаг, число строк
+_BLOCK = 16 * 1024 * 1024               # по сколько байт разбирается файл при построении
+
+
+class LineIndex:
+    """Индекс смещений строк большого текстового файла для произвольного доступа.
+    По умолчанию живёт только в памяти; с index_path сохраняется в этот файл и переиспользуется, пока у файла
+    не изменились размер и mtime (путь выбирает вызывающий - например, каталог кеша, а не рядом с данными).
+    Запоминается смещение каждой step-й строки: до строки N - один переход и не больше step-1 строк
+    поиска \\n в mmap, поэтому индекс в step раз меньше плотного (100 млн строк при step=64 - ~12 МБ).
+        with LineIndex("tar_list.txt") as index:
+            len(index)                          # число строк без чтения файла
+            index.read_lines(5_000_000, 5_000_100)
+            for line in index.iter_lines(start=resume_from):
+                ...
+    """
+    def __init__(self, path: str | Path, step: int = 64, index_path: str | Path | None = None, encoding: str = "utf-8"):
+        if step < 1:
+            raise ValueError(f"step must be >= 1, got {step}")
+        self.path = Path(path)
+        self.index_path = Path(index_path) if index_path else None
+        self.step = step
+        self.encoding = encoding
+        self.logger = logging.getLogger(__name__)
+        self.count = 0
+        self.offsets = array("Q")
+        self._file = None
+        self._mm: mmap.mmap | None = None
+        self._open()
+
+    #  Построение и загрузка
+    def _open(self) -> None:
+        stat = self.path.stat()
+        if self.index_path is None or not self._load(stat):
+            self._build(stat)
+            if self.index_path is not None:
+                self._save(stat)
+        self._file = open(self.path, "rb")
+        if stat.st_size:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _load(self, stat: os.stat_result) -> bool:
+        """Читает сохранённый индекс, если он построен для этой же версии файла"""
+        try:
+            with open(self.index_path, "rb") as f:
+                magic, size, mtime_ns, step, count = _HEADER.unpack(f.read(_HEADER.size))
+                if (magic, size, mtime_ns, step) != (_MAGIC, stat.st_size, stat.st_mtime_ns, self.step):
+                    return False
+                offsets = array("Q")
+                offsets.frombytes(f.read())
+        except (OSError, struct.error):
+            return False
+        self.count, self.offsets = count, offsets
+        return True
+
+    def _build(self, stat: os.stat_result) -> None:
+        """Один проход по файлу через mmap: позиции \\n считаются блоками на уровне C (split + accumulate)"""
+        self.logger.info(f"Построение индекса строк {self.path} ({stat.st_size} байт, step={self.step})")
+        offsets = array("Q", [0] if stat.st_size else [])
+        lines = 0                               # сколько \\n уже встретилось
+        if stat.st_size:
+            with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                base = 0
+                while base < stat.st_size:
+                    block = mm[base:base + _BLOCK]
+                    parts = block.split(b"\n")
+                    newlines = len(parts) - 1
+                    # конец каждой строки блока (= начало следующей), нужны только начала строк с номером, кратным step
+                    first = (-lines - 1) % self.step
+                    ends = accumulate(map((1).__add__, map(len, parts[:-1])), initial=base)
+                    offsets.extend(islice(ends, first + 1, None, self.step))
+                    lines += newlines
+                    base += len(block)
+            # последняя строка без \\n тоже строка; начало «строки» за концом файла не нужно
+            self.count = lines + (1 if stat.st_size and not self._ends_with_newline() else 0)
+            if offsets and offsets[-1] == stat.st_size:
+                offsets.pop()
+        self.offsets = offsets
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def _save(self, stat: os.stat_result) -> None:
+        tmp = self.index_path.with_name(self.index_path.name + ".tmp")
+        try:
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp, "wb") as f:
+                f.write(_HEADER.pack(_MAGIC, stat.st_size, stat.st_mtime_ns, self.step, self.count))
+                self.offsets.tofile(f)
+            os.replace(tmp, self.index_path)
+        except OSError as e:
+            # каталог индекса недоступен на запись - индекс работает только в памяти
+            self.logger.warning(f"Не удалось сохранить индекс строк {self.index_path}: {e}")
+
+    #  Доступ
+    def __len__(self) -> int:
+        return self.count
+
+    def seek_line(self, n: int) -> int:
+        """Байтовое смещение начала строки n (с 0). n == len() - конец файла"""
+        if not 0 <= n <= self.count:
+            raise IndexError(f"line {n} out of range 0..{self.count}")
+        if n == self.count:
+            return self._mm.size() if self._mm else 0
+        position = self.offsets[n // self.step]
+        for _ in range(n % self.step):
+            position = self._mm.find(b"\n", position) + 1
+        return position
+
+    def read_lines(self, start: int, stop: int | None = None) -> list[str]:
+        """Строки [start, stop) без перевода строки"""
+        stop = self.count if stop is None else min(stop, self.count)
+        if start >= stop:
+            return []
+        begin, end = self.seek_line(start), self.seek_line(stop)
+        text = self._mm[begin:end].decode(self.encoding)
+        lines = text.split("\n")
+        if lines[-1] == "":
+            lines.pop()
+        return [line[:-1] if line.endswith("\r") else line for line in lines] if "\r" in text else lines
+
+    def iter_lines(self, start: int = 0) -> Generator[str, None, None]:
+        """Строки начиная со start - для продолжения прерванной обработки без чтения файла сначала"""
+        if start >= self.count:
+            return
+        with open(self.path, "rb") as raw:
+            raw.seek(self.seek_line(start))
+            with io.TextIOWrapper(raw, encoding=self.encoding) as f:
+                for line in f:
+                    yield line.rstrip("\n")
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __repr__(self):
+        return f"<LineIndex {self.path.name} lines={self.count} step={self.step}>"
@@ -3,7 +3,7 @@ import logging
 from pathlib import Path
 from logging.handlers import TimedRotatingFileHandler
 from typing import Optional, Union
-import json
+import ClassJsonCodec as fast_json
 import threading
 
 class JsonFormatter(logging.Formatter):
@@ -13,7 +13,7 @@ class JsonFormatter(logging.Formatter):
         super().__init__(fmt=None, datefmt=None)
 
     def format(self, record: logging.LogRecord) -> str:
-        timestamp = datetime.datetime.now().isoformat(timespec='milliseconds')  # Используем текущее время с миллисекундами
+        timestamp = datetime.now().isoformat(timespec='milliseconds')  # Используем текущее время с миллисекундами
 
         log_record = {
             "timestamp": timestamp,
@@ -31,7 +31,8 @@ class JsonFormatter(logging.Formatter):
         if record.exc_info:
             log_record["exception"] = self.formatException(record.exc_info)
 
-        return json.dumps(log_record, ensure_ascii=False, default=str)
+        # default=str - и для datetime ("2025-01-31 10:00:00", кроме msgspec - см. ClassJsonCodec)
+        return fast_json.dumps(log_record, default=str)
 
 class SmartTimedRotatingFileHandler(TimedRotatingFileHandler):
     """Ротирует логи в формате app.YYYY-MM-DD.log"""
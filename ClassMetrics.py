@@ -0,0 +1,338 @@
+import json
+import math
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any
+from urllib.parse import urlsplit
+
+import aiohttp
+
+
+# Шаблон эндпоинта: числа, uuid и длинные hex-строки в пути заменяются на {id}
+_ID_SEGMENT = re.compile(r"^(\d+|[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}|[0-9a-fA-F]{16,})$")
+
+
+def endpoint_template(url: str) -> str:
+    """/posts/42/comments?x=1 -> /posts/{id}/comments (чтобы метрики не разрастались по id)"""
+    path = urlsplit(url).path or "/"
+    return "/".join("{id}" if _ID_SEGMENT.match(part) else part for part in path.split("/"))
+
+
+class LatencyHistogram:
+    """Гистограмма в духе HDR: логарифмические корзины с постоянной относительной точностью.
+    Память зависит от диапазона значений, а не от их количества.
+    """
+    def __init__(self, precision: float = 0.01, min_value: float = 1e-6):
+        self.precision = precision              # относительная ошибка перцентиля (0.01 = 1%)
+        self.min_value = min_value              # всё, что меньше, попадает в первую корзину
+        self._log_base = math.log1p(precision)
+        self.buckets: Counter[int] = Counter()
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def record(self, value: float) -> None:
+        value = max(value, 0.0)
+        self.buckets[int(math.log(max(value, self.min_value) / self.min_value) / self._log_base)] += 1
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def percentile(self, p: float) -> float:
+        """Значение p-го перцентиля (0..100)"""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(p / 100 * self.count))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                # середина корзины, но не за пределами наблюдённых значений
+                value = self.min_value * (1 + self.precision) ** (index + 0.5)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def as_dict(self) -> dict[str, float]:
+        return {
+            "count": self.count,
+            "sum": round(self.total, 6),
+            "min": round(self.min, 6) if self.count else 0.0,
+            "max": round(self.max, 6),
+            "p50": round(self.percentile(50), 6),
+            "p95": round(self.percentile(95), 6),
+            "p99": round(self.percentile(99), 6),
+        }
+
+
+@dataclass
+class EndpointMetrics:
+    """Метрики одного метода + шаблона эндпоинта"""
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+    requests: int = 0
+    errors: int = 0
+    retries: int = 0            # сумма повторных попыток (used_attempts)
+    cache_hits: int = 0
+    hedges: int = 0             # запросы, для которых отправлялся дубль
+    hedge_wins: int = 0         # дубль ответил раньше исходного запроса
+    bytes_in: int = 0
+    bytes_out: int = 0
+    statuses: Counter[int] = field(default_factory=Counter)
+    error_types: Counter[str] = field(default_factory=Counter)    # тип из ErrorInfo.type
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "cache_hits": self.cache_hits,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "latency": self.latency.as_dict(),
+            "statuses": dict(self.statuses),
+            "error_types": dict(self.error_types),
+        }
+
+
+class HttpMetrics:
+    """Сбор метрик AsyncHttpClient: задержки по эндпоинтам, байты, повторы, типы ошибок
+    и состояние пула соединений (DNS, ожидание свободного соединения, установка соединения).
+        metrics = HttpMetrics()
+        async with AsyncHttpClient(url=..., metrics=metrics) as client:
+            ...
+        client.snapshot()           # dict
+        metrics.to_prometheus()     # текст в формате Prometheus
+    """
+    def __init__(self, precision: float = 0.01):
+        self.precision = precision
+        self.endpoints: dict[tuple[str, str], EndpointMetrics] = {}
+        # пул соединений
+        self.pool_limit = 0
+        self.pool_limit_per_host = 0
+        self.in_flight = 0
+        self.in_flight_peak = 0
+        self.pool_queued = 0                                    # сколько раз запрос ждал свободное соединение
+        self.pool_wait = LatencyHistogram(precision)            # время ожидания соединения из пула
+        self.dns = LatencyHistogram(precision)                  # время DNS-резолва (промахи DNS-кеша)
+        self.connect = LatencyHistogram(precision)              # время установки нового соединения
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.concurrency: dict[str, dict[str, float]] = {}     # адаптивный лимит по хостам (AdaptiveLimiter.as_dict)
+        self.started_at = time.time()
+
+    def bind_pool(self, limit: int, limit_per_host: int) -> None:
+        self.pool_limit = limit
+        self.pool_limit_per_host = limit_per_host
+
+    def _endpoint(self, method: str, url: str) -> EndpointMetrics:
+        key = (method.upper(), endpoint_template(url))
+        endpoint = self.endpoints.get(key)
+        if endpoint is None:
+            endpoint = self.endpoints[key] = EndpointMetrics(latency=LatencyHistogram(self.precision))
+        return endpoint
+
+    def set_concurrency(self, host: str, state: dict[str, float]) -> None:
+        self.concurrency[host] = state
+
+    # Учёт запросов
+    def request_started(self) -> None:
+        self.in_flight += 1
+        self.in_flight_peak = max(self.in_flight_peak, self.in_flight)
+
+    def request_finished(self) -> None:
+        self.in_flight -= 1
+
+    def observe(
+        self,
+        method: str,
+        url: str,
+        execute_time: float | None,
+        status: int | None,
+        retries: int = 0,
+        bytes_in: int | None = None,
+        bytes_out: int = 0,
+        error_type: str | None = None,
+        from_cache: bool = False,
+    ) -> None:
+        """Учитывает завершённый запрос"""
+        endpoint = self._endpoint(method, url)
+        endpoint.requests += 1
+        endpoint.retries += retries
+        endpoint.bytes_in += bytes_in or 0
+        endpoint.bytes_out += bytes_out
+        if execute_time is not None:
+            endpoint.latency.record(execute_time)
+        if status is not None:
+            endpoint.statuses[status] += 1
+        if from_cache:
+            endpoint.cache_hits += 1
+        if error_type:
+            endpoint.errors += 1
+            endpoint.error_types[error_type] += 1
+
+    def observe_bytes_in(self, method: str, url: str, size: int) -> None:
+        """Байты тела, прочитанные после observe (return_type="stream" дочитывается вызывающим позже)"""
+        self._endpoint(method, url).bytes_in += size
+
+    def observe_hedge(self, method: str, url: str, won: bool) -> None:
+        """Учитывает дублирующий запрос (won - дубль ответил первым)"""
+        endpoint = self._endpoint(method, url)
+        endpoint.hedges += 1
+        endpoint.hedge_wins += won
+
+    @staticmethod
+    def body_size(json_body: Any = None, data: Any = None) -> int:
+        """Примерный размер тела запроса в байтах"""
+        if isinstance(data, bytes):
+            return len(data)
+        if isinstance(data, str):
+            return len(data.encode("utf-8"))
+        if isinstance(data, dict):
+            return sum(len(str(k)) + len(str(v)) + 2 for k, v in data.items())
+        if json_body is not None:
+            return len(json.dumps(json_body, ensure_ascii=False).encode("utf-8"))
+        return 0
+
+    # Трассировка aiohttp: DNS, очередь пула, соединения
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """TraceConfig для ClientSession: время DNS, ожидания пула и установки соединения"""
+        trace = aiohttp.TraceConfig()     # ctx каждого запроса - отдельный SimpleNamespace
+
+        async def on_dns_start(session, ctx, params):
+            ctx.dns_start = time.perf_counter()
+
+        async def on_dns_end(session, ctx, params):
+            if hasattr(ctx, "dns_start"):
+                self.dns.record(time.perf_counter() - ctx.dns_start)
+
+        async def on_queued_start(session, ctx, params):
+            self.pool_queued += 1
+            ctx.queued_start = time.perf_counter()
+
+        async def on_queued_end(session, ctx, params):
+            if hasattr(ctx, "queued_start"):
+                self.pool_wait.record(time.perf_counter() - ctx.queued_start)
+
+        async def on_create_start(session, ctx, params):
+            ctx.connect_start = time.perf_counter()
+
+        async def on_create_end(session, ctx, params):
+            self.connections_created += 1
+            if hasattr(ctx, "connect_start"):
+                self.connect.record(time.perf_counter() - ctx.connect_start)
+
+        async def on_reuse(session, ctx, params):
+            self.connections_reused += 1
+
+        trace.on_dns_resolvehost_start.append(on_dns_start)
+        trace.on_dns_resolvehost_end.append(on_dns_end)
+        trace.on_connection_queued_start.append(on_queued_start)
+        trace.on_connection_queued_end.append(on_queued_end)
+        trace.on_connection_create_start.append(on_create_start)
+        trace.on_connection_create_end.append(on_create_end)
+        trace.on_connection_reuseconn.append(on_reuse)
+        return trace
+
+    # Выгрузка
+    def snapshot(self) -> dict[str, Any]:
+        """Текущие значения всех метрик"""
+        return {
+            "uptime": round(time.time() - self.started_at, 3),
+            "endpoints": {f"{method} {template}": m.as_dict() for (method, template), m in self.endpoints.items()},
+            "pool": {
+                "limit": self.pool_limit,
+                "limit_per_host": self.pool_limit_per_host,
+                "in_flight": self.in_flight,
+                "in_flight_peak": self.in_flight_peak,
+                "saturation": round(self.in_flight / self.pool_limit, 3) if self.pool_limit else 0.0,
+                "queued": self.pool_queued,
+                "wait": self.pool_wait.as_dict(),
+                "connections_created": self.connections_created,
+                "connections_reused": self.connections_reused,
+                "connect": self.connect.as_dict(),
+                "dns": self.dns.as_dict(),
+            },
+            "concurrency": dict(self.concurrency),
+        }
+
+    def to_prometheus(self, prefix: str = "http_client") -> str:
+        """Метрики в текстовом формате Prometheus (exposition format 0.0.4)"""
+        lines: list[str] = []
+
+        def metric(name: str, kind: str, help_text: str) -> None:
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+
+        def labels(**values: Any) -> str:
+            inner = ",".join(f'{k}="{_escape_label(str(v))}"' for k, v in values.items())
+            return f"{{{inner}}}" if inner else ""
+
+        def summary(name: str, histogram: LatencyHistogram, **label_values: Any) -> None:
+            for quantile in (0.5, 0.95, 0.99):
+                lines.append(f"{prefix}_{name}{labels(**label_values, quantile=quantile)} {histogram.percentile(quantile * 100):.6f}")
+            lines.append(f"{prefix}_{name}_sum{labels(**label_values)} {histogram.total:.6f}")
+            lines.append(f"{prefix}_{name}_count{labels(**label_values)} {histogram.count}")
+
+        items = sorted(self.endpoints.items())
+        metric("request_duration_seconds", "summary", "Request latency including retries.")
+        for (method, template), m in items:
+            summary("request_duration_seconds", m.latency, method=method, endpoint=template)
+        for name, attr, help_text in (
+            ("requests_total", "requests", "Completed requests."),
+            ("retries_total", "retries", "Retry attempts."),
+            ("cache_hits_total", "cache_hits", "Responses served from cache."),
+            ("hedges_total", "hedges", "Requests that sent a hedged duplicate."),
+            ("hedge_wins_total", "hedge_wins", "Hedged duplicates that answered first."),
+            ("received_bytes_total", "bytes_in", "Response body bytes."),
+            ("sent_bytes_total", "bytes_out", "Request body bytes (approximate)."),
+        ):
+            metric(name, "counter", help_text)
+            for (method, template), m in items:
+                lines.append(f"{prefix}_{name}{labels(method=method, endpoint=template)} {getattr(m, attr)}")
+        metric("responses_total", "counter", "Responses by status code.")
+        for (method, template), m in items:
+            for status, count in sorted(m.statuses.items()):
+                lines.append(f"{prefix}_responses_total{labels(method=method, endpoint=template, status=status)} {count}")
+        metric("errors_total", "counter", "Failed requests by error type.")
+        for (method, template), m in items:
+            for error_type, count in sorted(m.error_types.items()):
+                lines.append(f"{prefix}_errors_total{labels(method=method, endpoint=template, type=error_type)} {count}")
+
+        metric("pool_limit", "gauge", "Connection pool size.")
+        lines.append(f"{prefix}_pool_limit {self.pool_limit}")
+        metric("in_flight", "gauge", "Requests in progress.")
+        lines.append(f"{prefix}_in_flight {self.in_flight}")
+        metric("in_flight_peak", "gauge", "Peak requests in progress.")
+        lines.append(f"{prefix}_in_flight_peak {self.in_flight_peak}")
+        metric("pool_queued_total", "counter", "Times a request waited for a free pooled connection.")
+        lines.append(f"{prefix}_pool_queued_total {self.pool_queued}")
+        metric("connections_created_total", "counter", "New connections opened.")
+        lines.append(f"{prefix}_connections_created_total {self.connections_created}")
+        metric("connections_reused_total", "counter", "Requests served on a reused connection.")
+        lines.append(f"{prefix}_connections_reused_total {self.connections_reused}")
+        metric("concurrency_limit", "gauge", "Adaptive per-host concurrency limit.")
+        for host, state in sorted(self.concurrency.items()):
+            lines.append(f"{prefix}_concurrency_limit{labels(host=host)} {state['limit']}")
+        metric("concurrency_in_flight", "gauge", "Requests holding an adaptive concurrency slot.")
+        for host, state in sorted(self.concurrency.items()):
+            lines.append(f"{prefix}_concurrency_in_flight{labels(host=host)} {state['in_flight']}")
+        for name, histogram, help_text in (
+            ("pool_wait_seconds", self.pool_wait, "Time waiting for a pooled connection."),
+            ("connect_seconds", self.connect, "Time to open a new connection."),
+            ("dns_seconds", self.dns, "DNS resolution time."),
+        ):
+            metric(name, "summary", help_text)
+            summary(name, histogram)
+        return "\n".join(lines) + "\n"
+
+    def __repr__(self):
+        return f"<HttpMetrics endpoints={len(self.endpoints)} in_flight={self.in_flight} peak={self.in_flight_peak}>"
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
@@ -0,0 +1,253 @@
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Mapping
+
+import aiohttp
+
+import ClassJsonCodec as fast_json
+
+try:
+    import httpx
+except ImportError:     # httpx нужен только для transport="httpx"
+    httpx = None
+
+# задачи закрытия ответов httpx, запущенные из синхронного release(): ссылка нужна, чтобы их не собрал GC
+_closing: set[asyncio.Task] = set()
+
+
+class TransportResponse(ABC):
+    """Ответ транспорта: одинаковый интерфейс для aiohttp и httpx.
+    Тело не прочитано - его читают read() или iter_chunks(), после чего ответ освобождают (release/aclose)
+    """
+    status: int
+    headers: Mapping[str, str]
+    method: str
+    url: str
+
+    @abstractmethod
+    async def read(self) -> bytes:
+        ...
+
+    @abstractmethod
+    def iter_chunks(self, chunk_size: int) -> AsyncIterator[bytes]:
+        ...
+
+    @property
+    @abstractmethod
+    def encoding(self) -> str:
+        """Кодировка текста из Content-Type (по умолчанию utf-8)"""
+
+    @abstractmethod
+    def release(self) -> None:
+        """Возвращает соединение в пул (без await, для finally и синхронного close)"""
+
+    async def aclose(self) -> None:
+        self.release()
+
+
+class Transport(ABC):
+    """Бэкенд AsyncHttpClient: пул соединений + отправка запроса.
+    timeout - общий срок запроса вместе с чтением тела (как ClientTimeout(total=...) у aiohttp).
+    Ошибки приводятся к общему виду: таймаут - asyncio.TimeoutError, остальное классифицирует ErrorHandler
+    """
+    name = "base"
+
+    @abstractmethod
+    async def open(self) -> None:
+        ...
+
+    @abstractmethod
+    async def close(self) -> None:
+        ...
+
+    @property
+    @abstractmethod
+    def closed(self) -> bool:
+        ...
+
+    @abstractmethod
+    async def request(self, method: str, url: str, *, params: dict | None = None, data: Any = None,
+                      json: Any = None, headers: dict[str, str] | None = None, timeout: float | None = None) -> TransportResponse:
+        ...
+
+
+# aiohttp
+# ---------------------------
+class AiohttpResponse(TransportResponse):
+    def __init__(self, response: aiohttp.ClientResponse):
+        self._response = response
+        self.status = response.status
+        self.headers = response.headers
+        self.method = response.method
+        self.url = str(response.url)
+
+    async def read(self) -> bytes:
+        return await self._response.read()
+
+    def iter_chunks(self, chunk_size: int) -> AsyncIterator[bytes]:
+        return self._response.content.iter_chunked(chunk_size)
+
+    @property
+    def encoding(self) -> str:
+        return self._response.get_encoding()
+
+    def release(self) -> None:
+        self._response.release()
+
+
+class AiohttpTransport(Transport):
+    """HTTP/1.1 через aiohttp: явный TCPConnector с лимитами и DNS-кешем"""
+    name = "aiohttp"
+
+    def __init__(self, limit: int = 100, limit_per_host: int = 10, verify_ssl: bool = True, timeout: float = 3.0,
+                 headers: dict[str, str] | None = None, trace_configs: list[aiohttp.TraceConfig] | None = None):
+        self.connector = aiohttp.TCPConnector(
+            limit=limit,                        # максимум соединений одновременно (для всего клиента).
+            limit_per_host=limit_per_host,      # максимум соединений на один хост.
+            ttl_dns_cache=300,                  # кеширование DNS 300 секунд.
+            ssl=verify_ssl,                     # проверять ли SSL-сертификаты
+        )
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.headers = headers or {}
+        self.trace_configs = trace_configs
+        self.session: aiohttp.ClientSession | None = None
+
+    async def open(self) -> None:
+        if not self.session or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                connector=self.connector,
+                headers=self.headers,
+                timeout=self.timeout,
+                trace_configs=self.trace_configs,
+                json_serialize=fast_json.dumps,     # тело json= кодирует быстрый кодек
+            )
+
+    async def close(self) -> None:
+        if self.session and not self.session.closed:
+            await self.session.close()
+
+    @property
+    def closed(self) -> bool:
+        return not self.session or self.session.closed
+
+    async def request(self, method: str, url: str, *, params: dict | None = None, data: Any = None,
+                      json: Any = None, headers: dict[str, str] | None = None, timeout: float | None = None) -> AiohttpResponse:
+        # timeout=None - таймаут сессии
+        extra = {"timeout": aiohttp.ClientTimeout(total=timeout)} if timeout is not None else {}
+        response = await self.session.request(method=method, url=url, params=params, data=data, json=json, headers=headers, **extra)
+        return AiohttpResponse(response)
+
+
+# httpx (HTTP/1.1 или HTTP/2)
+# ---------------------------
+class HttpxResponse(TransportResponse):
+    """deadline - срок запроса по loop.time() (None - без срока): у httpx таймаут действует на каждую
+    операцию отдельно, поэтому общий срок на чтение тела ставим сами
+    """
+    def __init__(self, response: "httpx.Response", deadline: float | None = None):
+        self._response = response
+        self._deadline = deadline
+        self.status = response.status_code
+        self.headers = response.headers
+        self.method = response.request.method
+        self.url = str(response.url)
+        self._closed = False
+
+    async def read(self) -> bytes:
+        try:
+            async with asyncio.timeout_at(self._deadline):
+                return await self._response.aread()
+        except httpx.TimeoutException as e:
+            raise asyncio.TimeoutError(str(e)) from e
+
+    async def iter_chunks(self, chunk_size: int) -> AsyncIterator[bytes]:
+        chunks = self._response.aiter_bytes(chunk_size)
+        try:
+            while True:
+                # срок - на каждое ожидание чанка: пока чанк обрабатывает вызывающий, таймер не должен его прерывать
+                async with asyncio.timeout_at(self._deadline):
+                    try:
+                        chunk = await anext(chunks)
+                    except StopAsyncIteration:
+                        return
+                yield chunk
+        except httpx.TimeoutException as e:
+            raise asyncio.TimeoutError(str(e)) from e
+        finally:
+            await chunks.aclose()
+
+    @property
+    def encoding(self) -> str:
+        return self._response.charset_encoding or "utf-8"
+
+    def release(self) -> None:
+        # httpx закрывает поток только через await - из синхронного кода планируем закрытие
+        if not self._closed:
+            self._closed = True
+            task = asyncio.get_running_loop().create_task(self._response.aclose())
+            _closing.add(task)
+            task.add_done_callback(_closing.discard)
+
+    async def aclose(self) -> None:
+        if not self._closed:
+            self._closed = True
+            await self._response.aclose()
+
+
+class HttpxTransport(Transport):
+    """Транспорт на httpx. http2=True - запросы к одному хосту мультиплексируются
+    в нескольких HTTP/2-соединениях вместо limit_per_host отдельных TCP+TLS (нужен пакет h2)
+    """
+    name = "httpx"
+
+    def __init__(self, limit: int = 100, limit_per_host: int = 10, verify_ssl: bool = True, timeout: float = 3.0,
+                 headers: dict[str, str] | None = None, http2: bool = False):
+        if httpx is None:
+            raise ImportError("transport='httpx' требует пакет httpx (pip install httpx, для HTTP/2 - httpx[http2])")
+        # у httpx нет лимита на хост: для HTTP/1.1 ограничиваем пул limit_per_host, для HTTP/2 потоки и так мультиплексируются
+        self.limits = httpx.Limits(max_connections=limit if http2 else min(limit, limit_per_host),
+                                   max_keepalive_connections=limit_per_host)
+        self.verify_ssl = verify_ssl
+        self.timeout = timeout
+        self.headers = headers or {}
+        self.http2 = http2
+        self.client: "httpx.AsyncClient | None" = None
+
+    async def open(self) -> None:
+        if self.client is None or self.client.is_closed:
+            self.client = httpx.AsyncClient(
+                http2=self.http2,
+                limits=self.limits,
+                verify=self.verify_ssl,
+                timeout=self.timeout,
+                headers=self.headers,
+            )
+
+    async def close(self) -> None:
+        if self.client is not None and not self.client.is_closed:
+            await self.client.aclose()
+
+    @property
+    def closed(self) -> bool:
+        return self.client is None or self.client.is_closed
+
+    async def request(self, method: str, url: str, *, params: dict | None = None, data: Any = None,
+                      json: Any = None, headers: dict[str, str] | None = None, timeout: float | None = None) -> HttpxResponse:
+        # строку и байты httpx принимает как content, словарь - как форму (как data в aiohttp)
+        content = data if isinstance(data, (str, bytes)) else None
+        form = data if content is None else None
+        if json is not None:
+            # json= кодируем сами быстрым кодеком (httpx использует стандартный json)
+            content, json = fast_json.dumpb(json), None
+            headers = {"Content-Type": "application/json", **(headers or {})}
+        extra = {"timeout": timeout} if timeout is not None else {}
+        request = self.client.build_request(method, url, params=params, content=content, data=form, json=json, headers=headers, **extra)
+        # timeout=None - таймаут клиента; у httpx он на каждую операцию, общий срок запроса и тела держим сами
+        total = timeout if timeout is not None else self.timeout
+        deadline = asyncio.get_running_loop().time() + total if total is not None else None
+        try:
+            async with asyncio.timeout_at(deadline):
+                response = await self.client.send(request, stream=True)
+        except httpx.TimeoutException as e:
+            raise asyncio.TimeoutError(str(e)) from e
+        return HttpxResponse(response, deadline)
@@ -0,0 +1,280 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, asdict
+from pathlib import Path
+
+
+@dataclass
+class WriterStats:
+    """Счётчики фоновой записи в один файл"""
+    enqueued: int = 0               # записей поставлено в очередь
+    written: int = 0                # записей записано на диск
+    batches: int = 0                # пакетов (одна запись в файл на пакет)
+    bytes: int = 0
+    queue_depth: int = 0            # записей в очереди сейчас
+    max_queue_depth: int = 0
+    errors: int = 0
+    last_write_time: float = 0.0    # длительность последней записи пакета, сек
+
+    def as_dict(self) -> dict[str, int | float]:
+        return asdict(self)
+
+
+class _Flush:
+    """Маркер в очереди: всё, что поставлено до него, записано"""
+    __slots__ = ("future",)
+
+    def __init__(self, future: asyncio.Future):
+        self.future = future
+
+
+_CLOSE = object()
+
+
+class AsyncFileWriter:
+    """Фоновая пакетная запись в один файл (group commit).
+    Файл открыт всё время работы, производители только кладут данные в очередь, фоновая задача
+    собирает их в пакет (до max_batch записей или flush_interval секунд) и пишет одной операцией в потоке.
+        writer = AsyncFileWriter("out.txt")
+        await writer.write("строка\\n")
+        await writer.flush()            # дождаться записи на диск (ошибка записи поднимется здесь)
+        await writer.close()            # дописывает очередь и закрывает файл
+    Полная очередь (max_queue) притормаживает производителей, а не растит память.
+    Ошибка записи пакета не теряется: её получают ближайшие flush() (все, кто ждёт) и close().
+    """
+    def __init__(self, path: str | Path, mode: str = "a", encoding: str | None = "utf-8",
+                 flush_interval: float = 0.2, max_batch: int = 1000, max_queue: int = 100_000):
+        self.path = Path(path)
+        self.mode = mode
+        self.binary = "b" in mode
+        self.encoding = None if self.binary else encoding
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.stats = WriterStats()
+        self.logger = logging.getLogger(__name__)
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._file = None
+        self._task: asyncio.Task | None = None
+        self._start_lock = asyncio.Lock()
+        self._closed = False
+        self._producers = 0                 # write/flush, ещё не положившие данные в очередь (могут ждать места)
+        self._producers_done = asyncio.Event()
+        self._producers_done.set()
+        self._error: BaseException | None = None    # ошибка записи, ещё не отданная flush/close
+
+    async def start(self) -> None:
+        async with self._start_lock:    # первые write от нескольких производителей приходят одновременно
+            if self._task is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = await asyncio.to_thread(open, self.path, self.mode, encoding=self.encoding)
+                self._task = asyncio.create_task(self._run(), name=f"writer:{self.path.name}")
+
+    async def _put(self, item) -> None:
+        """Кладёт в очередь; после close() новые данные не принимаются, а close ждёт уже начатые put"""
+        if self._closed:
+            raise RuntimeError(f"Writer {self.path} закрыт")
+        self._producers += 1
+        self._producers_done.clear()
+        try:
+            if self._task is None:
+                await self.start()
+            await self._queue.put(item)
+        finally:
+            self._producers -= 1
+            if not self._producers:
+                self._producers_done.set()
+
+    async def write(self, data: str | bytes) -> None:
+        """Ставит данные в очередь (перевод строки не добавляется)"""
+        await self._put(data)
+        self.stats.enqueued += 1
+        self._update_depth()
+
+    async def write_many(self, items) -> None:
+        for data in items:
+            await self.write(data)
+
+    async def flush(self) -> None:
+        """Ждёт, пока всё поставленное до вызова будет записано на диск.
+        Если запись пакета с тех пор не удалась - поднимает её ошибку (OSError и т.п.)
+        """
+        if self._task is None or self._task.done():
+            self._raise_error()
+            return
+        future = asyncio.get_running_loop().create_future()
+        await self._put(_Flush(future))
+        await future
+
+    async def close(self) -> None:
+        """Дописывает очередь и закрывает файл (данные не теряются). Поднимает неотданную ошибку записи"""
+        if self._closed:
+            return
+        self._closed = True
+        # производители, которые ждут места в очереди, успевают положить данные до маркера закрытия
+        await self._producers_done.wait()
+        if self._task is not None:
+            await self._queue.put(_CLOSE)
+            await self._task
+        if self._file is not None:
+            await asyncio.to_thread(self._file.close)
+            self._file = None
+        self._raise_error()
+
+    def abandon(self) -> int:
+        """Синхронно закрывает файл писателя, чей цикл событий уже завершён (его задача не выполнится).
+        Возвращает число незаписанных записей (в очереди и в недописанном пакете)
+        """
+        self._closed = True
+        lost = self.stats.enqueued - self.stats.written
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        return lost
+
+    def _raise_error(self) -> None:
+        error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def _update_depth(self) -> None:
+        depth = self._queue.qsize()
+        self.stats.queue_depth = depth
+        if depth > self.stats.max_queue_depth:
+            self.stats.max_queue_depth = depth
+
+    #  Фоновая задача
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        closing = False
+        while not closing:
+            item = await self._queue.get()
+            batch, flushes = [], []
+            deadline = loop.time() + self.flush_interval
+            while True:
+                if item is _CLOSE:
+                    closing = True
+                    break
+                if isinstance(item, _Flush):
+                    flushes.append(item.future)
+                else:
+                    batch.append(item)
+                    if len(batch) >= self.max_batch:
+                        break
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    if flushes:
+                        # кто-то ждёт записи - пишем всё, что уже в очереди, не дожидаясь flush_interval
+                        break
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+            if batch:
+                await self._write_batch(batch)
+            self._update_depth()
+            self._resolve(flushes)
+        # после close в очереди могли остаться только маркеры flush - отпускаем их
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if isinstance(item, _Flush):
+                self._resolve([item.future])
+
+    def _resolve(self, flushes: list[asyncio.Future]) -> None:
+        """Отпускает ждущие flush; ошибка записи с прошлого flush достаётся всем им"""
+        if not flushes:
+            return
+        error, self._error = self._error, None
+        for future in flushes:
+            if future.done():
+                continue
+            if error is None:
+                future.set_result(None)
+            else:
+                future.set_exception(error)
+
+    async def _write_batch(self, batch: list) -> None:
+        data = (b"" if self.binary else "").join(batch)
+        started = time.perf_counter()
+        try:
+            await asyncio.to_thread(self._write_sync, data)
+            self.stats.written += len(batch)
+            self.stats.batches += 1
+            self.stats.bytes += len(data)
+        except Exception as e:
+            self.stats.errors += 1
+            self.logger.error(f"Ошибка фоновой записи {len(batch)} записей в {self.path}: {e}")
+            if self._error is None:
+                self._error = e
+        self.stats.last_write_time = round(time.perf_counter() - started, 6)
+
+    def _write_sync(self, data: str | bytes) -> None:
+        self._file.write(data)
+        self._file.flush()
+
+    def __repr__(self):
+        return f"<AsyncFileWriter {self.path.name} queue={self.queue_depth} written={self.stats.written}>"
+
+
+class WriterService:
+    """Реестр фоновых писателей: один открытый файл и одна очередь на путь для всего процесса.
+        writer = writer_service.get("results/found.txt")
+        await writer.write("...\\n")
+        ...
+        await writer_service.close_all()    # в конце работы - дописать всё
+    """
+    def __init__(self, **defaults):
+        self.defaults = defaults            # настройки AsyncFileWriter по умолчанию (flush_interval, max_batch, ...)
+        self.logger = logging.getLogger(__name__)
+        self._writers: dict[Path, AsyncFileWriter] = {}
+
+    def get(self, path: str | Path, **options) -> AsyncFileWriter:
+        """Писатель для пути (создаётся при первом обращении; options действуют только при создании)"""
+        key = Path(path).resolve()
+        writer = self._writers.get(key)
+        if writer is not None and writer._task is not None and writer._task.get_loop() is not asyncio.get_running_loop():
+            # писатель остался от предыдущего asyncio.run - его задача и очередь мертвы, закрываем хотя бы файл
+            lost = writer.abandon()
+            self.logger.warning(f"Писатель {key} не был закрыт в предыдущем цикле событий (потеряно записей: {lost}), создаётся новый")
+            writer = None
+        if writer is None or writer._closed:
+            writer = self._writers[key] = AsyncFileWriter(key, **{**self.defaults, **options})
+        return writer
+
+    async def flush(self, path: str | Path | None = None) -> None:
+        writers = [self._writers.get(Path(path).resolve())] if path is not None else list(self._writers.values())
+        await asyncio.gather(*(writer.flush() for writer in writers if writer is not None))
+
+    async def close(self, path: str | Path) -> None:
+        writer = self._writers.pop(Path(path).resolve(), None)
+        if writer is not None:
+            await writer.close()
+
+    async def close_all(self) -> None:
+        """Закрывает все писатели (каждый дописывает свою очередь); первая ошибка записи поднимается после закрытия всех"""
+        writers, self._writers = list(self._writers.values()), {}
+        results = await asyncio.gather(*(writer.close() for writer in writers), return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+    def stats(self) -> dict[str, dict[str, int | float]]:
+        """Счётчики по путям: глубина очереди, пакеты, байты"""
+        for writer in self._writers.values():
+            writer._update_depth()
+        return {str(path): writer.stats.as_dict() for path, writer in self._writers.items()}
+
+    def __repr__(self):
+        return f"<WriterService writers={len(self._writers)}>"
+
+
+# общий сервис процесса: FileManager, Files и AsyncSSHClient пишут через него
+writer_service = WriterService()
@@ -5,7 +5,8 @@ import logging
 import subprocess
 import aiofiles
 import time
-import json
+import ClassJsonCodec as fast_json
+from ClassWriter import writer_service
 import os
 '''Версия 2.0 дописал общую функцию, которая по очереди вызывает два метода класса, теперь её можно импортировать в другое приложение
 так же добавляю метод, который ищет дубликаты записей в файле'''
@@ -31,6 +32,7 @@ class AsyncSSHClient:
         self.logger = logging.getLogger(__name__)
         self._semaphore = asyncio.Semaphore(5)
         self.file_lock = asyncio.Lock()
+        self._output_files: set[str] = set()                # файлы результатов в фоновой записи (закрываются в close)
         self.files_in_archives = 'audio_in_archives.txt'    # файл с сохранение имен всех файлов из архивов
         self.files_in_folders = 'audio_in_folders.txt'  # файл с сохранение имен всех файлов из архивов
         self.tar_list = []                                  # список с именами всех архивов
@@ -54,7 +56,13 @@ class AsyncSSHClient:
         self.ssh_client.connect(hostname=self.host,username=self.username,password=self.password,port=self.port,timeout=self.connect_timeout)
 
     async def close(self) -> None:
-        """Закрытие SSH соединения"""
+        """Закрытие SSH соединения (и дозапись результатов на диск)"""
+        for output_file in self._output_files:
+            try:
+                await writer_service.close(output_file)
+            except Exception as e:
+                self.logger.error(f"Ошибка записи результатов в {output_file}: {e}")
+        self._output_files.clear()
         if self.ssh_client:
             await asyncio.get_event_loop().run_in_executor(None, self.ssh_client.close)
             self.ssh_client = None
@@ -224,14 +232,14 @@ class AsyncSSHClient:
 
     async def save_results(self, output_file: str, file_list: list, archive_name: str):
         """Сохраняет все найденные имена файлов, каждое с новой строки"""
-        async with self.file_lock: # блоикруем файл (хотя может зря
-            async with aiofiles.open(output_file, 'a', encoding='utf-8') as f:
-                content = '\n'.join(file_list)
-                await f.write(content)
-                self.logger.info(f"✅ Сохранено {len(file_list)} файлов {archive_name}")
-                self.count_all_audio += len(file_list)
+        # фоновая пакетная запись: файл открыт один раз на всё время работы, архивы не ждут друг друга
+        content = '\n'.join(file_list)
+        await writer_service.get(output_file).write(content)
+        self._output_files.add(output_file)
+        self.logger.info(f"✅ Сохранено {len(file_list)} файлов {archive_name}")
+        self.count_all_audio += len(file_list)
 
-            return len(file_list)
+        return len(file_list)
 
 
     async def search_mp3_files_in_folders(self, search_path: str, maxdepth: int=1, exclude_folder: bool = True) -> dict:
@@ -403,7 +411,7 @@ class AsyncSSHClient:
             result = await self.execute_command(command)
             logging.info(f"Результат: {result}")
             #print(f"Результат: {type(result[0])} {result[0]}")
-            res = [json.loads(line) for line in result]
+            res = [fast_json.loads(line) for line in result]
             #print(f"Результат: {type(res[0])} {res[0]}")
             return res
         except Exception as e:
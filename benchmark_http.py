@@ -0,0 +1,257 @@
+"""Бенчмарк HTTP-клиентов проекта на локальном сервере-заглушке.
+
+Сравнивает Base.send_request (httpx) и ClassHTTP.AsyncHttpClient (aiohttp) на нескольких уровнях
+параллелизма: запросы/сек, перцентили задержки, пиковая память (RSS) и CPU на запрос.
+Каждый замер идёт в отдельном процессе, сервер - тоже в отдельном процессе, чтобы они не делили CPU и память.
+
+    python benchmark_http.py                                        # aiohttp и httpx, concurrency 1,10,50,100
+    python benchmark_http.py --clients aiohttp --concurrency 10 100 --requests 5000
+    python benchmark_http.py --latency-ms 20 --payload 65536 --error-rate 0.05
+    python benchmark_http.py --save bench.json                      # сохранить результат
+    python benchmark_http.py --baseline bench.json --max-regression 15   # код 1, если стало хуже на 15%
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from ClassMetrics import LatencyHistogram
+
+CLIENTS = ("aiohttp", "httpx")
+
+
+#  Сервер-заглушка
+def serve(port: int, latency_ms: float, jitter_ms: float, payload: int, error_rate: float) -> None:
+    """Отвечает на GET /bench JSON-телом заданного размера с задержкой и долей ошибок 503"""
+    from aiohttp import web
+
+    body = json.dumps({"status": "ok", "data": "x" * payload}).encode()
+
+    async def bench(request: web.Request) -> web.Response:
+        delay = (latency_ms + random.uniform(-jitter_ms, jitter_ms)) / 1000
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if error_rate and random.random() < error_rate:
+            return web.json_response({"status": "error", "message": "stand-in error"}, status=503)
+        return web.Response(body=body, content_type="application/json")
+
+    app = web.Application()
+    app.router.add_get("/bench", bench)
+    web.run_app(app, host="127.0.0.1", port=port, print=None, access_log=None)
+
+
+#  Замер одного клиента (в отдельном процессе)
+def peak_rss_mb() -> float | None:
+    """Пиковый RSS текущего процесса в МБ (None, если платформа не даёт)"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return round(getattr(info, "peak_wset", info.rss) / (1024 * 1024), 1)
+    except ImportError:
+        return None
+
+
+async def run_aiohttp(url: str, concurrency: int, total: int) -> tuple[LatencyHistogram, int]:
+    from ClassHTTP import AsyncHttpClient, RequestFormat, RetryPolicy
+
+    histogram, errors = LatencyHistogram(), 0
+    # без повторов и предохранителя: меряем сам клиент, а не политику повторов
+    policy = RetryPolicy(max_retries=0, breaker_threshold=None)
+    async with AsyncHttpClient(url=url, timeout=30, limit=concurrency, limit_per_host=concurrency, retry_policy=policy) as client:
+        requests = (RequestFormat(method="GET", endpoint="/bench") for _ in range(total))
+        async for response in client.request_many(requests, concurrency=concurrency, ordered=False):
+            histogram.record(response.execute_time)
+            errors += not response.success
+    return histogram, errors
+
+
+async def run_httpx(url: str, concurrency: int, total: int) -> tuple[LatencyHistogram, int]:
+    import httpx
+    from Base import send_request
+
+    histogram, errors = LatencyHistogram(), 0
+    remaining = iter(range(total))
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            result = await send_request(client=client, url="/bench", timeout=30)
+            histogram.record(time.perf_counter() - start)
+            errors += isinstance(result, dict) and result.get("status") == "error"
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits) as client:
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+    return histogram, errors
+
+
+def run_case(client: str, url: str, concurrency: int, total: int, warmup: int) -> dict:
+    """Один замер: прогрев, затем total запросов. Результат - dict для JSON"""
+    logging.disable(logging.CRITICAL)   # логи ошибок при error_rate не должны мерить консоль
+    runner = run_aiohttp if client == "aiohttp" else run_httpx
+
+    async def measure() -> dict:
+        if warmup:
+            await runner(url, concurrency, warmup)
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        histogram, errors = await runner(url, concurrency, total)
+        wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+        latency = histogram.as_dict()
+        return {
+            "client": client,
+            "concurrency": concurrency,
+            "requests": total,
+            "errors": errors,
+            "rps": round(total / wall, 1),
+            "p50_ms": round(latency["p50"] * 1000, 2),
+            "p95_ms": round(latency["p95"] * 1000, 2),
+            "p99_ms": round(latency["p99"] * 1000, 2),
+            "cpu_ms_per_req": round(cpu * 1000 / total, 3),
+            "peak_rss_mb": peak_rss_mb(),
+        }
+
+    return asyncio.run(measure())
+
+
+#  Запуск всего набора
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_port(port: int, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise TimeoutError(f"Сервер-заглушка не поднялся на порту {port}")
+
+
+def run_suite(args: argparse.Namespace) -> list[dict]:
+    script = str(Path(__file__).resolve())
+    port = args.port or free_port()
+    server = subprocess.Popen([
+        sys.executable, script, "serve", "--port", str(port), "--latency-ms", str(args.latency_ms),
+        "--jitter-ms", str(args.jitter_ms), "--payload", str(args.payload), "--error-rate", str(args.error_rate),
+    ])
+    results = []
+    try:
+        wait_port(port)
+        url = f"http://127.0.0.1:{port}"
+        for concurrency in args.concurrency:
+            for client in args.clients:
+                output = subprocess.run(
+                    [sys.executable, script, "case", "--client", client, "--url", url, "--concurrency", str(concurrency),
+                     "--requests", str(args.requests), "--warmup", str(args.warmup)],
+                    capture_output=True, text=True, check=True,
+                ).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                results.append(result)
+                print_row(result)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+    return results
+
+
+COLUMNS = ("client", "concurrency", "rps", "p50_ms", "p95_ms", "p99_ms", "cpu_ms_per_req", "peak_rss_mb", "errors")
+
+
+def print_header() -> None:
+    print(" ".join(f"{name:>14}" for name in COLUMNS))
+
+
+def print_row(result: dict) -> None:
+    print(" ".join(f"{str(result[name]):>14}" for name in COLUMNS), flush=True)
+
+
+def compare(results: list[dict], baseline_path: str, max_regression: float) -> list[str]:
+    """Регрессии относительно сохранённого прогона: rps ниже или p95/CPU выше, чем на max_regression %"""
+    baseline = {(r["client"], r["concurrency"]): r for r in json.loads(Path(baseline_path).read_text(encoding="utf-8"))["results"]}
+    problems = []
+    for result in results:
+        old = baseline.get((result["client"], result["concurrency"]))
+        if old is None:
+            continue
+        name = f"{result['client']} c={result['concurrency']}"
+        if result["rps"] < old["rps"] * (1 - max_regression / 100):
+            problems.append(f"{name}: rps {old['rps']} -> {result['rps']}")
+        for key in ("p95_ms", "cpu_ms_per_req"):
+            if old[key] and result[key] > old[key] * (1 + max_regression / 100):
+                problems.append(f"{name}: {key} {old[key]} -> {result[key]}")
+    return problems
+
+
+def add_server_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="задержка ответа сервера, мс")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="разброс задержки ±, мс")
+    parser.add_argument("--payload", type=int, default=1024, help="размер тела ответа, байт")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля ответов 503 (0..1)")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарк HTTP-клиентов (httpx send_request и aiohttp AsyncHttpClient)")
+    sub = parser.add_subparsers(dest="command")
+
+    add_server_args(parser)
+    serve_cmd = sub.add_parser("serve", help="только сервер-заглушка")
+    add_server_args(serve_cmd)
+    serve_cmd.add_argument("--port", type=int, default=8080)
+
+    case_cmd = sub.add_parser("case", help="один замер (внутренний режим)")
+    case_cmd.add_argument("--client", choices=CLIENTS, required=True)
+    case_cmd.add_argument("--url", required=True)
+    case_cmd.add_argument("--concurrency", type=int, required=True)
+    case_cmd.add_argument("--requests", type=int, required=True)
+    case_cmd.add_argument("--warmup", type=int, default=0)
+
+    parser.add_argument("--clients", nargs="+", choices=CLIENTS, default=list(CLIENTS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50, 100])
+    parser.add_argument("--requests", type=int, default=2000, help="запросов на один замер")
+    parser.add_argument("--warmup", type=int, default=100, help="запросов на прогрев (не учитываются)")
+    parser.add_argument("--port", type=int, default=0, help="порт сервера-заглушки (0 - свободный)")
+    parser.add_argument("--save", help="сохранить результат в JSON")
+    parser.add_argument("--baseline", help="JSON прошлого прогона для сравнения")
+    parser.add_argument("--max-regression", type=float, default=10.0, help="допустимое ухудшение, %%")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        serve(args.port, args.latency_ms, args.jitter_ms, args.payload, args.error_rate)
+        return 0
+    if args.command == "case":
+        print(json.dumps(run_case(args.client, args.url, args.concurrency, args.requests, args.warmup)))
+        return 0
+
+    print(f"latency={args.latency_ms}ms ±{args.jitter_ms}ms payload={args.payload}B error_rate={args.error_rate} requests={args.requests}")
+    print_header()
+    results = run_suite(args)
+    if args.save:
+        config = {key: getattr(args, key) for key in ("latency_ms", "jitter_ms", "payload", "error_rate", "requests")}
+        Path(args.save).write_text(json.dumps({"config": config, "results": results}, indent=2, ensure_ascii=False), encoding="utf-8")
+    if args.baseline:
+        problems = compare(results, args.baseline, args.max_regression)
+        for problem in problems:
+            print(f"РЕГРЕССИЯ {problem}")
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""Микро-бенчмарк JSON-кодеков (ClassJsonCodec) на данных проекта.
+
+Нагрузки повторяют горячие места:
+    audio      - ответ API с base64-аудио (разбор в AsyncHttpClient, запись в FileManager.write_json_async)
+    appsim     - записи AppSimChecker построчно (AsyncSSHClient.request_appSimChecker)
+    log        - запись лога через JsonFormatter
+Для каждого установленного кодека - время операции и ускорение относительно стандартного json.
+
+    python benchmark_json.py
+    python benchmark_json.py --audio-kb 4096 --records 50000 --codecs json orjson
+"""
+import argparse
+import base64
+import logging
+import random
+import sys
+import time
+from typing import Any, Callable
+
+import ClassJsonCodec as fast_json
+from ClassLogger import JsonFormatter
+
+
+def audio_payload(size_kb: int) -> dict:
+    audio = random.randbytes(size_kb * 1024)
+    return {
+        "status": "success",
+        "recipient_data": {
+            "file": base64.b64encode(audio).decode("ascii"),
+            "filename": "2025-10-10_12-00-00_79001234567.mp3",
+            "size": len(audio),
+            "mime": "audio/mpeg",
+        },
+        "request_id": "5f0c6f7e-2b0e-4a47-9a8f-0d6f3c2a1b9e",
+    }
+
+
+def appsim_records(count: int) -> list[dict]:
+    operators = ["МТС", "Билайн", "МегаФон", "Tele2"]
+    return [
+        {
+            "date": f"2025-10-24 {i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}",
+            "callerid": f"7900{random.randrange(10 ** 7):07d}",
+            "callerid_ext": f"7495{random.randrange(10 ** 7):07d}",
+            "operator": random.choice(operators),
+            "res": random.choice((0, 1)),
+            "duration": round(random.uniform(0, 120), 2),
+            "comment": "Проверка SIM" if i % 7 else None,
+        }
+        for i in range(count)
+    ]
+
+
+def log_records(count: int) -> list[logging.LogRecord]:
+    records = []
+    for i in range(count):
+        record = logging.LogRecord("ClassHTTP", logging.INFO, __file__, i, "Response received: status=%s url=%s", (200, f"https://api.example.com/items/{i}"), None)
+        record.trace_id = f"trace-{i:08d}"
+        records.append(record)
+    return records
+
+
+def measure(func: Callable[[], Any], min_time: float) -> float:
+    """Среднее время вызова func, сек (крутим не меньше min_time)"""
+    func()  # прогрев
+    loops, elapsed = 0, 0.0
+    start = time.perf_counter()
+    while elapsed < min_time:
+        func()
+        loops += 1
+        elapsed = time.perf_counter() - start
+    return elapsed / loops
+
+
+def cases(args: argparse.Namespace) -> dict[str, tuple[Callable[[], Any], int]]:
+    """Имя операции -> (функция, сколько объектов обрабатывает за вызов)"""
+    random.seed(0)
+    audio = audio_payload(args.audio_kb)
+    # входные данные кодируем стандартным json, чтобы все кодеки разбирали одно и то же
+    stdlib = fast_json.make_codec("json")
+    audio_raw = stdlib.dumpb(audio)
+    appsim = appsim_records(args.records)
+    appsim_lines = [stdlib.dumps(r) for r in appsim]
+    logs = log_records(args.records)
+    formatter = JsonFormatter()
+    return {
+        "audio loads": (lambda: fast_json.loads(audio_raw), 1),
+        "audio dumps": (lambda: fast_json.dumps(audio), 1),
+        "appsim loads (lines)": (lambda: [fast_json.loads(line) for line in appsim_lines], len(appsim_lines)),
+        "appsim dumps (lines)": (lambda: [fast_json.dumps(r) for r in appsim], len(appsim)),
+        "log format": (lambda: [formatter.format(r) for r in logs], len(logs)),
+    }
+
+
+def main() -> int:
+    available = [name for name in fast_json.CODECS if name == "json" or getattr(fast_json, name) is not None]
+    parser = argparse.ArgumentParser(description="Бенчмарк JSON-кодеков на данных проекта")
+    parser.add_argument("--codecs", nargs="+", choices=list(fast_json.CODECS), default=available)
+    parser.add_argument("--audio-kb", type=int, default=2048, help="размер аудио до base64, КБ")
+    parser.add_argument("--records", type=int, default=10000, help="записей AppSimChecker и логов")
+    parser.add_argument("--min-time", type=float, default=1.0, help="минимальное время замера одной операции, сек")
+    args = parser.parse_args()
+
+    codecs = [name for name in args.codecs if name in available]
+    skipped = sorted(set(args.codecs) - set(codecs))
+    if skipped:
+        print(f"не установлены: {', '.join(skipped)}")
+    print(f"audio={args.audio_kb}KB records={args.records}")
+    print(f"{'операция':<22}" + "".join(f"{name:>22}" for name in codecs))
+
+    work = cases(args)
+    results: dict[str, dict[str, float]] = {}
+    for name in codecs:
+        fast_json.set_codec(name)
+        for case, (func, count) in work.items():
+            results.setdefault(case, {})[name] = measure(func, args.min_time) / count
+    for case, timings in results.items():
+        base = timings.get("json")
+        cells = []
+        for name in codecs:
+            cell = f"{timings[name] * 1e6:.2f}us"
+            if base and name != "json":
+                cell += f" x{base / timings[name]:.1f}"
+            cells.append(f"{cell:>22}")
+        print(f"{case:<22}" + "".join(cells))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,6 +5,7 @@ import logging
 import asyncio
 import os
 import argparse
+from itertools import islice
 from pathlib import Path
 import sys
 from pathlib import Path
@@ -102,13 +103,14 @@ class ArchiveProcessor:
             self.logger.info(f"Файл {self.INPUT_FILE} не найден")
             return False
 
+        # START_FROM - номер среди непустых строк (как раньше archive_paths[START_FROM:]); пропущенные не хранятся в памяти
         with open(self.INPUT_FILE, "r") as f:
-            archive_paths = [line.strip() for line in f if line.strip()]
+            archive_paths = list(islice((line.strip() for line in f if line.strip()), self.START_FROM, None))
 
         # Создаем и запускаем задачи для всех архивов
         tasks = [
             self.process_single_archive(arch)
-            for arch in archive_paths[self.START_FROM:]
+            for arch in archive_paths
         ]
 
         self.logger.info(f"Начата обработка {len(tasks)} архивов (с {self.START_FROM} позиции)...")
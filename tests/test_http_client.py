@@ -0,0 +1,135 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+from aiohttp import web
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ClassHTTP import AsyncHttpClient, RequestFormat  # noqa: E402
+from ClassTransport import httpx  # noqa: E402
+
+# httpx - необязательная зависимость: без неё проверяется только aiohttp-транспорт
+requires_httpx = pytest.mark.skipif(httpx is None, reason="нужен пакет httpx")
+TRANSPORTS = ["aiohttp", pytest.param("httpx", marks=requires_httpx)]
+
+
+async def _serve(handler) -> tuple[web.AppRunner, str]:
+    app = web.Application()
+    app.router.add_route("*", "/{tail:.*}", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+@pytest.mark.parametrize("transport", TRANSPORTS)
+def test_json_body_decoded_with_response_charset(transport):
+    """JSON в windows-1251 разбирается в dict, а не возвращается строкой"""
+    async def handler(request: web.Request) -> web.Response:
+        body = '{"a": "привет"}'.encode("windows-1251")
+        return web.Response(body=body, headers={"Content-Type": "application/json; charset=windows-1251"})
+
+    async def main():
+        runner, url = await _serve(handler)
+        try:
+            async with AsyncHttpClient(url=url, transport=transport) as client:
+                return await client.request_async(RequestFormat(method="GET", endpoint="/cp1251"))
+        finally:
+            await runner.cleanup()
+
+    response = asyncio.run(main())
+    assert response.status == 200
+    assert response.data == {"a": "привет"}
+
+
+def test_json_body_utf8_default():
+    async def handler(request: web.Request) -> web.Response:
+        return web.json_response({"a": "привет"})
+
+    async def main():
+        runner, url = await _serve(handler)
+        try:
+            async with AsyncHttpClient(url=url) as client:
+                return await client.request_async(RequestFormat(method="GET", endpoint="/utf8"))
+        finally:
+            await runner.cleanup()
+
+    assert asyncio.run(main()).data == {"a": "привет"}
+
+
+@pytest.mark.parametrize("transport", TRANSPORTS)
+def test_budget_timeout_reported_as_deadline_exceeded(transport):
+    """Таймаут, урезанный до остатка бюджета, - DeadlineExceeded, а не TimeoutError"""
+    async def handler(request: web.Request) -> web.Response:
+        await asyncio.sleep(1)
+        return web.json_response({})
+
+    async def main():
+        runner, url = await _serve(handler)
+        try:
+            async with AsyncHttpClient(url=url, transport=transport, timeout=5) as client:
+                return await client.request_async(RequestFormat(method="GET", endpoint="/slow", deadline=0.3))
+        finally:
+            await runner.cleanup()
+
+    response = asyncio.run(main())
+    assert not response.success
+    assert response.error_type == "DeadlineExceeded"
+
+
+def test_request_many_answers_unsent_requests_after_deadline():
+    """После бюджета пакета неотправленные запросы получают ответ DeadlineExceeded, по одному на запрос"""
+    async def handler(request: web.Request) -> web.Response:
+        await asyncio.sleep(0.2)
+        return web.json_response({"n": request.query["n"]})
+
+    async def main():
+        runner, url = await _serve(handler)
+        try:
+            async with AsyncHttpClient(url=url, timeout=5) as client:
+                requests = [RequestFormat(method="GET", endpoint="/item", params={"n": str(n)}) for n in range(10)]
+                return [r async for r in client.request_many(requests, concurrency=2, deadline=0.3)]
+        finally:
+            await runner.cleanup()
+
+    responses = asyncio.run(main())
+    assert [r.request.params["n"] for r in responses] == [str(n) for n in range(10)]
+    assert responses[0].success
+    assert responses[-1].error_type == "DeadlineExceeded"
+    assert all(r.success or r.error_type == "DeadlineExceeded" for r in responses)
+
+
+@requires_httpx
+def test_httpx_timeout_covers_body_read():
+    """Срок httpx-транспорта общий на заголовки и тело, а не на каждое чтение"""
+    from ClassTransport import HttpxTransport
+
+    async def handler(request: web.Request) -> web.StreamResponse:
+        response = web.StreamResponse()
+        await response.prepare(request)
+        for _ in range(10):
+            await response.write(b"x" * 100)
+            await asyncio.sleep(0.1)
+        await response.write_eof()
+        return response
+
+    async def main():
+        runner, url = await _serve(handler)
+        transport = HttpxTransport(timeout=0.4)
+        await transport.open()
+        try:
+            response = await transport.request("GET", f"{url}/drip")
+            try:
+                await response.read()
+            finally:
+                await response.aclose()
+        finally:
+            await transport.close()
+            await runner.cleanup()
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(main())
@@ -0,0 +1,32 @@
+import base64
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ClassJsonStream import Base64FieldDecoder  # noqa: E402
+
+
+def _php_body(payload: bytes) -> bytes:
+    """Ответ /download как его пишет PHP json_encode: MIME-base64 с \\n и экранированным \\/"""
+    field = base64.encodebytes(payload).decode().replace("\n", "\\n").replace("/", "\\/")
+    return ('{"status": "ok", "recipient_data": {"name": "a\\/b\\n", "file": "' + field + '"}}').encode()
+
+
+def _decode(body: bytes, chunk_size: int) -> bytes:
+    decoder = Base64FieldDecoder(("recipient_data", "file"))
+    out = [decoder.feed(body[i:i + chunk_size]) for i in range(0, len(body), chunk_size)]
+    out.append(decoder.close())
+    assert decoder.done
+    return b"".join(out)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 7, 64, 1 << 20])
+def test_base64_field_decoded_at_any_chunk_size(chunk_size):
+    """Граница чанка внутри \\/, \\n или \\uXXXX не ломает декодирование"""
+    payload = os.urandom(3000) + b"\xff\xfe\xfd" * 100      # байты 0xff дают "/" в base64
+    body = _php_body(payload).replace(b"\\/", b"\\u002F", 5)
+    assert _decode(body, chunk_size) == payload